@@ -0,0 +1,313 @@
+"""Benchmarks of the COCO converters on synthetic data.
+
+Measures throughput, latency percentiles and peak memory of each converter and compares them
+with the JSON baseline of the previous release, so regressions are visible before the release.
+
+Usage (from the root of the repository):
+    python -m benchmarks.converters --save-baseline benchmarks/baselines/converters.json
+    python -m benchmarks.converters --baseline benchmarks/baselines/converters.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import supervisely as sly
+
+from benchmarks.synthetic import CATEGORIES, generate_coco_export, make_coco_dataset
+from src.coco_reader import CocoReader
+from src.converters import (
+    ConversionContext,
+    convert_polygon_vertices,
+    convert_rle_mask_to_polygon,
+)
+from src.layout import open_export, resolve_coco_layout
+
+# * Default parameters of the synthetic data, can be changed with the command line arguments.
+DEFAULT_PARAMS = {
+    "images": 200,
+    "height": 640,
+    "width": 640,
+    "objects": 10,
+    "vertices": 32,
+    "hole_ratio": 0.1,
+    "rle_ratio": 0.1,
+    "seed": 0,
+    "repeat": 3,
+}
+
+# * Relative change of the metric, which is reported as a regression.
+DEFAULT_THRESHOLD = 0.2
+
+
+def build_meta() -> sly.ProjectMeta:
+    """Returns ProjectMeta with classes of the synthetic categories, as convert_coco_project does."""
+    meta = sly.ProjectMeta()
+    colors = []
+    for category in CATEGORIES:
+        color = sly.color.generate_rgb(colors)
+        colors.append(color)
+        meta = meta.add_obj_class(sly.ObjClass(category["name"], sly.AnyGeometry, color))
+    return meta
+
+
+def polygon_items(params: Dict) -> Tuple[Callable, List]:
+    dataset = make_coco_dataset(**_data_params(params))
+    items = [
+        (ann, image_size)
+        for image_size, anns in dataset
+        for ann in anns
+        if isinstance(ann["segmentation"], list)
+    ]
+    return lambda item: convert_polygon_vertices(*item), items
+
+
+def rle_items(params: Dict) -> Tuple[Callable, List]:
+    dataset = make_coco_dataset(**_data_params(params))
+    items = [
+        ann for _, anns in dataset for ann in anns if isinstance(ann["segmentation"], dict)
+    ]
+    return convert_rle_mask_to_polygon, items
+
+
+def image_items(params: Dict) -> Tuple[Callable, List]:
+    """Converts images with the context, which is built once per split as in the app."""
+    context = ConversionContext(build_meta(), CATEGORIES)
+    dataset = make_coco_dataset(**_data_params(params))
+    return lambda item: context.convert(item[1], item[0]), dataset
+
+
+def prepare_items(params: Dict) -> Tuple[Callable, List]:
+    """Finds the splits of the export on the disk and reads all images with their annotations,
+    the same way as convert_coco_project prepares the export before the conversion."""
+    export_dir = tempfile.mkdtemp(prefix="benchmark_export_")
+    generate_coco_export(export_dir, **_data_params(params))
+
+    def prepare(directory: str) -> int:
+        source = open_export(directory)
+        images = 0
+        for split in resolve_coco_layout(source):
+            with CocoReader(split.annotations_path, opener=source.open_text) as reader:
+                for image_info, _ in reader:
+                    images += image_info["file_name"] in split.images
+        source.close()
+        return images
+
+    return prepare, [export_dir]
+
+
+# * Benchmark cases: name -> function, which returns the converter and the items to convert.
+CASES = {
+    "convert_polygon_vertices": polygon_items,
+    "convert_rle_mask_to_polygon": rle_items,
+    "coco_to_sly_ann": image_items,
+    "prepare_coco": prepare_items,
+}
+
+
+def _data_params(params: Dict) -> Dict:
+    return {
+        "images": params["images"],
+        "image_size": (params["height"], params["width"]),
+        "objects": params["objects"],
+        "vertices": params["vertices"],
+        "hole_ratio": params["hole_ratio"],
+        "rle_ratio": params["rle_ratio"],
+        "seed": params["seed"],
+    }
+
+
+def measure(function: Callable, items: List, repeat: int) -> Dict[str, Any]:
+    """Calls the function for every item repeat times and returns throughput (items per second),
+    latency percentiles of one call in milliseconds and peak memory in MiB.
+    Memory is measured in a separate pass, because tracing slows down the calls.
+
+    :param function: converter, which is called with one item
+    :type function: Callable
+    :param items: items to convert
+    :type items: List
+    :param repeat: number of passes over the items
+    :type repeat: int
+    :rtype: Dict[str, Any]
+    """
+    if not items:
+        return {"items": 0}
+
+    latencies = []
+    for _ in range(max(1, repeat)):
+        for item in items:
+            start = perf_counter()
+            function(item)
+            latencies.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        for item in items:
+            function(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    total = float(latencies.sum()) / 1000
+    return {
+        "items": len(items),
+        "calls": len(latencies),
+        "seconds": round(total, 4),
+        "throughput": round(len(latencies) / total, 2) if total else None,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 4),
+            "p90": round(float(np.percentile(latencies, 90)), 4),
+            "p99": round(float(np.percentile(latencies, 99)), 4),
+            "max": round(float(latencies.max()), 4),
+        },
+        "peak_memory_mb": round(peak / 1024**2, 3),
+    }
+
+
+def run(params: Dict, cases: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Runs the benchmark cases and returns the report, which can be saved as a baseline.
+
+    :param params: parameters of the synthetic data and number of passes
+    :type params: Dict
+    :param cases: names of the cases to run, all cases by default
+    :type cases: List[str], optional
+    :rtype: Dict[str, Any]
+    """
+    results = {}
+    for name in cases or CASES:
+        function, items = CASES[name](params)
+        try:
+            results[name] = measure(function, items, params["repeat"])
+        finally:
+            if name == "prepare_coco":
+                sly.fs.remove_dir(items[0])
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "supervisely": sly.__version__,
+        },
+        "params": params,
+        "results": results,
+    }
+
+
+def compare(
+    report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """Returns descriptions of the regressions: throughput dropped, p99 latency or peak memory
+    grew by more than the threshold compared with the baseline.
+
+    :param report: report of the current run
+    :type report: Dict[str, Any]
+    :param baseline: report of the baseline run
+    :type baseline: Dict[str, Any]
+    :param threshold: allowed relative change, defaults to 0.2
+    :type threshold: float, optional
+    :rtype: List[str]
+    """
+    if report["params"] != baseline["params"]:
+        sly.logger.warning(
+            "Parameters of the run differ from the baseline, results are not comparable: "
+            f"{report['params']} != {baseline['params']}"
+        )
+
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base.get("items") or not result.get("items"):
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {result['throughput']} < {base['throughput']} items/s"
+            )
+        if result["latency_ms"]["p99"] > base["latency_ms"]["p99"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p99 latency {result['latency_ms']['p99']} > "
+                f"{base['latency_ms']['p99']} ms"
+            )
+        if result["peak_memory_mb"] > base["peak_memory_mb"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory_mb']} > {base['peak_memory_mb']} MiB"
+            )
+    return regressions
+
+
+def format_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Returns results as a text table, with baseline values in brackets if it's provided."""
+    rows = [("case", "items", "items/s", "p50 ms", "p90 ms", "p99 ms", "peak MiB")]
+    for name, result in report["results"].items():
+        if not result.get("items"):
+            rows.append((name, "0", "-", "-", "-", "-", "-"))
+            continue
+        base = (baseline or {}).get("results", {}).get(name) or {}
+
+        def cell(value: Any, base_value: Any) -> str:
+            return f"{value} ({base_value})" if base_value is not None else str(value)
+
+        base_latency = base.get("latency_ms", {})
+        rows.append(
+            (
+                name,
+                str(result["items"]),
+                cell(result["throughput"], base.get("throughput")),
+                cell(result["latency_ms"]["p50"], base_latency.get("p50")),
+                cell(result["latency_ms"]["p90"], base_latency.get("p90")),
+                cell(result["latency_ms"]["p99"], base_latency.get("p99")),
+                cell(result["peak_memory_mb"], base.get("peak_memory_mb")),
+            )
+        )
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in rows
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the COCO converters.")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="cases to run")
+    parser.add_argument("--baseline", help="path to the baseline JSON to compare with")
+    parser.add_argument("--save-baseline", help="path to save the results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+    report = run(params, args.cases)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    print(format_table(report, baseline))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline was saved to {args.save_baseline}.")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
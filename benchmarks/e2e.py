@@ -0,0 +1,227 @@
+"""End-to-end throughput benchmark of the migration against local stand-in servers.
+
+Generates synthetic Roboflow exports, serves them with the Roboflow stand-in, runs the headless
+runner in a subprocess against the Supervisely stand-in and reports the throughput, the number of
+retried requests and the statistics of both servers. Works offline on one machine.
+
+Usage (from the root of the repository):
+    python -m benchmarks.e2e --projects 4 --images 200 --rf-bandwidth 5000000 \\
+        --sly-latency 0.05 --sly-error-rate 0.05 --report e2e.json
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import supervisely as sly
+
+from benchmarks.servers import Faults, RoboflowServer, SuperviselyServer
+from benchmarks.synthetic import generate_coco_export, generate_folder_export
+
+# * Credentials of the stand-in servers, Roboflow keys must contain lowercase letters.
+ROBOFLOW_API_KEY = "benchmark-key"
+SUPERVISELY_TOKEN = "b" * 128
+TEAM_ID = 1
+WORKSPACE_ID = 1
+
+
+def prepare_projects(
+    server: RoboflowServer,
+    directory: str,
+    projects: int,
+    classification: int,
+    images: int,
+    image_size: int,
+    objects: int,
+    seed: int,
+) -> int:
+    """Generates exports of the projects, adds them to the Roboflow stand-in and returns
+    the total number of images."""
+    total_images = 0
+    for idx in range(projects + classification):
+        name = f"project-{idx:03d}"
+        export_dir = os.path.join(directory, name)
+        if idx < projects:
+            project_type, export_format = "instance-segmentation", "coco"
+            summary = generate_coco_export(
+                export_dir,
+                images=images,
+                image_size=(image_size, image_size),
+                objects=objects,
+                seed=seed + idx,
+            )
+        else:
+            project_type, export_format = "classification", "folder"
+            summary = generate_folder_export(
+                export_dir, images=images, image_size=(image_size, image_size), seed=seed + idx
+            )
+        archive_path = shutil.make_archive(export_dir, "zip", export_dir)
+        shutil.rmtree(export_dir)
+        server.add_project(name, project_type, archive_path, export_format, summary["images"])
+        total_images += summary["images"]
+    return total_images
+
+
+def run_migration(
+    spec_path: str, report_path: str, env: Dict[str, str], timeout: Optional[float]
+) -> int:
+    """Runs the headless runner in a subprocess, so the SDKs read the addresses
+    of the stand-in servers from the environment on import. Logs of the runner go to stderr."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(
+        [sys.executable, "-m", "src.headless", spec_path, "--report", report_path],
+        cwd=root,
+        env={**os.environ, **env},
+        stdout=sys.stderr,
+        timeout=timeout,
+    )
+    return process.returncode
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark with stand-in servers.")
+    parser.add_argument("--projects", type=int, default=2, help="number of COCO projects")
+    parser.add_argument("--classification", type=int, default=1, help="number of folder projects")
+    parser.add_argument("--images", type=int, default=100, help="images per project")
+    parser.add_argument("--image-size", type=int, default=640)
+    parser.add_argument("--objects", type=int, default=5, help="objects per image")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--download", type=int, default=1, help="download workers")
+    parser.add_argument("--convert", type=int, default=1, help="convert workers")
+    parser.add_argument("--upload", type=int, default=1, help="upload workers")
+    parser.add_argument("--export-polls", type=int, default=0)
+    for prefix, name in (("rf", "Roboflow"), ("sly", "Supervisely")):
+        parser.add_argument(f"--{prefix}-latency", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-jitter", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-bandwidth", type=int, default=0, help="bytes per second")
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-error-status", type=int, default=503)
+        parser.add_argument(f"--{prefix}-retry-after", type=float, default=None)
+        parser.add_argument(f"--{prefix}-reset-rate", type=float, default=0.0)
+        parser.add_argument(
+            f"--{prefix}-error-paths",
+            nargs="+",
+            default=None,
+            help=f"inject failures only into these {name} paths",
+        )
+    parser.add_argument("--timeout", type=float, default=None, help="timeout of the migration")
+    parser.add_argument("--report", help="path to save the JSON report")
+    args = parser.parse_args(argv)
+
+    def faults(prefix: str) -> Faults:
+        values = vars(args)
+        return Faults(
+            latency=values[f"{prefix}_latency"],
+            jitter=values[f"{prefix}_jitter"],
+            bandwidth=values[f"{prefix}_bandwidth"],
+            error_rate=values[f"{prefix}_error_rate"],
+            error_status=values[f"{prefix}_error_status"],
+            retry_after=values[f"{prefix}_retry_after"],
+            reset_rate=values[f"{prefix}_reset_rate"],
+            paths=values[f"{prefix}_error_paths"],
+            seed=args.seed,
+        )
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_e2e_")
+    roboflow_server = RoboflowServer(
+        ROBOFLOW_API_KEY, export_polls=args.export_polls, faults=faults("rf")
+    )
+    supervisely_server = SuperviselyServer(faults=faults("sly"))
+    try:
+        total_images = prepare_projects(
+            roboflow_server,
+            work_dir,
+            args.projects,
+            args.classification,
+            args.images,
+            args.image_size,
+            args.objects,
+            args.seed,
+        )
+        spec_path = os.path.join(work_dir, "job.json")
+        migration_report_path = os.path.join(work_dir, "migration.json")
+        with open(spec_path, "w") as file:
+            json.dump(
+                {
+                    "roboflow_api_key": ROBOFLOW_API_KEY,
+                    "workspace_id": WORKSPACE_ID,
+                    "concurrency": {
+                        "download": args.download,
+                        "convert": args.convert,
+                        "upload": args.upload,
+                    },
+                },
+                file,
+            )
+
+        with roboflow_server, supervisely_server:
+            env = {
+                "API_URL": roboflow_server.url,
+                "SERVER_ADDRESS": supervisely_server.url,
+                "API_TOKEN": SUPERVISELY_TOKEN,
+                "TEAM_ID": str(TEAM_ID),
+                "WORKSPACE_ID": str(WORKSPACE_ID),
+                "ENV": "production",
+                # * Every run must download and upload everything.
+                "EXPORT_CACHE_MAX_SIZE_GB": "0",
+                "PROJECTS_CACHE_TTL": "0",
+            }
+            started = perf_counter()
+            returncode = run_migration(spec_path, migration_report_path, env, args.timeout)
+            seconds = perf_counter() - started
+            roboflow_stats = roboflow_server.get_stats()
+            supervisely_stats = supervisely_server.get_stats()
+            summary = supervisely_server.get_summary()
+
+        migration = {}
+        if os.path.exists(migration_report_path):
+            with open(migration_report_path, "r") as file:
+                migration = json.load(file)
+        statuses = {}
+        for job in migration.get("jobs", []):
+            for project in job["projects"]:
+                statuses[project["status"]] = statuses.get(project["status"], 0) + 1
+
+        report = {
+            "params": vars(args),
+            "returncode": returncode,
+            "seconds": round(seconds, 3),
+            "expected_images": total_images,
+            "uploaded_images": summary["images"],
+            "images_per_second": round(summary["images"] / seconds, 2),
+            "downloaded_mb_per_second": round(roboflow_stats["bytes_out"] / 1024**2 / seconds, 3),
+            "uploaded_mb_per_second": round(supervisely_stats["bytes_in"] / 1024**2 / seconds, 3),
+            "projects": statuses,
+            "injected_failures": {
+                "roboflow": roboflow_stats["errors"] + roboflow_stats["resets"],
+                "supervisely": supervisely_stats["errors"] + supervisely_stats["resets"],
+            },
+            "roboflow": roboflow_stats,
+            "supervisely": {**supervisely_stats, "stored": summary},
+            "migration": migration,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    sly.logger.info(
+        f"Migrated {report['uploaded_images']} of {report['expected_images']} images "
+        f"in {report['seconds']} seconds ({report['images_per_second']} images/s), "
+        f"projects: {statuses}, injected failures: {report['injected_failures']}."
+    )
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump({key: value for key, value in report.items() if key != "migration"}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0 if returncode == 0 and report["uploaded_images"] == total_images else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
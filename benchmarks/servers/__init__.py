@@ -0,0 +1,5 @@
+from benchmarks.servers.base import Faults, StandInServer
+from benchmarks.servers.roboflow import RoboflowServer
+from benchmarks.servers.supervisely import SuperviselyServer
+
+__all__ = ["Faults", "StandInServer", "RoboflowServer", "SuperviselyServer"]
@@ -0,0 +1,326 @@
+import os
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import supervisely as sly
+
+# * Size of the chunks, in which request and response bodies are read and written,
+# the bandwidth limit is applied per chunk.
+CHUNK_SIZE = 64 * 1024
+
+# * Seconds to wait for the data from the client, like real servers, which close idle connections.
+READ_TIMEOUT = 30
+
+
+class Faults:
+    """Network conditions and failures, which are injected by the stand-in server.
+
+    :param latency: delay before every response in seconds, defaults to 0
+    :type latency: float, optional
+    :param jitter: random extra delay up to this number of seconds, defaults to 0
+    :type jitter: float, optional
+    :param bandwidth: limit of the request and response bodies in bytes per second
+        for every connection, 0 means no limit, defaults to 0
+    :type bandwidth: int, optional
+    :param error_rate: probability of responding with error_status instead of the real response,
+        defaults to 0
+    :type error_rate: float, optional
+    :param error_status: HTTP status of the injected errors, defaults to 503
+    :type error_status: int, optional
+    :param retry_after: value of the Retry-After header of the injected errors in seconds,
+        the header is not sent if it's None, defaults to None
+    :type retry_after: float, optional
+    :param reset_rate: probability of closing the connection without the response, defaults to 0
+    :type reset_rate: float, optional
+    :param paths: failures are injected only into requests, which paths contain any of these
+        substrings (e.g. "images.bulk.upload"), all requests by default
+    :type paths: List[str], optional
+    :param seed: seed of the random generator, defaults to None
+    :type seed: int, optional
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth: int = 0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[float] = None,
+        reset_rate: float = 0.0,
+        paths: Optional[List[str]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.reset_rate = reset_rate
+        self.paths = paths
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "Faults":
+        return cls(**(data or {}))
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def pick_failure(self, path: str) -> Optional[str]:
+        """Returns "reset", "error" or None for the request with the given path."""
+        if self.paths is not None and not any(part in path for part in self.paths):
+            return None
+        with self._lock:
+            value = self._random.random()
+        if value < self.reset_rate:
+            return "reset"
+        if value < self.reset_rate + self.error_rate:
+            return "error"
+        return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Request handler of the stand-in servers: reads the request body with the bandwidth limit,
+    injects failures and passes the request to the route() method of the server."""
+
+    protocol_version = "HTTP/1.1"
+    timeout = READ_TIMEOUT
+    server: "StandInServer"
+
+    def log_message(self, format: str, *args) -> None:
+        sly.logger.debug(f"{self.server.name}: {format % args}")
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        server = self.server
+        started = time()
+        try:
+            body = self._read_body()
+        except TimeoutError:
+            server.count("timeouts")
+            self.close_connection = True
+            return
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        server.count("requests", bytes_in=len(body))
+
+        failure = server.faults.pick_failure(self.path)
+        delay = server.faults.delay()
+        if delay:
+            sleep(delay)
+        if failure == "reset":
+            server.count("resets")
+            self.close_connection = True
+            return
+        if failure == "error":
+            server.count("errors")
+            headers = {}
+            if server.faults.retry_after is not None:
+                headers["Retry-After"] = str(server.faults.retry_after)
+            self.send_json(
+                {"error": "Injected error", "details": {"message": "Injected error"}},
+                server.faults.error_status,
+                headers,
+            )
+            return
+
+        endpoint = url.path
+        try:
+            endpoint = server.route(self, method, url.path, query, body)
+        except Exception as e:
+            sly.logger.warning(f"{server.name}: failed to handle {method} {self.path}: {e}")
+            server.count("failures")
+            self.send_json({"error": str(e), "details": {"message": str(e)}}, 500)
+        server.observe(endpoint, time() - started)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self._read_exactly(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self._read_exactly(int(self.headers.get("Content-Length", 0)))
+
+    def _read_exactly(self, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            started = time()
+            chunk = self.rfile.read(min(size, CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            self._throttle(len(chunk), started)
+        return b"".join(chunks)
+
+    def _throttle(self, size: int, started: float) -> None:
+        bandwidth = self.server.faults.bandwidth
+        if bandwidth:
+            wait = size / bandwidth - (time() - started)
+            if wait > 0:
+                sleep(wait)
+
+    def send_bytes(
+        self,
+        data: bytes,
+        status: int = 200,
+        content_type: str = "application/octet-stream",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Sends the response body in chunks with the bandwidth limit."""
+        chunks = (data[offset : offset + CHUNK_SIZE] for offset in range(0, len(data), CHUNK_SIZE))
+        self._send_chunks(chunks, len(data), status, content_type, headers)
+
+    def send_file(self, path: str, content_type: str = "application/octet-stream") -> None:
+        """Sends the file from the disk in chunks with the bandwidth limit, without reading it
+        into memory."""
+        with open(path, "rb") as file:
+            chunks = iter(lambda: file.read(CHUNK_SIZE), b"")
+            self._send_chunks(chunks, os.path.getsize(path), 200, content_type, None)
+
+    def _send_chunks(
+        self,
+        chunks: Iterator[bytes],
+        length: int,
+        status: int,
+        content_type: str,
+        headers: Optional[Dict[str, str]],
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                started = time()
+                self.wfile.write(chunk)
+                self._throttle(len(chunk), started)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        self.server.count("responses", bytes_out=length)
+
+    def send_json(
+        self, data, status: int = 200, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_bytes(json.dumps(data).encode("utf-8"), status, "application/json", headers)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server, which imitates the external service for the end-to-end benchmarks.
+    It's started in the background thread, subclasses implement route().
+
+    :param name: name of the server in logs and statistics
+    :type name: str
+    :param faults: network conditions and failures to inject, defaults to no failures
+    :type faults: Faults, optional
+    :param host: host to listen on, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: port to listen on, defaults to 0 (any free port)
+    :type port: int, optional
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        name: str,
+        faults: Optional[Faults] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        super().__init__((host, port), StandInHandler)
+        self.name = name
+        self.faults = faults or Faults()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "responses": 0,
+            "errors": 0,
+            "resets": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+        }
+        self._endpoints = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.serve_forever, name=self.name, daemon=True)
+        self._thread.start()
+        sly.logger.info(f"{self.name} stand-in server is listening on {self.url}.")
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def route(
+        self, request: StandInHandler, method: str, path: str, query: Dict, body: bytes
+    ) -> str:
+        """Sends the response to the request and returns the name of the endpoint for statistics."""
+        raise NotImplementedError()
+
+    def count(self, name: str, bytes_in: int = 0, bytes_out: int = 0) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+            self._stats["bytes_in"] += bytes_in
+            self._stats["bytes_out"] += bytes_out
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        with self._stats_lock:
+            stats = self._endpoints.setdefault(endpoint, {"requests": 0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+
+    def get_stats(self) -> Dict:
+        """Returns counters of the server and the number of requests and time per endpoint."""
+        with self._stats_lock:
+            return {
+                **self._stats,
+                "endpoints": {
+                    endpoint: {"requests": stats["requests"], "seconds": round(stats["seconds"], 3)}
+                    for endpoint, stats in sorted(self._endpoints.items())
+                },
+            }
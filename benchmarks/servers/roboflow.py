@@ -0,0 +1,192 @@
+import threading
+from time import time
+from typing import Dict, List, Optional
+
+from benchmarks.servers.base import Faults, StandInHandler, StandInServer
+
+
+class RoboflowServer(StandInServer):
+    """Stand-in of the Roboflow API, which serves the endpoints used by get_configuration(),
+    get_projects() and download_project(): API key check, workspace, project and version info,
+    export status and the export archives themselves.
+
+    The SDK reads the address from the API_URL environment variable, it must be set to the url
+    of the server before the roboflow package is imported. API keys must contain lowercase letters,
+    otherwise the SDK doesn't check them with the API.
+
+    :param api_key: accepted API key
+    :type api_key: str
+    :param workspace: URL name of the workspace
+    :type workspace: str
+    :param export_polls: number of export status requests, which return "not ready yet"
+        before the export link is given, defaults to 0
+    :type export_polls: int, optional
+    :param faults: network conditions and failures to inject
+    :type faults: Faults, optional
+    """
+
+    def __init__(
+        self,
+        api_key: str = "benchmark-key",
+        workspace: str = "benchmark",
+        export_polls: int = 0,
+        faults: Optional[Faults] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        super().__init__("Roboflow", faults, host, port)
+        self.api_key = api_key
+        self.workspace = workspace
+        self.export_polls = export_polls
+        self._projects = {}
+        self._polls = {}
+        self._lock = threading.Lock()
+
+    def add_project(
+        self,
+        name: str,
+        project_type: str,
+        archive_path: str,
+        export_format: str,
+        images: int,
+        classes: Optional[Dict[str, int]] = None,
+        version: int = 1,
+    ) -> str:
+        """Adds the project with one version and its export archive.
+
+        :param name: URL name of the project
+        :type name: str
+        :param project_type: "object-detection", "instance-segmentation" or "classification"
+        :type project_type: str
+        :param archive_path: path to the zip archive of the export
+        :type archive_path: str
+        :param export_format: format of the export, e.g. "coco" or "folder"
+        :type export_format: str
+        :param images: number of images in the project
+        :type images: int
+        :param classes: number of objects by class names
+        :type classes: Dict[str, int], optional
+        :param version: number of the version, defaults to 1
+        :type version: int, optional
+        :return: full ID of the project like "workspace/project"
+        :rtype: str
+        """
+        project_id = f"{self.workspace}/{name}"
+        timestamp = int(time())
+        info = {
+            "id": project_id,
+            "name": name,
+            "type": project_type,
+            "annotation": name,
+            "classes": classes or {},
+            "colors": {},
+            "created": timestamp,
+            "updated": timestamp,
+            "images": images,
+            "public": False,
+            "splits": {},
+            "unannotated": 0,
+            "versions": 1,
+        }
+        version_info = {
+            "id": f"{project_id}/{version}",
+            "name": name,
+            "created": timestamp,
+            "images": images,
+            "splits": {},
+            "augmentation": {},
+            "preprocessing": {},
+            "exports": [export_format],
+            "generating": False,
+        }
+        with self._lock:
+            project = self._projects.setdefault(
+                name, {"info": info, "versions": {}, "archives": {}}
+            )
+            project["info"] = info
+            project["versions"][version] = version_info
+            project["archives"][(version, export_format)] = archive_path
+        return project_id
+
+    def route(
+        self, request: StandInHandler, method: str, path: str, query: Dict, body: bytes
+    ) -> str:
+        parts = [part for part in path.split("/") if part]
+        if parts and parts[0] == "files":
+            return self._send_archive(request, parts[1:])
+
+        if query.get("api_key") != self.api_key:
+            request.send_json({"error": {"message": "This API key does not exist"}}, 401)
+            return "unauthorized"
+
+        if not parts:
+            request.send_json({"welcome": "Welcome to the Roboflow API.", "workspace": self.workspace})
+            return "auth"
+        if parts[0] != self.workspace:
+            return self._not_found(request, f"Workspace {parts[0]} not found")
+        if len(parts) == 1:
+            request.send_json({"workspace": self._workspace_info()})
+            return "workspace"
+
+        with self._lock:
+            project = self._projects.get(parts[1])
+        if project is None:
+            return self._not_found(request, f"Project {parts[1]} not found")
+        if len(parts) == 2:
+            request.send_json(
+                {
+                    "workspace": {"name": self.workspace, "url": self.workspace},
+                    "project": project["info"],
+                    "versions": [project["versions"][key] for key in sorted(project["versions"])],
+                }
+            )
+            return "project"
+
+        version = project["versions"].get(int(parts[2])) if parts[2].isdigit() else None
+        if version is None:
+            return self._not_found(request, f"Version {parts[2]} not found")
+        if len(parts) == 3:
+            request.send_json({"version": version})
+            return "version"
+
+        export_format = parts[3]
+        if (int(parts[2]), export_format) not in project["archives"]:
+            return self._not_found(request, f"Format {export_format} is not available")
+        key = (parts[1], parts[2], export_format)
+        with self._lock:
+            polls = self._polls.get(key, 0)
+            self._polls[key] = polls + 1
+        if polls < self.export_polls:
+            request.send_json({"progress": polls / self.export_polls}, 202)
+            return "export"
+        link = f"{self.url}/files/{parts[1]}/{parts[2]}/{export_format}.zip"
+        request.send_json({"export": {"link": link, "format": export_format}})
+        return "export"
+
+    def _send_archive(self, request: StandInHandler, parts: List[str]) -> str:
+        if len(parts) != 3 or not parts[1].isdigit():
+            return self._not_found(request, "File not found")
+        name, version, file_name = parts
+        with self._lock:
+            project = self._projects.get(name)
+        archive_path = None
+        if project is not None:
+            archive_path = project["archives"].get((int(version), file_name[: -len(".zip")]))
+        if archive_path is None:
+            return self._not_found(request, "File not found")
+        request.send_file(archive_path, "application/zip")
+        return "download"
+
+    def _workspace_info(self) -> Dict:
+        with self._lock:
+            projects = [project["info"] for _, project in sorted(self._projects.items())]
+        return {
+            "name": self.workspace,
+            "url": self.workspace,
+            "members": [],
+            "projects": projects,
+        }
+
+    def _not_found(self, request: StandInHandler, message: str) -> str:
+        request.send_json({"error": {"message": message}}, 404)
+        return "not_found"
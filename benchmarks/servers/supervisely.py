@@ -0,0 +1,458 @@
+import io
+import json
+import base64
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from benchmarks.servers.base import Faults, StandInHandler, StandInServer
+
+# * Prefix of the public API methods, e.g. /public/api/v3/projects.info.
+API_PREFIX = "/public/api/v3/"
+
+
+class SuperviselyServer(StandInServer):
+    """Stand-in of the Supervisely public API with in-memory storage, which serves the methods
+    used by the upload of the converted projects: projects and datasets, project meta, images
+    (upload by data and by hash, listing and removal), annotations, image tags and Team Files,
+    which are used by the checkpoint and the sync state.
+
+    Uploaded image data is not kept, only hashes and sizes, so big benchmarks don't use the memory.
+
+    :param faults: network conditions and failures to inject
+    :type faults: Faults, optional
+    """
+
+    def __init__(
+        self, faults: Optional[Faults] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        super().__init__("Supervisely", faults, host, port)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.projects = {}
+        self.datasets = {}
+        self.images = {}
+        self.metas = {}
+        self.blobs = {}
+        self.image_sizes = {}
+        self.annotations = {}
+        self.files = {}
+        self._methods = {
+            "instance.version": lambda data, query: {"version": "6.14.0"},
+            "projects.info": self._project_info,
+            "projects.list": self._projects_list,
+            "projects.add": self._project_add,
+            "projects.meta": self._project_meta,
+            "projects.meta.update": self._project_meta_update,
+            "projects.settings.update": lambda data, query: {"success": True},
+            "datasets.info": self._dataset_info,
+            "datasets.list": self._datasets_list,
+            "datasets.add": self._dataset_add,
+            "images.list": self._images_list,
+            "images.info": self._image_info,
+            "images.internal.hashes.list": self._hashes_list,
+            "images.bulk.upload": self._images_upload,
+            "images.bulk.add": self._images_add,
+            "images.bulk.remove": self._images_remove,
+            "annotations.bulk.add": self._annotations_add,
+            "image-tags.bulk.add-to-image": self._tags_add,
+            "file-storage.list": self._files_list,
+            "file-storage.info": self._file_info,
+            "file-storage.upload": self._file_upload,
+            "file-storage.bulk.upload": self._files_upload,
+            "file-storage.download": self._file_download,
+            "file-storage.remove": self._file_remove,
+        }
+
+    def get_summary(self) -> Dict[str, int]:
+        """Returns the number of stored entities, e.g. to check the results of the benchmark."""
+        with self._lock:
+            return {
+                "projects": len(self.projects),
+                "datasets": len(self.datasets),
+                "images": len(self.images),
+                "blobs": len(self.blobs),
+                "blobs_bytes": sum(self.blobs.values()),
+                "annotations": len(self.annotations),
+                "tagged_images": sum(1 for image in self.images.values() if image["tags"]),
+            }
+
+    def route(
+        self, request: StandInHandler, method: str, path: str, query: Dict, body: bytes
+    ) -> str:
+        if not path.startswith(API_PREFIX):
+            request.send_json({"error": "Not found"}, 404)
+            return "not_found"
+        name = path[len(API_PREFIX) :]
+        handler = self._methods.get(name)
+        if handler is None:
+            request.send_json({"error": f"Unknown method {name}"}, 404)
+            return name
+
+        content_type = request.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/"):
+            data = _parse_multipart(content_type, body)
+        elif name == "file-storage.download":
+            data = json.loads(body) if body else dict(query)
+        else:
+            data = json.loads(body) if body else {}
+        result = handler(data, query)
+        if isinstance(result, tuple):
+            request.send_json(*result)
+        elif isinstance(result, bytes):
+            request.send_bytes(result)
+        else:
+            request.send_json(result)
+        return name
+
+    # Projects and datasets.
+
+    def _new_id(self) -> int:
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    def _project_info(self, data: Dict, _) -> Any:
+        with self._lock:
+            project = self.projects.get(data["id"])
+            return dict(project) if project else _not_found("Project")
+
+    def _projects_list(self, data: Dict, _) -> Dict:
+        with self._lock:
+            projects = [
+                dict(project)
+                for project in self.projects.values()
+                if project["workspaceId"] == data.get("workspaceId")
+            ]
+        return _page(_filter(projects, data.get("filter")))
+
+    def _project_add(self, data: Dict, _) -> Any:
+        with self._lock:
+            if any(
+                project["name"] == data["name"] and project["workspaceId"] == data["workspaceId"]
+                for project in self.projects.values()
+            ):
+                return _conflict(f"Project {data['name']} already exists")
+            project = {
+                "id": self._new_id(),
+                "name": data["name"],
+                "description": data.get("description", ""),
+                "workspaceId": data["workspaceId"],
+                "type": data.get("type", "images"),
+                "imagesCount": 0,
+                "datasetsCount": 0,
+                "createdAt": _now(),
+                "updatedAt": _now(),
+                "customData": data.get("customData", {}),
+                "settings": data.get("settings", {}),
+            }
+            self.projects[project["id"]] = project
+            self.metas[project["id"]] = {"classes": [], "tags": [], "projectType": "images"}
+            return dict(project)
+
+    def _project_meta(self, data: Dict, _) -> Any:
+        with self._lock:
+            meta = self.metas.get(data["id"])
+            return meta if meta is not None else _not_found("Project")
+
+    def _project_meta_update(self, data: Dict, _) -> Any:
+        with self._lock:
+            if data["id"] not in self.projects:
+                return _not_found("Project")
+            meta = data["meta"]
+            # * Server assigns IDs to the new classes and tags, they are used to add tags to images.
+            for item in meta.get("classes", []) + meta.get("tags", []):
+                item.setdefault("id", self._new_id())
+            self.metas[data["id"]] = meta
+            return meta
+
+    def _dataset_info(self, data: Dict, _) -> Any:
+        with self._lock:
+            dataset = self.datasets.get(data["id"])
+            return dict(dataset) if dataset else _not_found("Dataset")
+
+    def _datasets_list(self, data: Dict, _) -> Dict:
+        with self._lock:
+            datasets = [
+                dict(dataset)
+                for dataset in self.datasets.values()
+                if dataset["projectId"] == data.get("projectId")
+            ]
+        return _page(_filter(datasets, data.get("filter")))
+
+    def _dataset_add(self, data: Dict, _) -> Any:
+        with self._lock:
+            project = self.projects.get(data["projectId"])
+            if project is None:
+                return _not_found("Project")
+            if any(
+                dataset["name"] == data["name"] and dataset["projectId"] == project["id"]
+                for dataset in self.datasets.values()
+            ):
+                return _conflict(f"Dataset {data['name']} already exists")
+            dataset = {
+                "id": self._new_id(),
+                "name": data["name"],
+                "description": data.get("description", ""),
+                "projectId": project["id"],
+                "workspaceId": project["workspaceId"],
+                "parentId": data.get("parentId"),
+                "imagesCount": 0,
+                "createdAt": _now(),
+                "updatedAt": _now(),
+            }
+            self.datasets[dataset["id"]] = dataset
+            project["datasetsCount"] += 1
+            return dict(dataset)
+
+    # Images and annotations.
+
+    def _images_list(self, data: Dict, _) -> Dict:
+        with self._lock:
+            images = [
+                dict(image)
+                for image in self.images.values()
+                if image["datasetId"] == data.get("datasetId")
+            ]
+        return _page(_filter(images, data.get("filter")))
+
+    def _image_info(self, data: Dict, _) -> Any:
+        with self._lock:
+            image = self.images.get(data["id"])
+            return dict(image) if image else _not_found("Image")
+
+    def _hashes_list(self, data: List[str], _) -> List[str]:
+        with self._lock:
+            return [image_hash for image_hash in data if image_hash in self.blobs]
+
+    def _images_upload(self, parts: List[Tuple[str, bytes]], _) -> List[Dict]:
+        result = []
+        for _, content in parts:
+            image_hash = base64.b64encode(hashlib.sha256(content).digest()).decode("utf-8")
+            with self._lock:
+                self.blobs[image_hash] = len(content)
+                self.image_sizes[image_hash] = _image_size(content)
+            result.append({"hash": image_hash})
+        return result
+
+    def _images_add(self, data: Dict, _) -> Any:
+        with self._lock:
+            dataset = self.datasets.get(data["datasetId"])
+            if dataset is None:
+                return _not_found("Dataset")
+            existing = {
+                image["name"]: image["id"]
+                for image in self.images.values()
+                if image["datasetId"] == dataset["id"]
+            }
+            conflicts = [
+                {"name": item["title"], "id": existing[item["title"]]}
+                for item in data["images"]
+                if item["title"] in existing
+            ]
+            if conflicts:
+                return (
+                    {
+                        "error": "Images with the same names already exist",
+                        "details": {"type": "NONUNIQUE", "errors": conflicts},
+                    },
+                    400,
+                )
+            missing = [item["hash"] for item in data["images"] if item["hash"] not in self.blobs]
+            if missing:
+                return ({"error": f"Unknown hashes: {missing[:5]}"}, 400)
+
+            result = []
+            for item in data["images"]:
+                width, height = self.image_sizes.get(item["hash"], (None, None))
+                image = {
+                    "id": self._new_id(),
+                    "name": item["title"],
+                    "hash": item["hash"],
+                    "mime": "image/jpeg",
+                    "ext": "jpeg",
+                    "size": self.blobs[item["hash"]],
+                    "width": width,
+                    "height": height,
+                    "labelsCount": 0,
+                    "datasetId": dataset["id"],
+                    "projectId": dataset["projectId"],
+                    "createdAt": _now(),
+                    "updatedAt": _now(),
+                    "meta": item.get("meta", {}),
+                    "tags": [],
+                }
+                self.images[image["id"]] = image
+                result.append(dict(image))
+            dataset["imagesCount"] += len(result)
+            self.projects[dataset["projectId"]]["imagesCount"] += len(result)
+            return result
+
+    def _images_remove(self, data: Dict, _) -> Dict:
+        with self._lock:
+            for image_id in data.get("imageIds", []):
+                image = self.images.pop(image_id, None)
+                self.annotations.pop(image_id, None)
+                if image is not None:
+                    self.datasets[image["datasetId"]]["imagesCount"] -= 1
+                    self.projects[image["projectId"]]["imagesCount"] -= 1
+        return {"success": True}
+
+    def _annotations_add(self, data: Dict, _) -> Any:
+        with self._lock:
+            for item in data["annotations"]:
+                image = self.images.get(item["imageId"])
+                if image is None:
+                    return _not_found(f"Image {item['imageId']}")
+                annotation = item["annotation"]
+                self.annotations[image["id"]] = annotation
+                image["labelsCount"] = len(annotation.get("objects", []))
+                # * Image tags of the annotation replace the tags of the image, as on the server.
+                tag_ids = {
+                    tag["name"]: tag["id"]
+                    for tag in self.metas.get(image["projectId"], {}).get("tags", [])
+                }
+                image["tags"] = [
+                    {
+                        "tagId": tag_ids.get(tag["name"]),
+                        "value": tag.get("value"),
+                        "id": self._new_id(),
+                    }
+                    for tag in annotation.get("tags", [])
+                ]
+        return {"success": True}
+
+    def _tags_add(self, data: Dict, _) -> Any:
+        with self._lock:
+            for image_id in data["ids"]:
+                image = self.images.get(image_id)
+                if image is None:
+                    return _not_found(f"Image {image_id}")
+                image["tags"].append(
+                    {"tagId": data["tagId"], "value": data.get("value"), "id": self._new_id()}
+                )
+        return {"success": True}
+
+    # Team Files.
+
+    def _files_list(self, data: Dict, _) -> Any:
+        path = data.get("path", "/")
+        with self._lock:
+            files = [
+                self._file_json(team_id, file_path)
+                for (team_id, file_path) in self.files
+                if team_id == data.get("teamId") and file_path.startswith(path)
+            ]
+        return files
+
+    def _file_info(self, data: Dict, _) -> Any:
+        with self._lock:
+            for (team_id, path), file in self.files.items():
+                if file["id"] == data.get("id"):
+                    return self._file_json(team_id, path)
+        return _not_found("File")
+
+    def _file_upload(self, parts: List[Tuple[str, bytes]], query: Dict) -> Any:
+        fields = dict(parts)
+        return self._save_file(int(query["teamId"]), fields["path"].decode("utf-8"), fields["file"])
+
+    def _files_upload(self, parts: List[Tuple[str, bytes]], query: Dict) -> List[Dict]:
+        """Bulk upload sends name, directory and content of every file one after another."""
+        result = []
+        fields = {}
+        for name, content in parts:
+            if name == "file":
+                path = fields["path"].decode("utf-8") + fields["name"].decode("utf-8")
+                result.append(self._save_file(int(query["teamId"]), path, content))
+            else:
+                fields[name] = content
+        return result
+
+    def _save_file(self, team_id: int, path: str, data: bytes) -> Dict:
+        with self._lock:
+            self.files[(team_id, path)] = {"id": self._new_id(), "data": data}
+            return self._file_json(team_id, path)
+
+    def _file_download(self, data: Dict, _) -> Any:
+        with self._lock:
+            file = self.files.get((int(data.get("teamId", 0)), data.get("path")))
+            if file is None:
+                for stored in self.files.values():
+                    if stored["id"] == data.get("id"):
+                        file = stored
+            return file["data"] if file else _not_found("File")
+
+    def _file_remove(self, data: Dict, _) -> Dict:
+        with self._lock:
+            self.files.pop((data.get("teamId"), data.get("path")), None)
+        return {"success": True}
+
+    def _file_json(self, team_id: int, path: str) -> Dict:
+        file = self.files[(team_id, path)]
+        return {
+            "teamId": team_id,
+            "id": file["id"],
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "isDir": False,
+            "meta": {"size": len(file["data"]), "mime": "application/json", "ext": "json"},
+            "createdAt": _now(),
+            "updatedAt": _now(),
+        }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _page(entities: List[Dict]) -> Dict:
+    """Returns all entities as one page, the SDK requests the next pages only if there are any."""
+    return {
+        "total": len(entities),
+        "perPage": max(1, len(entities)),
+        "pagesCount": 1,
+        "entities": entities,
+    }
+
+
+def _filter(entities: List[Dict], filters: Optional[List[Dict]]) -> List[Dict]:
+    for item in filters or []:
+        field, operator, value = item["field"], item.get("operator", "="), item["value"]
+        if operator == "=":
+            entities = [entity for entity in entities if entity.get(field) == value]
+        elif operator == "in":
+            entities = [entity for entity in entities if entity.get(field) in value]
+        elif operator == "!=":
+            entities = [entity for entity in entities if entity.get(field) != value]
+    return entities
+
+
+def _not_found(name: str) -> Tuple[Dict, int]:
+    return {"error": f"{name} not found", "details": {"message": f"{name} not found"}}, 404
+
+
+def _conflict(message: str) -> Tuple[Dict, int]:
+    return {"error": message, "details": {"message": message}}, 400
+
+
+def _image_size(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def _parse_multipart(content_type: str, body: bytes) -> List[Tuple[str, bytes]]:
+    """Returns (field name, content) of the parts of the multipart/form-data body in their order."""
+    header = f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+    message = BytesParser(policy=HTTP).parsebytes(header + body)
+    return [
+        (part.get_param("name", header="content-disposition"), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    ]
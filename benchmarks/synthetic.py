@@ -0,0 +1,316 @@
+"""Generators of synthetic Roboflow-style COCO data for benchmarks.
+
+Objects are random star-shaped polygons, a part of them has a hole (the second ring of the
+segmentation, which is completely inside the first one, as Roboflow exports them) and a part
+is encoded as compressed RLE masks (iscrowd=1). All generators are deterministic for the same seed.
+"""
+
+import os
+import json
+import random
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+import pycocotools.mask as mask_util
+
+from src.layout import COCO_ANNOTATIONS_FILE
+
+# * Categories of the synthetic exports, the first one is the Roboflow supercategory.
+CATEGORIES = [
+    {"id": 0, "name": "objects", "supercategory": "none"},
+    {"id": 1, "name": "cat", "supercategory": "objects"},
+    {"id": 2, "name": "dog", "supercategory": "objects"},
+    {"id": 3, "name": "bird", "supercategory": "objects"},
+]
+
+
+def make_ring(
+    rng: random.Random, center: Tuple[float, float], radius: float, vertices: int
+) -> np.ndarray:
+    """Returns (vertices, 2) array of x, y points of a random star-shaped polygon,
+    all points are within the radius from the center.
+
+    :param rng: random generator
+    :type rng: random.Random
+    :param center: x, y of the center of the polygon
+    :type center: Tuple[float, float]
+    :param radius: maximum distance from the center to the vertices
+    :type radius: float
+    :param vertices: number of vertices, at least 3
+    :type vertices: int
+    :rtype: np.ndarray
+    """
+    vertices = max(3, vertices)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radiuses = np.array([rng.uniform(0.6, 1.0) * radius for _ in range(vertices)])
+    cx, cy = center
+    return np.stack([cx + radiuses * np.cos(angles), cy + radiuses * np.sin(angles)], axis=1)
+
+
+def make_object(
+    rng: random.Random,
+    object_id: int,
+    image_id: int,
+    image_size: Tuple[int, int],
+    vertices: int,
+    with_hole: bool = False,
+    as_rle: bool = False,
+) -> Dict:
+    """Returns COCO annotation of one random object of the image.
+
+    :param rng: random generator
+    :type rng: random.Random
+    :param object_id: ID of the annotation
+    :type object_id: int
+    :param image_id: ID of the image
+    :type image_id: int
+    :param image_size: height and width of the image
+    :type image_size: Tuple[int, int]
+    :param vertices: number of vertices of the outer ring
+    :type vertices: int
+    :param with_hole: if True, the object has a hole, defaults to False
+    :type with_hole: bool, optional
+    :param as_rle: if True, segmentation is a compressed RLE mask, defaults to False
+    :type as_rle: bool, optional
+    :rtype: Dict
+    """
+    height, width = image_size
+    radius = rng.uniform(0.05, 0.2) * min(height, width)
+    center = (rng.uniform(radius, width - radius), rng.uniform(radius, height - radius))
+    rings = [make_ring(rng, center, radius, vertices)]
+    if with_hole:
+        # * Outer ring is at least 0.6 of the radius from the center, so the hole is inside it.
+        rings.append(make_ring(rng, center, radius * 0.4, max(3, vertices // 2)))
+
+    x_min, y_min = rings[0].min(axis=0)
+    x_max, y_max = rings[0].max(axis=0)
+    bbox = [float(x_min), float(y_min), float(x_max - x_min), float(y_max - y_min)]
+
+    if as_rle:
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [np.round(rings[0]).astype(np.int32)], 1)
+        if with_hole:
+            cv2.fillPoly(mask, [np.round(rings[1]).astype(np.int32)], 0)
+        rle = mask_util.encode(np.asfortranarray(mask))
+        segmentation = {"size": [height, width], "counts": rle["counts"].decode("utf-8")}
+        area = float(mask_util.area(rle))
+        iscrowd = 1
+    else:
+        segmentation = [[round(float(value), 2) for value in ring.ravel()] for ring in rings]
+        area = bbox[2] * bbox[3]
+        iscrowd = 0
+
+    return {
+        "id": object_id,
+        "image_id": image_id,
+        "category_id": rng.randint(1, len(CATEGORIES) - 1),
+        "bbox": [round(value, 2) for value in bbox],
+        "area": round(area, 2),
+        "segmentation": segmentation,
+        "iscrowd": iscrowd,
+    }
+
+
+def make_image_annotations(
+    rng: random.Random,
+    image_id: int,
+    image_size: Tuple[int, int],
+    objects: int,
+    vertices: int,
+    hole_ratio: float = 0.0,
+    rle_ratio: float = 0.0,
+    first_object_id: int = 0,
+) -> List[Dict]:
+    """Returns COCO annotations of all objects of one image.
+
+    :param hole_ratio: share of the objects with holes, from 0 to 1
+    :type hole_ratio: float
+    :param rle_ratio: share of the objects with RLE segmentation, from 0 to 1
+    :type rle_ratio: float
+    :param first_object_id: ID of the first annotation, next ones are incremented
+    :type first_object_id: int
+    :rtype: List[Dict]
+    """
+    return [
+        make_object(
+            rng,
+            first_object_id + idx,
+            image_id,
+            image_size,
+            vertices,
+            with_hole=rng.random() < hole_ratio,
+            as_rle=rng.random() < rle_ratio,
+        )
+        for idx in range(objects)
+    ]
+
+
+def make_image(image_id: int, image_size: Tuple[int, int]) -> bytes:
+    """Returns JPEG data of the synthetic image, images with different IDs have different data."""
+    height, width = image_size
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:, :, 0] = gradient
+    image[:, :, 1] = gradient[::-1]
+    image[:, :, 2] = image_id % 256
+    # * Encode the ID in the first row, so the images are unique even for the same color.
+    image[0, :32, 0] = [(image_id >> bit & 1) * 255 for bit in range(32)]
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def generate_coco_export(
+    directory: str,
+    splits: Tuple[str, ...] = ("train", "valid", "test"),
+    images: int = 100,
+    image_size: Tuple[int, int] = (640, 640),
+    objects: int = 5,
+    vertices: int = 16,
+    hole_ratio: float = 0.1,
+    rle_ratio: float = 0.1,
+    seed: int = 0,
+    write_images: bool = True,
+) -> Dict[str, int]:
+    """Writes the synthetic export in Roboflow COCO layout:
+    <split>/_annotations.coco.json and <split>/<image files>. Images are split evenly.
+
+    :param directory: directory of the export, it must not exist or be empty
+    :type directory: str
+    :param splits: names of the splits
+    :type splits: Tuple[str, ...]
+    :param images: total number of images in all splits
+    :type images: int
+    :param image_size: height and width of the images
+    :type image_size: Tuple[int, int]
+    :param objects: number of objects on each image
+    :type objects: int
+    :param vertices: number of vertices of the polygons
+    :type vertices: int
+    :param hole_ratio: share of the objects with holes, from 0 to 1
+    :type hole_ratio: float
+    :param rle_ratio: share of the objects with RLE segmentation, from 0 to 1
+    :type rle_ratio: float
+    :param seed: seed of the random generator
+    :type seed: int
+    :param write_images: if False, only annotation files are written, defaults to True
+    :type write_images: bool, optional
+    :return: number of images, objects and bytes of the written files
+    :rtype: Dict[str, int]
+    """
+    rng = random.Random(seed)
+    height, width = image_size
+    summary = {"images": 0, "objects": 0, "bytes": 0}
+    image_id = 0
+    for split_idx, split_name in enumerate(splits):
+        split_dir = os.path.join(directory, split_name)
+        os.makedirs(split_dir, exist_ok=True)
+        split_images = images // len(splits) + (1 if split_idx < images % len(splits) else 0)
+
+        image_infos, annotations = [], []
+        for _ in range(split_images):
+            file_name = f"image_{image_id:07d}_jpg.rf.{image_id:08x}.jpg"
+            image_infos.append(
+                {"id": image_id, "file_name": file_name, "height": height, "width": width}
+            )
+            annotations.extend(
+                make_image_annotations(
+                    rng,
+                    image_id,
+                    image_size,
+                    objects,
+                    vertices,
+                    hole_ratio,
+                    rle_ratio,
+                    first_object_id=summary["objects"] + len(annotations),
+                )
+            )
+            if write_images:
+                data = make_image(image_id, image_size)
+                with open(os.path.join(split_dir, file_name), "wb") as file:
+                    file.write(data)
+                summary["bytes"] += len(data)
+            image_id += 1
+
+        annotations_path = os.path.join(split_dir, COCO_ANNOTATIONS_FILE)
+        with open(annotations_path, "w") as file:
+            json.dump(
+                {
+                    "info": {"description": "Synthetic export for benchmarks"},
+                    "categories": CATEGORIES,
+                    "images": image_infos,
+                    "annotations": annotations,
+                },
+                file,
+            )
+        summary["bytes"] += os.path.getsize(annotations_path)
+        summary["images"] += len(image_infos)
+        summary["objects"] += len(annotations)
+
+    return summary
+
+
+def make_coco_dataset(
+    images: int = 100,
+    image_size: Tuple[int, int] = (640, 640),
+    objects: int = 5,
+    vertices: int = 16,
+    hole_ratio: float = 0.1,
+    rle_ratio: float = 0.1,
+    seed: int = 0,
+) -> List[Tuple[Tuple[int, int], List[Dict]]]:
+    """Returns in-memory synthetic data: (image size, COCO annotations of the image) for each image,
+    the same as generate_coco_export() writes, but without files.
+
+    :rtype: List[Tuple[Tuple[int, int], List[Dict]]]
+    """
+    rng = random.Random(seed)
+    dataset = []
+    first_object_id = 0
+    for image_id in range(images):
+        anns = make_image_annotations(
+            rng, image_id, image_size, objects, vertices, hole_ratio, rle_ratio, first_object_id
+        )
+        first_object_id += len(anns)
+        dataset.append((image_size, anns))
+    return dataset
+
+
+def generate_folder_export(
+    directory: str,
+    splits: Tuple[str, ...] = ("train", "valid", "test"),
+    images: int = 100,
+    image_size: Tuple[int, int] = (640, 640),
+    classes: Tuple[str, ...] = ("cat", "dog", "bird"),
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Writes the synthetic classification export in Roboflow folder layout:
+    <split>/<class name>/<image files>. Images are split evenly, classes are random.
+
+    :param directory: directory of the export, it must not exist or be empty
+    :type directory: str
+    :param splits: names of the splits
+    :type splits: Tuple[str, ...]
+    :param images: total number of images in all splits
+    :type images: int
+    :param image_size: height and width of the images
+    :type image_size: Tuple[int, int]
+    :param classes: names of the classes
+    :type classes: Tuple[str, ...]
+    :param seed: seed of the random generator
+    :type seed: int
+    :return: number of images and bytes of the written files
+    :rtype: Dict[str, int]
+    """
+    rng = random.Random(seed)
+    summary = {"images": 0, "bytes": 0}
+    for image_id in range(images):
+        split_name = splits[image_id % len(splits)]
+        class_dir = os.path.join(directory, split_name, rng.choice(classes))
+        os.makedirs(class_dir, exist_ok=True)
+        data = make_image(image_id, image_size)
+        file_name = f"image_{image_id:07d}_jpg.rf.{image_id:08x}.jpg"
+        with open(os.path.join(class_dir, file_name), "wb") as file:
+            file.write(data)
+        summary["images"] += 1
+        summary["bytes"] += len(data)
+    return summary
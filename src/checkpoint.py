@@ -0,0 +1,80 @@
+from typing import Dict, Optional
+
+from src.storage import JsonStore
+
+
+class Checkpoint(JsonStore):
+    """Manifest with the progress of the migration, which allows to resume it after the restart.
+    For each Roboflow project stores ID of the created Supervisely project and for each dataset
+    its ID and number of items, which were already uploaded with annotations.
+
+    The manifest is saved to the local file on every change and mirrored to Team Files
+    not more often than once in sync_interval seconds (and on every finished project),
+    so it survives the restart of the app container.
+    """
+
+    def clear(self) -> None:
+        """Removes all progress from the manifest, e.g. after the migration was fully finished."""
+        with self._lock:
+            self._data["projects"] = {}
+            self.save(force_sync=True)
+
+    def is_finished(self, project_id: str) -> bool:
+        project = self.get_project(project_id)
+        return project is not None and project.get("finished", False)
+
+    def start_project(self, project_id: str, sly_project_id: int) -> None:
+        with self._lock:
+            self._data["projects"][str(project_id)] = {
+                "project_id": sly_project_id,
+                "url": None,
+                "finished": False,
+                "datasets": {},
+            }
+            self.save()
+
+    def finish_project(self, project_id: str, url: str) -> None:
+        with self._lock:
+            project = self._data["projects"][str(project_id)]
+            project["url"] = url
+            project["finished"] = True
+            self.save(force_sync=True)
+
+    def get_dataset(self, project_id: str, dataset_name: str) -> Optional[Dict]:
+        """Returns progress of the dataset or None if it wasn't created yet.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :param dataset_name: name of the dataset (split)
+        :type dataset_name: str
+        :return: dictionary with dataset_id, items_done and finished keys
+        :rtype: Optional[Dict]
+        """
+        with self._lock:
+            project = self._data["projects"].get(str(project_id))
+            if project is None:
+                return None
+            return project["datasets"].get(dataset_name)
+
+    def start_dataset(self, project_id: str, dataset_name: str, dataset_id: int) -> None:
+        with self._lock:
+            project = self._data["projects"][str(project_id)]
+            project["datasets"][dataset_name] = {
+                "dataset_id": dataset_id,
+                "items_done": 0,
+                "finished": False,
+            }
+            self.save()
+
+    def add_items(self, project_id: str, dataset_name: str, count: int) -> None:
+        """Increases the number of uploaded items of the dataset after the batch was uploaded."""
+        with self._lock:
+            dataset = self._data["projects"][str(project_id)]["datasets"][dataset_name]
+            dataset["items_done"] += count
+            self.save()
+
+    def finish_dataset(self, project_id: str, dataset_name: str) -> None:
+        with self._lock:
+            dataset = self._data["projects"][str(project_id)]["datasets"][dataset_name]
+            dataset["finished"] = True
+            self.save()
@@ -0,0 +1,298 @@
+import os
+import json
+import sqlite3
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import supervisely as sly
+
+
+class JsonStream:
+    """Incremental reader of the JSON document, which decodes only requested values,
+    so big arrays can be iterated item by item without loading the whole file in memory.
+
+    :param path: path to the JSON file
+    :type path: str
+    :param chunk_size: number of characters to read from the file at once, defaults to 1 MiB
+    :type chunk_size: int, optional
+    :param opener: function, which opens the file by its path as a text stream,
+        e.g. to read it from the zip archive, defaults to open() in UTF-8
+    :type opener: Callable[[str], TextIO], optional
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 1 << 20,
+        opener: Optional[Callable[[str], TextIO]] = None,
+    ):
+        self._file = (opener or _open_text)(path)
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        if self._eof:
+            return False
+        data = self._file.read(size or self._chunk_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos :] + data
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer):
+                char = self._buffer[self._pos]
+                if char not in self.WHITESPACE:
+                    return char
+                self._pos += 1
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON file.")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON, got {char!r}.")
+        self._pos += 1
+        return char
+
+    def read_value(self) -> Any:
+        """Decodes the next JSON value."""
+        is_scalar = self._peek() not in '{["'
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # * Value is not fully in the buffer yet, read more (twice as much every time).
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            if is_scalar and len(self._buffer) - end < 64 and self._fill(size):
+                # * Numbers and literals can be cut by the end of the buffer.
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        """Skips the next JSON value, arrays and objects are skipped item by item,
+        so they are never fully loaded in memory."""
+        char = self._peek()
+        if char == "[":
+            self._expect("[")
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            while True:
+                self.skip_value()
+                if self._expect(",]") == "]":
+                    return
+        elif char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self.read_value()
+
+    def iter_array(self) -> Iterator[Any]:
+        """Decodes values of the next JSON array one by one."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self._expect(",]") == "]":
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Iterates over keys of the next JSON object. After each key, the caller must
+        consume its value with read_value(), skip_value() or iter_array()."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+
+def _open_text(path: str) -> TextIO:
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_coco_array(
+    path: str, name: str, opener: Optional[Callable[[str], TextIO]] = None
+) -> Iterator[Any]:
+    """Iterates over items of the top level array in COCO JSON file (e.g. "images" or "annotations").
+
+    :param path: path to the COCO JSON file
+    :type path: str
+    :param name: name of the top level array
+    :type name: str
+    :param opener: function, which opens the file as a text stream, defaults to open() in UTF-8
+    :type opener: Callable[[str], TextIO], optional
+    :return: iterator over items of the array
+    :rtype: Iterator[Any]
+    """
+    stream = JsonStream(path, opener=opener)
+    try:
+        for key in stream.iter_object():
+            if key == name:
+                yield from stream.iter_array()
+                return
+            stream.skip_value()
+    finally:
+        stream.close()
+
+
+class CocoReader:
+    """Reads COCO annotations file in a streaming way and groups annotations by images.
+
+    The first pass reads categories and checks if annotations are grouped by images in the
+    same order as images are listed (Roboflow exports are ordered this way). In this case images
+    and annotations are read with two streams at the same time. Otherwise annotations are written
+    to the temporary SQLite index on disk, so memory usage does not depend on the size of the file.
+
+    :param path: path to the COCO JSON file
+    :type path: str
+    :param index_dir: directory for the temporary index, defaults to the directory of the file
+    :type index_dir: str, optional
+    :param opener: function, which opens the file as a text stream, e.g. to read it
+        from the zip archive without extracting, defaults to open() in UTF-8
+    :type opener: Callable[[str], TextIO], optional
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index_dir: Optional[str] = None,
+        opener: Optional[Callable[[str], TextIO]] = None,
+    ):
+        self.path = path
+        self.index_dir = index_dir or os.path.dirname(os.path.abspath(path))
+        self.opener = opener
+        self.categories = []
+        self.images_count = 0
+        self.grouped = True
+        self._index_path = None
+
+        self._first_pass()
+
+    def _first_pass(self) -> None:
+        image_positions = {}
+        stream = JsonStream(self.path, opener=self.opener)
+        try:
+            for key in stream.iter_object():
+                if key == "categories":
+                    self.categories = stream.read_value()
+                elif key == "images":
+                    for image_info in stream.iter_array():
+                        image_positions[image_info["id"]] = self.images_count
+                        self.images_count += 1
+                else:
+                    stream.skip_value()
+        finally:
+            stream.close()
+
+        # * Annotations are grouped if image positions are not decreasing
+        # and there are no annotations for unknown images.
+        last_position = -1
+        for ann in iter_coco_array(self.path, "annotations", self.opener):
+            position = image_positions.get(ann["image_id"], -1)
+            if position < last_position or position < 0:
+                self.grouped = False
+                break
+            last_position = position
+
+        sly.logger.debug(
+            f"Read {self.path}: {self.images_count} images, {len(self.categories)} categories, "
+            f"annotations grouped by images: {self.grouped}."
+        )
+
+        if not self.grouped:
+            self._build_index(image_positions)
+
+    def _build_index(self, image_positions: Dict[int, int]) -> None:
+        fd, self._index_path = tempfile.mkstemp(suffix=".sqlite", dir=self.index_dir)
+        os.close(fd)
+        sly.logger.debug(f"Building annotations index in {self._index_path}.")
+
+        connection = sqlite3.connect(self._index_path)
+        try:
+            connection.execute(
+                "CREATE TABLE anns (image_position INTEGER, ann_position INTEGER, ann TEXT)"
+            )
+            batch = []
+            anns = iter_coco_array(self.path, "annotations", self.opener)
+            for ann_position, ann in enumerate(anns):
+                position = image_positions.get(ann["image_id"])
+                if position is None:
+                    continue
+                batch.append((position, ann_position, json.dumps(ann)))
+                if len(batch) >= 10000:
+                    connection.executemany("INSERT INTO anns VALUES (?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                connection.executemany("INSERT INTO anns VALUES (?, ?, ?)", batch)
+            connection.execute(
+                "CREATE INDEX anns_by_image ON anns (image_position, ann_position)"
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def __iter__(self) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """Yields (image info, list of image annotations) in the order of images in the file."""
+        if self.grouped:
+            yield from self._iter_grouped()
+        else:
+            yield from self._iter_indexed()
+
+    def _iter_grouped(self) -> Iterator[Tuple[Dict, List[Dict]]]:
+        anns = iter_coco_array(self.path, "annotations", self.opener)
+        pending = next(anns, None)
+        for image_info in iter_coco_array(self.path, "images", self.opener):
+            image_anns = []
+            while pending is not None and pending["image_id"] == image_info["id"]:
+                image_anns.append(pending)
+                pending = next(anns, None)
+            yield image_info, image_anns
+
+    def _iter_indexed(self) -> Iterator[Tuple[Dict, List[Dict]]]:
+        connection = sqlite3.connect(self._index_path)
+        try:
+            images = iter_coco_array(self.path, "images", self.opener)
+            for position, image_info in enumerate(images):
+                rows = connection.execute(
+                    "SELECT ann FROM anns WHERE image_position = ? ORDER BY ann_position",
+                    (position,),
+                )
+                yield image_info, [json.loads(row[0]) for row in rows]
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        """Removes the temporary index from the disk, if it was created."""
+        if self._index_path is not None:
+            sly.fs.silent_remove(self._index_path)
+            self._index_path = None
+
+    def __enter__(self) -> "CocoReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
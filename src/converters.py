@@ -1,11 +1,123 @@
 import os
-import cv2
+import multiprocessing
 import supervisely as sly
-from typing import List, Dict, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, List, Dict, Iterable, Iterator, Tuple
 import pycocotools.mask as mask_util
 import numpy as np
 from copy import deepcopy
 
+from src.transcoder import get_target_size
+
+# * ConversionContext of the worker process, set once by the pool initializer.
+_worker_context = {}
+
+# * Maximum number of pixels in cropped RLE masks, which are decoded with one call.
+RLE_DECODE_BATCH_PIXELS = 64 * 1024 * 1024
+
+
+# * Name of the image tag with captions of the COCO objects.
+CAPTION_TAG_NAME = "caption"
+
+
+class ConversionContext:
+    """Lookups for the conversion of the images of one split, which are resolved once
+    before the conversion: COCO category ID to ObjClass and TagMeta of the captions,
+    so converting an object doesn't search in the ProjectMeta.
+
+    :param meta: ProjectMeta of Supervisely project, must contain classes of all categories
+    :type meta: sly.ProjectMeta
+    :param coco_categories: List of COCO categories.
+    :type coco_categories: List[dict]
+    :param ignore_bbox: if True, bounding boxes will be ignored, defaults to False
+    :type ignore_bbox: bool, optional
+    :param max_side: if set, annotations of the images with the longer side are rescaled
+        to the size of the resized image (see src.transcoder), defaults to 0
+    :type max_side: int, optional
+    """
+
+    def __init__(
+        self,
+        meta: sly.ProjectMeta,
+        coco_categories: List[dict],
+        ignore_bbox: bool = False,
+        max_side: int = 0,
+    ):
+        self.obj_classes = {
+            category_id: meta.get_obj_class(class_name)
+            for category_id, class_name in coco_category_to_class_name(coco_categories).items()
+        }
+        # * Caption tag is not in the meta until captions are found, see get_caption_tag_meta().
+        self.caption_tag_meta = meta.get_tag_meta(CAPTION_TAG_NAME) or get_caption_tag_meta()
+        self.ignore_bbox = ignore_bbox
+        self.max_side = max_side
+
+    def convert(self, coco_ann: List[Dict], image_size: Tuple[int, int]) -> sly.Annotation:
+        """Convert COCO annotations of one image to Supervisely annotation.
+
+        :param coco_ann: List of COCO annotations.
+        :type coco_ann: List[Dict]
+        :param image_size: size of image.
+        :type image_size: Tuple[int, int]
+        :return: Supervisely annotation.
+        :rtype: sly.Annotation
+        """
+        labels = []
+        img_tags = []
+
+        rle_objects = [
+            object
+            for object in coco_ann
+            if type(object.get("segmentation")) is dict and object["segmentation"]
+        ]
+        rle_polygons = dict(
+            zip(map(id, rle_objects), convert_rle_masks_to_polygons(rle_objects))
+        )
+
+        for object in coco_ann:
+            obj_class = self.obj_classes.get(object.get("category_id"))
+            curr_labels = []
+
+            segm = object.get("segmentation")
+            if segm is not None and len(segm) > 0:
+                if type(segm) is dict:
+                    for polygon in rle_polygons[id(object)]:
+                        labels.append(sly.Label(polygon, obj_class))
+                elif type(segm) is list:
+                    figures = convert_polygon_vertices(object, image_size)
+                    curr_labels.extend([sly.Label(figure, obj_class) for figure in figures])
+            labels.extend(curr_labels)
+
+            if not self.ignore_bbox:
+                bbox = object.get("bbox")
+                if bbox is not None and len(bbox) == 4:
+                    if len(curr_labels) > 1:
+                        for label in curr_labels:
+                            labels.append(sly.Label(label.geometry.to_bbox(), obj_class))
+                    else:
+                        x, y, w, h = bbox
+                        rectangle = sly.Label(sly.Rectangle(y, x, y + h, x + w), obj_class)
+                        labels.append(rectangle)
+
+            caption = object.get("caption")
+            if caption is not None:
+                img_tags.append(sly.Tag(self.caption_tag_meta, caption))
+
+        ann = sly.Annotation(image_size, labels=labels, img_tags=img_tags)
+        target_size = get_target_size(image_size, self.max_side)
+        if target_size != tuple(image_size):
+            # * Geometry is converted in the original coordinates and rescaled with the image.
+            ann = ann.resize(target_size)
+        return ann
+
+
+def get_caption_tag_meta() -> sly.TagMeta:
+    """Returns TagMeta of the image tag with captions of the COCO objects.
+    It should be added to the ProjectMeta only if the converted annotations have captions."""
+    return sly.TagMeta(CAPTION_TAG_NAME, sly.TagValueType.ANY_STRING)
+
 
 def coco_to_sly_ann(
     meta: sly.ProjectMeta,
@@ -13,8 +125,10 @@ def coco_to_sly_ann(
     coco_ann: List[Dict],
     image_size: Tuple[int, int],
     ignore_bbox: bool = False,
+    max_side: int = 0,
 ) -> sly.Annotation:
     """Convert COCO annotation to Supervisely annotation.
+    To convert many images, build ConversionContext once and call its convert() method.
 
     :param meta: ProjectMeta of Supervisely project.
     :type meta: sly.ProjectMeta
@@ -26,80 +140,191 @@ def coco_to_sly_ann(
     :type image_size: Tuple[int, int]
     :param ignore_bbox: if True, bounding boxes will be ignored, defaults to False
     :type ignore_bbox: bool, optional
+    :param max_side: if set, the annotation of the larger image is rescaled
+        to the size of the resized image, defaults to 0
+    :type max_side: int, optional
     :return: Supervisely annotation.
     :rtype: sly.Annotation
     """
+    context = ConversionContext(meta, coco_categories, ignore_bbox, max_side)
+    return context.convert(coco_ann, image_size)
 
-    labels = []
-    imag_tags = []
-    name_cat_id_map = coco_category_to_class_name(coco_categories)
-    for object in coco_ann:
-        curr_labels = []
-
-        segm = object.get("segmentation")
-        if segm is not None and len(segm) > 0:
-            obj_class_name = name_cat_id_map[object["category_id"]]
-            obj_class = meta.get_obj_class(obj_class_name)
-            if type(segm) is dict:
-                polygons = convert_rle_mask_to_polygon(object)
-                for polygon in polygons:
-                    figure = polygon
-                    label = sly.Label(figure, obj_class)
-                    labels.append(label)
-            elif type(segm) is list and object["segmentation"]:
-                figures = convert_polygon_vertices(object, image_size)
-                curr_labels.extend([sly.Label(figure, obj_class) for figure in figures])
-        labels.extend(curr_labels)
-
-        if not ignore_bbox:
-            bbox = object.get("bbox")
-            if bbox is not None and len(bbox) == 4:
-                obj_class_name = name_cat_id_map[object["category_id"]]
-                obj_class = meta.get_obj_class(obj_class_name)
-                if len(curr_labels) > 1:
-                    for label in curr_labels:
-                        bbox = label.geometry.to_bbox()
-                        labels.append(sly.Label(bbox, obj_class))
-                else:
-                    x, y, w, h = bbox
-                    rectangle = sly.Label(sly.Rectangle(y, x, y + h, x + w), obj_class)
-                    labels.append(rectangle)
-
-        caption = object.get("caption")
-        if caption is not None:
-            imag_tags.append(sly.Tag(meta.get_tag_meta("caption"), caption))
-
-    return sly.Annotation(image_size, labels=labels, img_tags=imag_tags)
-
-
-def convert_rle_mask_to_polygon(coco_ann: List[Dict]) -> List[sly.Polygon]:
+
+def convert_rle_mask_to_polygon(coco_ann: Dict) -> List[sly.Polygon]:
     """Convert RLE mask to List of Supervisely Polygons.
+    Mask is decoded only inside the bounding box of the object, the annotation is not modified.
 
-    :param coco_ann: List of COCO annotations.
-    :type coco_ann: List[Dict]
+    :param coco_ann: COCO annotation with RLE segmentation.
+    :type coco_ann: Dict
     :return: List of Supervisely Polygons.
     :rtype: List[sly.Polygon]
     """
-    if type(coco_ann["segmentation"]["counts"]) is str:
-        coco_ann["segmentation"]["counts"] = bytes(
-            coco_ann["segmentation"]["counts"], encoding="utf-8"
-        )
-        mask = mask_util.decode(coco_ann["segmentation"])
+    return convert_rle_masks_to_polygons([coco_ann])[0]
+
+
+def convert_rle_masks_to_polygons(coco_anns: List[Dict]) -> List[List[sly.Polygon]]:
+    """Convert RLE masks of objects from the same image to Lists of Supervisely Polygons.
+    Each mask is cropped to the bounding box of the object in RLE form before decoding,
+    so memory depends on the size of the objects, not on the size of the image.
+    Cropped masks of similar size are decoded with one batched call.
+    Annotations are not modified.
+
+    :param coco_anns: List of COCO annotations with RLE segmentation.
+    :type coco_anns: List[Dict]
+    :return: List of Lists of Supervisely Polygons in the same order as annotations.
+    :rtype: List[List[sly.Polygon]]
+    """
+    objects = []
+    for idx, coco_ann in enumerate(coco_anns):
+        segmentation = coco_ann["segmentation"]
+        height, width = segmentation["size"]
+        counts = _rle_counts(segmentation["counts"])
+        window = _rle_window(coco_ann.get("bbox"), counts, height, width)
+        objects.append((idx, counts, height, window))
+
+    results = [[] for _ in coco_anns]
+
+    # * Biggest objects first, so objects of similar size are padded to the same window.
+    objects.sort(key=lambda obj: obj[3][2] * obj[3][3], reverse=True)
+    batch_start = 0
+    while batch_start < len(objects):
+        batch_end, max_h, max_w = batch_start, 0, 0
+        while batch_end < len(objects):
+            _, _, _, (_, _, window_h, window_w) = objects[batch_end]
+            next_h, next_w = max(max_h, window_h), max(max_w, window_w)
+            pixels = (batch_end - batch_start + 1) * next_h * next_w
+            if batch_end > batch_start and pixels > RLE_DECODE_BATCH_PIXELS:
+                break
+            max_h, max_w = next_h, next_w
+            batch_end += 1
+        batch = objects[batch_start:batch_end]
+        batch_start = batch_end
+
+        if max_h == 0 or max_w == 0:
+            continue
+
+        rles = [
+            {
+                "size": [max_h, max_w],
+                "counts": _crop_rle_counts(counts, height, x, y, max_h, max_w),
+            }
+            for _, counts, height, (x, y, _, _) in batch
+        ]
+        masks = mask_util.decode(mask_util.frPyObjects(rles, max_h, max_w))
+        for mask_idx, (idx, _, _, (x, y, _, _)) in enumerate(batch):
+            mask = masks[:, :, mask_idx].astype(bool)
+            if not mask.any():
+                continue
+            origin = sly.PointLocation(y, x)
+            results[idx] = sly.Bitmap(mask, origin=origin).to_contours()
+
+    return results
+
+
+def _rle_counts(counts) -> np.ndarray:
+    """Returns run lengths of the RLE. Compressed counts (str or bytes) are decoded
+    in the same way as in pycocotools (rleFrString).
+    """
+    if not isinstance(counts, (str, bytes)):
+        return np.asarray(counts, dtype=np.int64)
+
+    if isinstance(counts, bytes):
+        counts = counts.decode("utf-8")
+
+    result = []
+    value, shift = 0, 0
+    for char in counts:
+        code = ord(char) - 48
+        value |= (code & 0x1F) << shift
+        shift += 5
+        if code & 0x20:
+            continue
+        if code & 0x10:
+            value |= -1 << shift
+        if len(result) > 2:
+            value += result[-2]
+        result.append(value)
+        value, shift = 0, 0
+    return np.asarray(result, dtype=np.int64)
+
+
+def _rle_window(
+    bbox: List[float], counts: np.ndarray, height: int, width: int
+) -> Tuple[int, int, int, int]:
+    """Returns (x, y, height, width) of the window in the image, which contains the whole mask.
+    Uses the bounding box of the annotation with 1 pixel margin, if the bounding box is missing,
+    computes it from the RLE without decoding it.
+    """
+    if bbox is not None and len(bbox) == 4:
+        x, y, w, h = bbox
+        left, top = int(np.floor(x)) - 1, int(np.floor(y)) - 1
+        right, bottom = int(np.ceil(x + w)) + 1, int(np.ceil(y + h)) + 1
     else:
-        rle_obj = mask_util.frPyObjects(
-            coco_ann["segmentation"],
-            coco_ann["segmentation"]["size"][0],
-            coco_ann["segmentation"]["size"][1],
-        )
-        mask = mask_util.decode(rle_obj)
-    mask = np.array(mask, dtype=bool)
-    return sly.Bitmap(mask).to_contours()
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        ones = counts[1::2] > 0
+        if not ones.any():
+            return 0, 0, 0, 0
+        first, last = starts[1::2][ones][0], ends[1::2][ones][-1] - 1
+        left, right = int(first // height), int(last // height) + 1
+        top, bottom = 0, height
+
+    left, top = max(0, left), max(0, top)
+    right, bottom = min(width, right), min(height, bottom)
+    return left, top, max(0, bottom - top), max(0, right - left)
+
+
+def _crop_rle_counts(
+    counts: np.ndarray, height: int, x: int, y: int, crop_h: int, crop_w: int
+) -> List[int]:
+    """Returns uncompressed RLE counts of the crop_h x crop_w window with top left corner (x, y)
+    of the mask, which is encoded in column-major order with the given height.
+    Pixels of the window outside of the mask are empty.
+    """
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    low, high = x * height, (x + crop_w) * height
+    ones_starts = np.clip(starts[1::2], low, high)
+    ones_ends = np.clip(ends[1::2], low, high)
+    keep = ones_ends > ones_starts
+    ones_starts, ones_ends = ones_starts[keep], ones_ends[keep]
+
+    # * Split runs of ones into parts, each of them is inside one column.
+    first_cols = ones_starts // height
+    cols_count = (ones_ends - 1) // height - first_cols + 1
+    offsets = np.arange(cols_count.sum()) - np.repeat(
+        np.cumsum(cols_count) - cols_count, cols_count
+    )
+    cols = np.repeat(first_cols, cols_count) + offsets
+    rows_start = np.maximum(np.repeat(ones_starts, cols_count), cols * height)
+    rows_end = np.minimum(np.repeat(ones_ends, cols_count), (cols + 1) * height)
+    rows_start = np.clip(rows_start - cols * height, y, y + crop_h) - y
+    rows_end = np.clip(rows_end - cols * height, y, y + crop_h) - y
+    keep = rows_end > rows_start
+    cols, rows_start, rows_end = cols[keep], rows_start[keep], rows_end[keep]
+
+    run_starts = (cols - x) * crop_h + rows_start
+    run_ends = (cols - x) * crop_h + rows_end
+    if len(run_starts) == 0:
+        # * Empty mask or the window doesn't cover it.
+        return [crop_h * crop_w]
+
+    # * Merge touching runs, so there are no empty runs of zeros inside.
+    touching = run_starts[1:] == run_ends[:-1]
+    run_starts = run_starts[np.concatenate(([True], ~touching))]
+    run_ends = run_ends[np.concatenate((~touching, [True]))]
+
+    bounds = np.empty(len(run_starts) * 2 + 2, dtype=np.int64)
+    bounds[0], bounds[-1] = 0, crop_h * crop_w
+    bounds[1:-1:2], bounds[2:-1:2] = run_starts, run_ends
+    return np.diff(bounds).tolist()
 
 
 def convert_polygon_vertices(
     coco_ann: List[Dict], image_size: Tuple[int, int]
 ) -> List[sly.Polygon]:
     """Convert polygon vertices to Supervisely Polygons.
+    Rings, which are completely inside another ring, are converted to its interiors (holes).
 
     :param coco_ann: List of COCO annotations.
     :type coco_ann: List[Dict]
@@ -119,40 +344,87 @@ def convert_polygon_vertices(
         ]
         exteriors.append([(width, height) for width, height in polygon])
 
+    rings = [np.array(exterior, dtype=np.float64).reshape(-1, 2) for exterior in exteriors]
+    bboxes = [
+        (ring[:, 0].min(), ring[:, 1].min(), ring[:, 0].max(), ring[:, 1].max())
+        if len(ring) > 0
+        else None
+        for ring in rings
+    ]
+    height, width = image_size[:2]
+
     interiors = {idx: [] for idx in range(len(exteriors))}
     id2del = []
-    for idx, exterior in enumerate(exteriors):
-        temp_img = np.zeros(image_size + (3,), dtype=np.uint8)
-        geom = sly.Polygon([sly.PointLocation(y, x) for x, y in exterior])
-        geom.draw_contour(temp_img, color=[255, 255, 255])
-        im = cv2.cvtColor(temp_img, cv2.COLOR_RGB2GRAY)
-        contours, _ = cv2.findContours(im, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) == 0:
+    for idx, bbox in enumerate(bboxes):
+        if bbox is None or not _bbox_intersects_image(bbox, height, width):
             continue
-        for idy, exterior2 in enumerate(exteriors):
-            if idx == idy or idy in id2del:
+        for idy, bbox2 in enumerate(bboxes):
+            if idx == idy or idy in id2del or bbox2 is None:
                 continue
-            results = [
-                cv2.pointPolygonTest(contours[0], (x, y), False) > 0
-                for x, y in exterior2
-            ]
-
-            if all(results):
+            # * Points, which are strictly inside the polygon, are strictly inside its bbox.
+            if not _bbox_inside_bbox(bbox2, bbox):
+                continue
+            if _points_inside_polygon(rings[idy], rings[idx]).all():
                 interiors[idx].append(deepcopy(exteriors[idy]))
                 id2del.append(idy)
 
-    for j in sorted(id2del, reverse=True):
-        del exteriors[j]
-
     figures = []
-    for exterior, interior in zip(exteriors, interiors.values()):
+    for idx, exterior in enumerate(exteriors):
+        if idx in id2del:
+            continue
         exterior = [sly.PointLocation(y, x) for x, y in exterior]
-        interior = [[sly.PointLocation(y, x) for x, y in points] for points in interior]
+        interior = [
+            [sly.PointLocation(y, x) for x, y in points] for points in interiors[idx]
+        ]
         figures.append(sly.Polygon(exterior, interior))
 
     return figures
 
 
+def _bbox_intersects_image(
+    bbox: Tuple[float, float, float, float], height: int, width: int
+) -> bool:
+    left, top, right, bottom = bbox
+    return right >= 0 and bottom >= 0 and left < width and top < height
+
+
+def _bbox_inside_bbox(
+    inner: Tuple[float, float, float, float], outer: Tuple[float, float, float, float]
+) -> bool:
+    left, top, right, bottom = inner
+    return left > outer[0] and top > outer[1] and right < outer[2] and bottom < outer[3]
+
+
+def _points_inside_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Vectorized even-odd ray casting test for all points against one polygon.
+
+    :param points: array of (x, y) points with shape (N, 2).
+    :type points: np.ndarray
+    :param polygon: array of (x, y) polygon vertices with shape (M, 2).
+    :type polygon: np.ndarray
+    :return: boolean array with shape (N,), True for points strictly inside the polygon.
+    :rtype: np.ndarray
+    """
+    x = points[:, 0][:, np.newaxis]
+    y = points[:, 1][:, np.newaxis]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    inside = np.count_nonzero(crosses & (x < x_cross), axis=1) % 2 == 1
+
+    # * Points on the polygon boundary are not inside, as in cv2.pointPolygonTest.
+    cross_product = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+    within_x = (np.minimum(x1, x2) <= x) & (x <= np.maximum(x1, x2))
+    within_y = (np.minimum(y1, y2) <= y) & (y <= np.maximum(y1, y2))
+    within = within_x & within_y
+    on_edge = np.any((np.abs(cross_product) < 1e-9) & within, axis=1)
+
+    return inside & ~on_edge
+
+
 def coco_category_to_class_name(coco_categories: List[dict]) -> Dict:
     """Create dictionary with COCO category id as key and category name as value.
 
@@ -162,3 +434,92 @@ def coco_category_to_class_name(coco_categories: List[dict]) -> Dict:
     :rtype: Dict
     """
     return {category["id"]: category["name"] for category in coco_categories}
+
+
+def coco_to_sly_ann_jsons(
+    meta: sly.ProjectMeta,
+    coco_categories: List[dict],
+    items: Iterable[Tuple[Any, List[Dict], Tuple[int, int]]],
+    ignore_bbox: bool = False,
+    workers: int = 1,
+    chunk_size: int = 64,
+    max_side: int = 0,
+) -> Iterator[Tuple[Any, Dict]]:
+    """Convert COCO annotations of many images to Supervisely annotations in JSON format.
+    If workers > 1, images are sent to the pool of processes in chunks, results are yielded
+    in the same order as input items. Only a limited number of chunks is converted at the same time,
+    so items can be a lazy iterator.
+
+    :param meta: ProjectMeta of Supervisely project.
+    :type meta: sly.ProjectMeta
+    :param coco_categories: List of COCO categories.
+    :type coco_categories: List[dict]
+    :param items: Iterable of (key, COCO annotations of image, image size), key is returned
+        with the annotation as is and is never sent to the worker processes.
+    :type items: Iterable[Tuple[Any, List[Dict], Tuple[int, int]]]
+    :param ignore_bbox: if True, bounding boxes will be ignored, defaults to False
+    :type ignore_bbox: bool, optional
+    :param workers: number of processes for conversion, defaults to 1 (convert in current process)
+    :type workers: int, optional
+    :param chunk_size: number of images in one chunk for the worker process, defaults to 64
+    :type chunk_size: int, optional
+    :param max_side: if set, annotations of the larger images are rescaled
+        to the size of the resized images, defaults to 0
+    :type max_side: int, optional
+    :return: Iterator of (key, Supervisely annotation in JSON format).
+    :rtype: Iterator[Tuple[Any, Dict]]
+    """
+    items = iter(items)
+    first_chunk = list(islice(items, chunk_size))
+    second_chunk = list(islice(items, chunk_size))
+
+    if workers <= 1 or not second_chunk:
+        # * Starting processes is not worth it for a single chunk.
+        context = ConversionContext(meta, coco_categories, ignore_bbox, max_side)
+        for key, coco_ann, image_size in chain(first_chunk, second_chunk, items):
+            yield key, context.convert(coco_ann, image_size).to_json()
+        return
+
+    def chunks():
+        yield first_chunk
+        yield second_chunk
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    # * Spawn is used instead of fork, because the app process runs many threads.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_conversion_worker,
+        initargs=(meta.to_json(), coco_categories, ignore_bbox, max_side),
+    ) as executor:
+        pending = deque()
+        for chunk in chunks():
+            keys = [key for key, _, _ in chunk]
+            data = [(coco_ann, image_size) for _, coco_ann, image_size in chunk]
+            pending.append((keys, executor.submit(_convert_chunk, data)))
+            if len(pending) >= workers * 2:
+                keys, future = pending.popleft()
+                yield from zip(keys, future.result())
+        while pending:
+            keys, future = pending.popleft()
+            yield from zip(keys, future.result())
+
+
+def _init_conversion_worker(
+    meta_json: Dict, coco_categories: List[dict], ignore_bbox: bool, max_side: int
+) -> None:
+    _worker_context["context"] = ConversionContext(
+        sly.ProjectMeta.from_json(meta_json), coco_categories, ignore_bbox, max_side
+    )
+
+
+def _convert_chunk(chunk: List[Tuple[List[Dict], Tuple[int, int]]]) -> List[Dict]:
+    context = _worker_context["context"]
+    return [
+        context.convert(coco_ann, tuple(image_size)).to_json()
+        for coco_ann, image_size in chunk
+    ]
@@ -0,0 +1,133 @@
+import os
+import shutil
+import threading
+from typing import Callable, List, Optional
+
+import supervisely as sly
+
+
+class DiskBudget:
+    """Limits the total size of the temporary files (export archives and converted annotations)
+    of the projects, which are copied at the same time.
+
+    Before the download, the project reserves its estimated size with acquire(), which blocks
+    until the reservation fits into the budget. After the download the reservation is corrected
+    to the real size with update(). When the project leaves the pipeline, release() removes its
+    files and frees the reservation, so the next waiting project can be started.
+    The project, which is larger than the whole budget, waits until nothing else is reserved
+    and is copied alone.
+
+    :param max_size: maximum total size of the reservations in bytes, 0 disables the limit
+    :type max_size: int
+    :param poll_interval: number of seconds between checks of the stop condition
+        while the project is waiting, defaults to 1
+    :type poll_interval: float, optional
+    """
+
+    def __init__(self, max_size: int, poll_interval: float = 1.0):
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self._reserved = {}
+        self._paths = {}
+        self._condition = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def used(self) -> int:
+        """Total size of the current reservations in bytes."""
+        with self._condition:
+            return sum(self._reserved.values())
+
+    def acquire(
+        self, key: str, size: int, should_continue: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """Reserves the size for the project, waits until it fits into the budget.
+
+        :param key: ID of the project
+        :type key: str
+        :param size: estimated size of the project files in bytes
+        :type size: int
+        :param should_continue: checked while waiting, if it returns False, waiting is stopped
+        :type should_continue: Optional[Callable[[], bool]]
+        :return: True if the size was reserved, False if waiting was stopped
+        :rtype: bool
+        """
+        size = max(0, int(size))
+        with self._condition:
+            if self.enabled and size > self.max_size:
+                sly.logger.warning(
+                    f"Estimated size of project {key} ({size / 1024 ** 3:.2f} GB) exceeds "
+                    f"the disk budget ({self.max_size / 1024 ** 3:.2f} GB), "
+                    "it will be copied when no other projects are in progress."
+                )
+            logged = False
+            while not self._fits(key, size):
+                if should_continue is not None and not should_continue():
+                    return False
+                if not logged:
+                    sly.logger.info(
+                        f"Project {key} is waiting for the disk budget: "
+                        f"{size / 1024 ** 2:.1f} MB are needed, "
+                        f"{self._used() / 1024 ** 2:.1f} of {self.max_size / 1024 ** 2:.1f} MB "
+                        "are used."
+                    )
+                    logged = True
+                self._condition.wait(self.poll_interval)
+            self._reserved[key] = size
+        return True
+
+    def update(self, key: str, size: int) -> None:
+        """Replaces the estimated size of the project with the real one, e.g. after the download.
+        The real size is not limited by the budget, as the files are already on the disk."""
+        with self._condition:
+            if key in self._reserved:
+                self._reserved[key] = max(0, int(size))
+                self._condition.notify_all()
+
+    def add_path(self, key: str, path: str) -> None:
+        """Adds the file or the directory of the project, which will be removed on release()."""
+        with self._condition:
+            self._paths.setdefault(key, []).append(path)
+
+    def release(self, key: str, remove_files: bool = True) -> List[str]:
+        """Frees the reservation of the project and removes its files.
+
+        :param key: ID of the project
+        :type key: str
+        :param remove_files: if False, files are kept on the disk (e.g. for debugging),
+            defaults to True
+        :type remove_files: bool, optional
+        :return: paths to the files of the project
+        :rtype: List[str]
+        """
+        with self._condition:
+            paths = self._paths.pop(key, [])
+        if remove_files:
+            for path in paths:
+                _remove(path)
+        with self._condition:
+            self._reserved.pop(key, None)
+            self._condition.notify_all()
+        return paths
+
+    def _fits(self, key: str, size: int) -> bool:
+        if not self.enabled:
+            return True
+        used = self._used(exclude=key)
+        return used == 0 or used + size <= self.max_size
+
+    def _used(self, exclude: Optional[str] = None) -> int:
+        return sum(size for key, size in self._reserved.items() if key != exclude)
+
+
+def _remove(path: str) -> None:
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    except Exception as e:
+        sly.logger.warning(f"Failed to remove {path}: {e}")
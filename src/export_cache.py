@@ -0,0 +1,237 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from time import time
+from typing import Dict, List, Optional
+
+import supervisely as sly
+
+
+class ExportCache:
+    """Persistent on-disk cache of Roboflow version exports (zip archives or extracted directories).
+
+    Entries are keyed by workspace/project/version/format and stored in the directories named
+    by the hash of the key. For every entry the manifest with sizes and SHA-256 checksums of its
+    files is kept, so corrupted entries are detected and dropped instead of being converted.
+    When the total size of the cache exceeds max_size, least recently used entries are evicted.
+
+    Entries are given out as hard-linked copies (or regular copies if hard links are not supported),
+    so the caller can move and remove its copy without affecting the cache.
+
+    :param directory: directory of the cache
+    :type directory: str
+    :param max_size: maximum total size of the cache in bytes, 0 disables the cache
+    :type max_size: int
+    :param verify: if True, checksums of all files are verified before the entry is used,
+        otherwise only sizes of the files are checked, defaults to True
+    :type verify: bool, optional
+    """
+
+    def __init__(self, directory: str, max_size: int, verify: bool = True):
+        self.directory = directory
+        self.max_size = max_size
+        self.verify = verify
+        self._index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._index = {}
+
+        if self.enabled:
+            sly.fs.mkdir(directory)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def key(project_id: str, version: int, export_format: str) -> str:
+        """Returns the key of the entry.
+
+        :param project_id: full ID of the Roboflow project like "workspace/project"
+        :type project_id: str
+        :param version: number of the version
+        :type version: int
+        :param export_format: format of the export (e.g. "coco", "folder")
+        :type export_format: str
+        :rtype: str
+        """
+        return f"{project_id}/{version}/{export_format}"
+
+    def get(self, key: str, dst_dir: str) -> Optional[str]:
+        """Returns the path to the copy of the cached export in dst_dir
+        or None if the export is not cached or its entry is corrupted.
+
+        :param key: key of the entry
+        :type key: str
+        :param dst_dir: directory, where the copy of the export will be created
+        :type dst_dir: str
+        :return: path to the copy of the export
+        :rtype: Optional[str]
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None:
+            return None
+
+        entry_dir = os.path.join(self.directory, entry["dir"])
+        if not self._is_valid(entry_dir, entry["files"]):
+            sly.logger.warning(f"Cached export {key} is corrupted, it will be removed.")
+            self._remove(key)
+            return None
+
+        dst_path = os.path.join(dst_dir, entry["name"])
+        _remove_path(dst_path)
+
+        with self._lock:
+            # * Entry could be evicted by another thread while it was verified.
+            if self._index.get(key) is not entry:
+                return None
+            _link_path(os.path.join(entry_dir, entry["name"]), dst_path)
+            entry["last_used"] = time()
+            self._save_index()
+        sly.logger.info(f"Using cached export {key} ({_size_str(entry['size'])}).")
+        return dst_path
+
+    def put(self, key: str, src_path: str) -> None:
+        """Adds the export to the cache, if it fits into the cache size.
+
+        :param key: key of the entry
+        :type key: str
+        :param src_path: path to the export archive or to the extracted export directory
+        :type src_path: str
+        """
+        if not self.enabled:
+            return
+
+        name = os.path.basename(os.path.normpath(src_path))
+        entry_dir_name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        entry_dir = os.path.join(self.directory, entry_dir_name)
+        temp_dir = f"{entry_dir}.{threading.get_ident()}.tmp"
+        _remove_path(temp_dir)
+        sly.fs.mkdir(temp_dir)
+        _link_path(src_path, os.path.join(temp_dir, name))
+
+        files = _manifest(temp_dir)
+        size = sum(file_size for file_size, _ in files.values())
+        if size > self.max_size:
+            sly.logger.info(
+                f"Export {key} is bigger than the cache size limit, it will not be cached."
+            )
+            sly.fs.remove_dir(temp_dir)
+            return
+
+        with self._lock:
+            if key in self._index:
+                self._remove_entry_dir(self._index.pop(key))
+            os.replace(temp_dir, entry_dir)
+            self._index[key] = {
+                "dir": entry_dir_name,
+                "name": name,
+                "size": size,
+                "files": files,
+                "last_used": time(),
+            }
+            self._evict(keep=key)
+            self._save_index()
+        sly.logger.info(f"Export {key} ({_size_str(size)}) was added to the cache.")
+
+    def _evict(self, keep: str) -> None:
+        total_size = sum(entry["size"] for entry in self._index.values())
+        by_last_use = sorted(self._index.items(), key=lambda item: item[1]["last_used"])
+        for key, entry in by_last_use:
+            if total_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            sly.logger.info(f"Evicting cached export {key} to fit the cache size limit.")
+            self._remove_entry_dir(self._index.pop(key))
+            total_size -= entry["size"]
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is not None:
+                self._remove_entry_dir(entry)
+                self._save_index()
+
+    def _remove_entry_dir(self, entry: Dict) -> None:
+        entry_dir = os.path.join(self.directory, entry["dir"])
+        if os.path.isdir(entry_dir):
+            sly.fs.remove_dir(entry_dir)
+
+    def _is_valid(self, entry_dir: str, files: Dict[str, List]) -> bool:
+        for relative_path, (file_size, checksum) in files.items():
+            path = os.path.join(entry_dir, relative_path)
+            if not os.path.isfile(path) or os.path.getsize(path) != file_size:
+                return False
+            if self.verify and _file_checksum(path) != checksum:
+                return False
+        return True
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r") as file:
+                self._index = json.load(file)
+        except Exception as e:
+            sly.logger.warning(
+                f"Failed to read the export cache index, cache will be reset: {e}"
+            )
+            sly.fs.clean_dir(self.directory)
+            self._index = {}
+        sly.logger.debug(f"Export cache in {self.directory} has {len(self._index)} entries.")
+
+    def _save_index(self) -> None:
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self._index, file)
+        os.replace(temp_path, self._index_path)
+
+
+def _manifest(directory: str) -> Dict[str, List]:
+    """Returns sizes and checksums of all files in the directory by their relative paths."""
+    files = {}
+    for path in sly.fs.list_files_recursively(directory):
+        relative_path = os.path.relpath(path, directory)
+        files[relative_path] = [os.path.getsize(path), _file_checksum(path)]
+    return files
+
+
+def _file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def _size_str(size: int) -> str:
+    return f"{size / 1024 ** 2:.1f} MiB"
+
+
+def _remove_path(path: str) -> None:
+    if os.path.isdir(path):
+        sly.fs.remove_dir(path)
+    else:
+        sly.fs.silent_remove(path)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _link_path(src_path: str, dst_path: str) -> None:
+    """Copies the file or the directory with hard links instead of copying the content
+    of the files, if it's possible."""
+    if os.path.isdir(src_path):
+        shutil.copytree(src_path, dst_path, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(src_path, dst_path)
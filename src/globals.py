@@ -5,6 +5,14 @@ import supervisely as sly
 
 from dotenv import load_dotenv
 
+from src.checkpoint import Checkpoint
+from src.disk_budget import DiskBudget
+from src.export_cache import ExportCache
+from src.metrics import Metrics
+from src.retry import RetryPolicy, SingleAttemptApi
+from src.sync_state import SyncState
+from src.transcoder import TRANSCODE_FORMATS, TranscodeOptions
+
 ABSOLUTE_PATH = os.path.dirname(os.path.abspath(__file__))
 PARENT_DIR = os.path.dirname(ABSOLUTE_PATH)
 sly.logger.debug(f"Absolute path: {ABSOLUTE_PATH}, parent dir: {PARENT_DIR}")
@@ -26,28 +34,188 @@ if sly.is_development():
         sly.logger.warning("One of the .env files is missing. It may cause errors.")
 
 api = sly.Api.from_env()
+# * API for the requests, which are retried by UPLOAD_RETRY and API_RETRY (upload of the images
+# and annotations, mirroring of the checkpoint to Team Files), the SDK doesn't retry them on its own.
+upload_api = SingleAttemptApi.from_env()
 
 TEMP_DIR = os.path.join(PARENT_DIR, "temp")
 
 # * Directory, where downloaded as archives Roboflow data will be stored.
 ARCHIVE_DIR = os.path.join(TEMP_DIR, "archives")
 
-# * Directory, where unpacked Roboflow data will be stored.
-UNPACKED_DIR = os.path.join(TEMP_DIR, "unpacked")
-
 # * Directory, where converted Supervisely data will be stored.
 CONVERTED_DIR = os.path.join(TEMP_DIR, "converted")
 
 sly.fs.mkdir(ARCHIVE_DIR, remove_content_if_exists=True)
-sly.fs.mkdir(UNPACKED_DIR, remove_content_if_exists=True)
 sly.fs.mkdir(CONVERTED_DIR, remove_content_if_exists=True)
 sly.logger.debug(
-    f"Archive dir: {ARCHIVE_DIR}, unpacked dir: {UNPACKED_DIR}, converted dir: {CONVERTED_DIR}"
+    f"Archive dir: {ARCHIVE_DIR}, converted dir: {CONVERTED_DIR}"
 )
 
 DEFAULT_API_ADDRESS = "https://api.roboflow.com"
 DEFAULT_APP_ADDRESS = "https://app.roboflow.com"
 
+# * Number of worker threads for each stage of the copying pipeline.
+# While one project is downloading, previous ones can be converted and uploaded at the same time.
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 1))
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", 1))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 1))
+# * Number of dataset splits (train, valid, test) of one project, which are uploaded at the same time.
+# Splits are uploaded independently, so the failed split doesn't stop the others.
+SPLIT_WORKERS = int(os.getenv("SPLIT_WORKERS", 3))
+
+# * Maximum number of projects, which can wait in the queue before each stage of the pipeline.
+# Keeps the number of downloaded, but not yet uploaded projects on the disk bounded.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 1))
+sly.logger.debug(
+    f"Pipeline workers: download {DOWNLOAD_WORKERS}, convert {CONVERT_WORKERS}, "
+    f"upload {UPLOAD_WORKERS}, splits {SPLIT_WORKERS}, queue size: {PIPELINE_QUEUE_SIZE}"
+)
+
+# * Number of processes for converting COCO annotations, set to 1 to convert in the current process.
+CONVERT_PROCESSES = int(os.getenv("CONVERT_PROCESSES", os.cpu_count() or 1))
+
+# * Number of images, which are sent to the conversion process at once.
+CONVERT_CHUNK_SIZE = int(os.getenv("CONVERT_CHUNK_SIZE", 64))
+sly.logger.debug(
+    f"Conversion processes: {CONVERT_PROCESSES}, chunk size: {CONVERT_CHUNK_SIZE}"
+)
+
+# * Re-encoding of the images before the upload to save the upload bandwidth, disabled by default.
+# "lossless" recompresses PNG images without quality loss, "jpeg" and "webp" re-encode all images
+# with TRANSCODE_QUALITY. If TRANSCODE_MAX_SIDE is set, larger images are resized to fit into it
+# (with "lossless" format if no other format is set) and their annotations are rescaled.
+TRANSCODE_FORMAT = os.getenv("TRANSCODE_FORMAT", "").lower()
+TRANSCODE_QUALITY = int(os.getenv("TRANSCODE_QUALITY", 85))
+TRANSCODE_MAX_SIDE = int(os.getenv("TRANSCODE_MAX_SIDE", 0))
+# * Number of processes for re-encoding the images.
+TRANSCODE_PROCESSES = int(os.getenv("TRANSCODE_PROCESSES", os.cpu_count() or 1))
+TRANSCODE_OPTIONS = None
+if TRANSCODE_FORMAT and TRANSCODE_FORMAT not in TRANSCODE_FORMATS:
+    sly.logger.warning(
+        f"Unknown TRANSCODE_FORMAT {TRANSCODE_FORMAT}, images will not be transcoded. "
+        f"Following formats are supported: {list(TRANSCODE_FORMATS)}."
+    )
+elif TRANSCODE_FORMAT or TRANSCODE_MAX_SIDE:
+    TRANSCODE_OPTIONS = TranscodeOptions(
+        TRANSCODE_FORMAT or "lossless", TRANSCODE_QUALITY, TRANSCODE_MAX_SIDE
+    )
+sly.logger.debug(
+    f"Transcode options: {TRANSCODE_OPTIONS}, transcode processes: {TRANSCODE_PROCESSES}"
+)
+
+# * Number of images, which are uploaded to Supervisely with their annotations at once.
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", 500))
+# * Number of threads for reading and hashing images before the upload. Images, which are
+# already on the Supervisely instance, are added by hash without uploading their data.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 8))
+# * If False, the images are uploaded as bytes without checking which of them are already on the instance.
+DEDUP_UPLOADS = os.getenv("DEDUP_UPLOADS", "true").lower() in ("true", "1", "yes")
+sly.logger.debug(
+    f"Upload batch size: {UPLOAD_BATCH_SIZE}, hash workers: {HASH_WORKERS}, "
+    f"deduplicate uploads: {DEDUP_UPLOADS}"
+)
+
+# * Number of threads for fetching metadata of Roboflow projects when filling the selection.
+PROJECTS_FETCH_WORKERS = int(os.getenv("PROJECTS_FETCH_WORKERS", 16))
+
+# * Metadata of Roboflow projects is cached on disk for this number of seconds,
+# so reconnecting with the same credentials doesn't request it again.
+PROJECTS_CACHE_TTL = int(os.getenv("PROJECTS_CACHE_TTL", 600))
+PROJECTS_CACHE_FILE = os.path.join(TEMP_DIR, "projects_cache.json")
+sly.logger.debug(
+    f"Projects fetch workers: {PROJECTS_FETCH_WORKERS}, cache TTL: {PROJECTS_CACHE_TTL}s, "
+    f"cache file: {PROJECTS_CACHE_FILE}"
+)
+
+# * Maximum number of kept alive connections to the Roboflow API, which are shared between threads.
+HTTP_POOL_SIZE = int(
+    os.getenv(
+        "HTTP_POOL_SIZE", max(PROJECTS_FETCH_WORKERS, DOWNLOAD_WORKERS, UPLOAD_WORKERS)
+    )
+)
+sly.logger.debug(f"HTTP pool size: {HTTP_POOL_SIZE}")
+
+# * Maximum disk space for the export archives and converted annotations of the projects,
+# which are copied at the same time. Download of the project starts only when its estimated size
+# fits into the budget, files of the project are removed right after its upload.
+# Set size to 0 to disable the limit.
+DISK_BUDGET_MAX_SIZE = int(float(os.getenv("DISK_BUDGET_GB", 0)) * 1024**3)
+# * Average size of one image in the export, the size of the export is estimated
+# as the number of images in the version multiplied by this value.
+ESTIMATED_IMAGE_SIZE = int(float(os.getenv("ESTIMATED_IMAGE_SIZE_KB", 200)) * 1024)
+
+# * Persistent cache of extracted Roboflow exports, which is not cleaned after copying,
+# so copying the same version again doesn't download it. Set size to 0 to disable the cache.
+# Cached files are hard links to the exports of the projects, so they stay on the disk after
+# the project is released. That's why with the disk budget the cache is disabled by default,
+# and if its size is set explicitly, it's reserved from the budget.
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(TEMP_DIR, "export_cache"))
+if DISK_BUDGET_MAX_SIZE > 0:
+    EXPORT_CACHE_MAX_SIZE = int(float(os.getenv("EXPORT_CACHE_MAX_SIZE_GB", 0)) * 1024**3)
+    if EXPORT_CACHE_MAX_SIZE >= DISK_BUDGET_MAX_SIZE:
+        sly.logger.warning(
+            f"Export cache size ({EXPORT_CACHE_MAX_SIZE} bytes) doesn't fit into the disk budget "
+            f"({DISK_BUDGET_MAX_SIZE} bytes), the cache is disabled."
+        )
+        EXPORT_CACHE_MAX_SIZE = 0
+    DISK_BUDGET_MAX_SIZE -= EXPORT_CACHE_MAX_SIZE
+else:
+    EXPORT_CACHE_MAX_SIZE = int(float(os.getenv("EXPORT_CACHE_MAX_SIZE_GB", 20)) * 1024**3)
+EXPORT_CACHE_VERIFY = os.getenv("EXPORT_CACHE_VERIFY", "true").lower() in ("true", "1", "yes")
+EXPORT_CACHE = ExportCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_SIZE, EXPORT_CACHE_VERIFY)
+DISK_BUDGET = DiskBudget(DISK_BUDGET_MAX_SIZE)
+sly.logger.debug(
+    f"Export cache dir: {EXPORT_CACHE_DIR}, max size: {EXPORT_CACHE_MAX_SIZE} bytes, "
+    f"verify checksums: {EXPORT_CACHE_VERIFY}"
+)
+sly.logger.debug(
+    f"Disk budget: {DISK_BUDGET_MAX_SIZE} bytes, estimated image size: {ESTIMATED_IMAGE_SIZE} bytes"
+)
+
+# * Retry policy for failed requests: number of attempts for one operation (download of the project,
+# upload of the batch, etc.) and delays of the exponential backoff in seconds.
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", 5))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 2))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 120))
+
+# * Total number of retries for each stage during one copying run.
+DOWNLOAD_RETRY_BUDGET = int(os.getenv("DOWNLOAD_RETRY_BUDGET", 30))
+API_RETRY_BUDGET = int(os.getenv("API_RETRY_BUDGET", 50))
+UPLOAD_RETRY_BUDGET = int(os.getenv("UPLOAD_RETRY_BUDGET", 100))
+
+DOWNLOAD_RETRY = RetryPolicy(
+    "download", RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, DOWNLOAD_RETRY_BUDGET
+)
+API_RETRY = RetryPolicy(
+    "api", RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, API_RETRY_BUDGET
+)
+UPLOAD_RETRY = RetryPolicy(
+    "upload", RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, UPLOAD_RETRY_BUDGET
+)
+sly.logger.debug(
+    f"Retry attempts: {RETRY_ATTEMPTS}, delays: {RETRY_BASE_DELAY}-{RETRY_MAX_DELAY}s, "
+    f"budgets: download {DOWNLOAD_RETRY_BUDGET}, api {API_RETRY_BUDGET}, "
+    f"upload {UPLOAD_RETRY_BUDGET}"
+)
+
+# * Minimum number of seconds between updates of the progress bars of the copying stages,
+# in the headless mode the progress is logged instead with its own interval.
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", 1))
+PROGRESS_LOG_INTERVAL = float(os.getenv("PROGRESS_LOG_INTERVAL", 30))
+sly.logger.debug(
+    f"Progress interval: {PROGRESS_INTERVAL}s, log interval: {PROGRESS_LOG_INTERVAL}s"
+)
+
+# * Timings, bytes and images of every stage of the copying by project, the JSON report and
+# Prometheus text metrics are saved to this directory after the copying.
+METRICS = Metrics()
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(TEMP_DIR, "metrics"))
+sly.logger.debug(f"Metrics dir: {METRICS_DIR}")
+
+# * If True, only new versions and images of Roboflow projects will be copied by default.
+SYNC_MODE = os.getenv("SYNC_MODE", "false").lower() in ("true", "1", "yes")
+
 
 class State:
     def __init__(self):
@@ -64,6 +232,15 @@ class State:
         self.projects = {}
         self.selected_projects = []
 
+        # Numbers of the downloaded versions of the Roboflow projects by project ID.
+        self.versions = {}
+
+        # Will be set to True if only new versions and images should be copied.
+        self.sync_mode = SYNC_MODE
+
+        # Will be set to True if the app is launched without UI by the headless runner.
+        self.headless = False
+
         # Will be set to False if the cancel button will be pressed.
         # Sets to True on every click on the "Copy" button.
         self.continue_copying = True
@@ -117,9 +294,35 @@ sly.logger.debug(f"Path to the local roboflow.env file: {ROBOFLOW_ENV_FILE}")
 ROBOFLOW_ENV_TEAMFILES = sly.env.file(raise_not_found=False)
 sly.logger.debug(f"Path to the TeamFiles from environment: {ROBOFLOW_ENV_TEAMFILES}")
 
-CopyingStatus = namedtuple("CopyingStatus", ["copied", "error", "waiting", "working"])
-COPYING_STATUS = CopyingStatus("✅ Copied", "❌ Error", "⏳ Waiting", "🔄 Working")
+CopyingStatus = namedtuple(
+    "CopyingStatus", ["copied", "partial", "error", "waiting", "working"]
+)
+COPYING_STATUS = CopyingStatus(
+    "✅ Copied", "⚠️ Partially copied", "❌ Error", "⏳ Waiting", "🔄 Working"
+)
 
 if ROBOFLOW_ENV_TEAMFILES:
     sly.logger.debug(".env file is provided, will try to download it.")
     STATE.load_from_env()
+
+# * Manifest with the progress of copying, it's mirrored to Team Files to resume copying after restart.
+CHECKPOINT_FILE = os.path.join(TEMP_DIR, "checkpoint.json")
+CHECKPOINT_TEAMFILES = (
+    f"/roboflow-to-sly/checkpoints/workspace_{STATE.selected_workspace}.json"
+)
+CHECKPOINT = Checkpoint(
+    CHECKPOINT_FILE, upload_api, STATE.selected_team, CHECKPOINT_TEAMFILES, retry=API_RETRY
+)
+sly.logger.debug(
+    f"Checkpoint file: {CHECKPOINT_FILE}, on Team Files: {CHECKPOINT_TEAMFILES}"
+)
+
+# * State of the incremental sync, stores synced versions and images of the Roboflow projects.
+SYNC_STATE_FILE = os.path.join(TEMP_DIR, "sync_state.json")
+SYNC_STATE_TEAMFILES = f"/roboflow-to-sly/sync/workspace_{STATE.selected_workspace}.json"
+SYNC_STATE = SyncState(
+    SYNC_STATE_FILE, upload_api, STATE.selected_team, SYNC_STATE_TEAMFILES, retry=API_RETRY
+)
+sly.logger.debug(
+    f"Sync state file: {SYNC_STATE_FILE}, on Team Files: {SYNC_STATE_TEAMFILES}"
+)
@@ -0,0 +1,351 @@
+"""Headless batch migration from Roboflow to Supervisely without the app UI.
+
+The job spec is a JSON or YAML file. Top level keys are used as defaults for every job
+in the "jobs" list, if there is no such list, the spec itself is the only job:
+
+    server_address: https://app.supervisely.com   # or SERVER_ADDRESS env variable
+    api_token: ...                                # or API_TOKEN env variable
+    team_id: 1                                    # or TEAM_ID env variable
+    concurrency: {download: 2, convert: 1, upload: 2, splits: 3, queue_size: 2}
+    jobs:
+      - roboflow_api_key: qASymt32UTnQV1qABszF
+        workspace_id: 10                          # target Supervisely workspace
+        projects: ["my-workspace/cats", "dogs-*"] # IDs, names or glob patterns, all by default
+        sync: true                                # copy only new versions and images
+
+Usage:
+    python -m src.headless job.yaml --report report.json
+"""
+
+import os
+import sys
+import json
+import signal
+import argparse
+import fnmatch
+from datetime import datetime, timezone
+from time import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+# * Keys of the spec, which are passed to the environment before the app modules are imported.
+ENV_KEYS = {
+    "server_address": "SERVER_ADDRESS",
+    "api_token": "API_TOKEN",
+    "team_id": "TEAM_ID",
+    "workspace_id": "WORKSPACE_ID",
+}
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """Reads the job spec from JSON or YAML file.
+
+    :param path: path to the spec file
+    :type path: str
+    :return: spec as a dictionary
+    :rtype: Dict[str, Any]
+    """
+    with open(path, "r") as file:
+        if path.lower().endswith((".yaml", ".yml")):
+            spec = yaml.safe_load(file)
+        else:
+            spec = json.load(file)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Job spec {path} must be a mapping.")
+    return spec
+
+
+def get_jobs(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Returns jobs of the spec with top level defaults applied to each of them."""
+    defaults = {key: value for key, value in spec.items() if key != "jobs"}
+    jobs = spec.get("jobs") or [{}]
+    result = []
+    for job in jobs:
+        merged = {**defaults, **job}
+        merged["concurrency"] = {
+            **defaults.get("concurrency", {}),
+            **job.get("concurrency", {}),
+        }
+        if not merged.get("roboflow_api_key"):
+            raise ValueError("Every job must have roboflow_api_key.")
+        if not merged.get("workspace_id"):
+            raise ValueError("Every job must have target workspace_id.")
+        result.append(merged)
+    return result
+
+
+def select_projects(projects: List[Any], patterns: Optional[List[str]]) -> List[Any]:
+    """Returns projects, which IDs or names match any of the patterns (all projects if there are
+    no patterns), in the order of the project IDs.
+
+    :param projects: Roboflow projects of the workspace
+    :type projects: List[roboflow.Project]
+    :param patterns: project IDs, names or glob patterns for them
+    :type patterns: Optional[List[str]]
+    :rtype: List[roboflow.Project]
+    """
+    patterns = patterns or ["*"]
+    selected = [
+        project
+        for project in projects
+        if any(
+            fnmatch.fnmatchcase(name, pattern)
+            for name in (project.id, project.name)
+            for pattern in patterns
+        )
+    ]
+    return sorted(selected, key=lambda project: project.id)
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Copies the projects of the job and returns the report about them.
+    Settings of the job override the globals only while the job is running, so the next job
+    starts from the configured defaults.
+
+    :param job: job with applied defaults
+    :type job: Dict[str, Any]
+    :return: report with the status of every selected project
+    :rtype: Dict[str, Any]
+    """
+    import src.globals as g
+
+    concurrency = job["concurrency"]
+    overrides = {
+        "DEDUP_UPLOADS": bool(job.get("dedup_uploads", g.DEDUP_UPLOADS)),
+        "DOWNLOAD_WORKERS": int(concurrency.get("download", g.DOWNLOAD_WORKERS)),
+        "CONVERT_WORKERS": int(concurrency.get("convert", g.CONVERT_WORKERS)),
+        "UPLOAD_WORKERS": int(concurrency.get("upload", g.UPLOAD_WORKERS)),
+        "PIPELINE_QUEUE_SIZE": int(concurrency.get("queue_size", g.PIPELINE_QUEUE_SIZE)),
+        "CONVERT_PROCESSES": int(concurrency.get("convert_processes", g.CONVERT_PROCESSES)),
+        "HASH_WORKERS": int(concurrency.get("hash_workers", g.HASH_WORKERS)),
+        "SPLIT_WORKERS": int(concurrency.get("splits", g.SPLIT_WORKERS)),
+        "TRANSCODE_PROCESSES": int(
+            concurrency.get("transcode_processes", g.TRANSCODE_PROCESSES)
+        ),
+    }
+    defaults = {name: getattr(g, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(g, name, value)
+    try:
+        return _run_job(job)
+    finally:
+        for name, value in defaults.items():
+            setattr(g, name, value)
+
+
+def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    import src.globals as g
+    import src.ui.copying as copying
+    from src.checkpoint import Checkpoint
+    from src.sync_state import SyncState
+    from src.roboflow_api import get_configuration, get_projects
+
+    import supervisely as sly
+
+    workspace_id = int(job["workspace_id"])
+    report = {
+        "workspace_id": workspace_id,
+        "roboflow_api_address": job.get("roboflow_api_address", g.DEFAULT_API_ADDRESS),
+        "status": "ok",
+        "error": None,
+        "projects": [],
+    }
+
+    g.STATE.roboflow_api_address = report["roboflow_api_address"]
+    g.STATE.roboflow_api_key = job["roboflow_api_key"]
+    g.STATE.selected_workspace = workspace_id
+    g.STATE.sync_mode = bool(job.get("sync", g.SYNC_MODE))
+    g.STATE.continue_copying = True
+
+    # * Progress is stored separately for every target workspace, as in the app.
+    g.CHECKPOINT = Checkpoint(
+        os.path.join(g.TEMP_DIR, f"checkpoint_{workspace_id}.json"),
+        g.upload_api,
+        g.STATE.selected_team,
+        f"/roboflow-to-sly/checkpoints/workspace_{workspace_id}.json",
+        retry=g.API_RETRY,
+    )
+    g.SYNC_STATE = SyncState(
+        os.path.join(g.TEMP_DIR, f"sync_state_{workspace_id}.json"),
+        g.upload_api,
+        g.STATE.selected_team,
+        f"/roboflow-to-sly/sync/workspace_{workspace_id}.json",
+        retry=g.API_RETRY,
+    )
+
+    if not get_configuration():
+        report["status"] = "error"
+        report["error"] = f"Failed to connect to {g.STATE.roboflow_api_address}."
+        return report
+
+    # * Update times of the projects are used by the sync check, so they are not taken from the cache.
+    projects = select_projects(get_projects(use_cache=False), job.get("projects"))
+    sly.logger.info(f"Selected {len(projects)} projects for workspace {workspace_id}.")
+
+    results = {
+        project.id: {
+            "id": project.id,
+            "name": project.name,
+            "type": project.type,
+            "status": "not_started",
+            "failed_stage": None,
+            "failed_datasets": [],
+            "url": None,
+            "seconds": None,
+            "stages": {},
+        }
+        for project in projects
+    }
+    started = {}
+
+    def on_start(project) -> None:
+        started[project.id] = time()
+        results[project.id]["status"] = "working"
+
+    def on_done(project, upload_result) -> None:
+        result = results[project.id]
+        if upload_result.failed_datasets:
+            # * Failed datasets are left unfinished in the checkpoint for the next run.
+            result["status"] = "partial"
+            result["failed_datasets"] = upload_result.failed_datasets
+            result["url"] = copying.get_project_url(upload_result.project_info)
+        else:
+            result["status"] = "copied"
+            progress = g.CHECKPOINT.get_project(project.id)
+            if progress is not None:
+                result["url"] = progress["url"]
+        if project.id in started:
+            result["seconds"] = round(time() - started[project.id], 3)
+        result["stages"] = g.METRICS.get_project(project.id)
+        copying.release_project(project)
+
+    def on_error(project, stage_name: str) -> None:
+        result = results[project.id]
+        result["status"] = "error"
+        result["failed_stage"] = stage_name
+        if project.id in started:
+            result["seconds"] = round(time() - started[project.id], 3)
+        result["stages"] = g.METRICS.get_project(project.id)
+        copying.release_project(project)
+
+    def on_stop(project, stage_name: str) -> None:
+        # * The project was stopped before it was downloaded, so it's reported as not started.
+        results[project.id]["status"] = "not_started"
+        copying.release_project(project)
+
+    projects_to_copy = []
+    for project in projects:
+        copied_url = copying.get_copied_url(project)
+        if copied_url is not None:
+            results[project.id].update(status="skipped", url=copied_url)
+        else:
+            projects_to_copy.append(project)
+
+    pipeline = copying.build_pipeline(on_start, on_done, on_error, on_stop)
+    for retry_policy in (g.DOWNLOAD_RETRY, g.API_RETRY, g.UPLOAD_RETRY):
+        retry_policy.reset_budget()
+    pipeline.run(projects_to_copy)
+
+    report["projects"] = list(results.values())
+    statuses = [result["status"] for result in report["projects"]]
+    if "error" in statuses or "partial" in statuses:
+        succeeded = {"copied", "skipped", "partial"} & set(statuses)
+        report["status"] = "partial" if succeeded else "error"
+    elif "not_started" in statuses:
+        report["status"] = "stopped"
+    else:
+        # * All projects were copied, so the next run should start from scratch.
+        g.CHECKPOINT.clear()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Copy Roboflow projects to Supervisely without the app UI."
+    )
+    parser.add_argument("spec", help="path to the job spec in JSON or YAML format")
+    parser.add_argument(
+        "--report", help="path to the JSON report, the report is printed if not set"
+    )
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    jobs = get_jobs(spec)
+
+    # * Settings of the Supervisely instance must be in the environment before the app modules
+    # are imported, the first job's workspace is used as the default one.
+    for key, env_name in ENV_KEYS.items():
+        value = spec.get(key, jobs[0].get(key) if key == "workspace_id" else None)
+        if value is not None:
+            os.environ[env_name] = str(value)
+
+    import src.globals as g
+    from src.http_session import get_stats as get_http_stats
+    from src.uploader import get_stats as get_upload_stats
+
+    import supervisely as sly
+
+    g.STATE.headless = True
+
+    def stop(signum, _frame) -> None:
+        sly.logger.warning(f"Received signal {signum}, no new projects will be started.")
+        g.STATE.continue_copying = False
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    g.METRICS.reset()
+
+    report = {
+        "spec": os.path.abspath(args.spec),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "jobs": [],
+    }
+    for job in jobs:
+        if not g.STATE.continue_copying:
+            break
+        try:
+            report["jobs"].append(run_job(job))
+        except Exception as e:
+            sly.logger.error(
+                f"Job for workspace {job['workspace_id']} failed: {e}", exc_info=True
+            )
+            report["jobs"].append(
+                {
+                    "workspace_id": job["workspace_id"],
+                    "status": "error",
+                    "error": str(e),
+                    "projects": [],
+                }
+            )
+
+    sly.fs.clean_dir(g.ARCHIVE_DIR)
+    sly.fs.clean_dir(g.CONVERTED_DIR)
+
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+    report["http"] = get_http_stats()
+    report["upload"] = get_upload_stats()
+    report["stages"] = g.METRICS.get_report()["stages"]
+    try:
+        paths = g.METRICS.save(g.METRICS_DIR)
+        sly.logger.info(f"Metrics were saved to {', '.join(paths)}.")
+    except Exception as e:
+        sly.logger.warning(f"Failed to save metrics to {g.METRICS_DIR}: {e}")
+    report["status"] = (
+        "ok" if all(job["status"] == "ok" for job in report["jobs"]) else "error"
+    )
+
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+        sly.logger.info(f"Report was saved to {args.report}.")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    return 0 if report["status"] == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import threading
+from types import ModuleType
+from typing import Dict, Iterable
+
+import requests
+import supervisely as sly
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# * Counters of the HTTP layer, which allow to check how many clients and connections were used.
+_stats = {"clients": 0, "connections": 0, "requests": 0}
+_stats_lock = threading.Lock()
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increases the counter with the given name.
+
+    :param name: name of the counter: "clients", "connections" or "requests"
+    :type name: str
+    :param value: value to add, defaults to 1
+    :type value: int, optional
+    """
+    with _stats_lock:
+        _stats[name] += value
+
+
+def get_stats() -> Dict[str, int]:
+    """Returns the copy of the counters: number of constructed Roboflow clients,
+    opened TCP connections and sent HTTP requests since the start of the app."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        count("connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        count("connections")
+        return super()._new_conn()
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTP adapter with keep-alive connection pools, which counts every new TCP connection."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Creates the session, which keeps connections alive and reuses them between requests.
+
+    :param pool_size: maximum number of kept connections per host, should be not less
+        than the number of threads, which use the session at the same time
+    :type pool_size: int
+    :return: session with counting adapters for http and https
+    :rtype: requests.Session
+    """
+    session = requests.Session()
+    adapter = _CountingAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(lambda response, *args, **kwargs: count("requests"))
+    return session
+
+
+class SessionRequests:
+    """Replacement of the requests module, which sends requests with the shared session.
+    All other attributes (exceptions, models, etc.) are taken from the requests module.
+
+    :param session: session to send requests with
+    :type session: requests.Session
+    """
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.session.get(url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.session.post(url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.session.put(url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.session.patch(url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session.delete(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def use_session(session: requests.Session, modules: Iterable[ModuleType]) -> None:
+    """Makes the modules, which call functions of the requests module directly
+    (like the roboflow SDK does), send their requests with the shared session.
+
+    :param session: shared session
+    :type session: requests.Session
+    :param modules: modules, which imported the requests module
+    :type modules: Iterable[ModuleType]
+    """
+    replacement = SessionRequests(session)
+    for module in modules:
+        if getattr(module, "requests", None) is requests:
+            module.requests = replacement
+            sly.logger.debug(f"Module {module.__name__} will use the shared HTTP session.")
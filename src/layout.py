@@ -0,0 +1,164 @@
+import io
+import os
+import zipfile
+from collections import namedtuple
+from typing import BinaryIO, Dict, Iterator, List, TextIO
+
+import supervisely as sly
+
+# * Name of the annotations file in each split folder of the Roboflow COCO export.
+COCO_ANNOTATIONS_FILE = "_annotations.coco.json"
+
+# * Split of the COCO export: name of the split, path to its annotations file
+# and paths to the image files by their names. Paths are relative to the export source.
+CocoSplit = namedtuple("CocoSplit", ["name", "annotations_path", "images"])
+
+
+class ExportSource:
+    """Files of the Roboflow export, which are addressed by their relative paths
+    with "/" separators (e.g. "train/_annotations.coco.json")."""
+
+    def iter_files(self) -> Iterator[str]:
+        """Yields relative paths of all files of the export."""
+        raise NotImplementedError()
+
+    def open(self, path: str) -> BinaryIO:
+        """Opens the file of the export for binary reading."""
+        raise NotImplementedError()
+
+    def open_text(self, path: str) -> TextIO:
+        """Opens the file of the export for reading as UTF-8 text."""
+        return io.TextIOWrapper(self.open(path), encoding="utf-8")
+
+    def close(self) -> None:
+        """Releases resources of the source, files can't be opened after it."""
+
+
+class DirectorySource(ExportSource):
+    """Export, which is extracted to the directory.
+
+    :param directory: path to the directory
+    :type directory: str
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def iter_files(self) -> Iterator[str]:
+        def scan(directory: str, prefix: str) -> Iterator[str]:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        yield from scan(entry.path, f"{prefix}{entry.name}/")
+                    elif entry.is_file():
+                        yield f"{prefix}{entry.name}"
+
+        yield from scan(self.directory, "")
+
+    def open(self, path: str) -> BinaryIO:
+        return open(os.path.join(self.directory, path), "rb")
+
+
+class ZipSource(ExportSource):
+    """Export, which is read directly from the zip archive without extracting it.
+    Members are decompressed while they are read, so nothing is written to the disk.
+
+    :param archive_path: path to the zip archive
+    :type archive_path: str
+    """
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self._zip = zipfile.ZipFile(archive_path)
+
+    def iter_files(self) -> Iterator[str]:
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                yield info.filename
+
+    def open(self, path: str) -> BinaryIO:
+        return self._zip.open(path)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+def open_export(path: str) -> ExportSource:
+    """Returns the source of the export: the zip archive or the extracted directory.
+
+    :param path: path to the zip archive or to the directory
+    :type path: str
+    :rtype: ExportSource
+    """
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    return ZipSource(path)
+
+
+def resolve_coco_layout(source: ExportSource) -> List[CocoSplit]:
+    """Finds splits of the Roboflow COCO export in one pass over its files without changing
+    anything on the disk, so the annotations file and all images of the split are found
+    without checking every image path separately.
+
+    Roboflow layout: <split>/_annotations.coco.json and <split>/<image files>.
+    Layout with annotations/instances.json and images/ subfolders is also supported.
+
+    :param source: files of the export
+    :type source: ExportSource
+    :return: list of the splits, sorted by name, splits without annotations are skipped
+    :rtype: List[CocoSplit]
+    """
+    annotations = {}
+    images = {}
+    for path in source.iter_files():
+        parts = path.split("/")
+        if len(parts) == 2:
+            split_name, file_name = parts
+            if file_name == COCO_ANNOTATIONS_FILE:
+                annotations[split_name] = path
+            else:
+                images.setdefault(split_name, {})[file_name] = path
+        elif len(parts) == 3:
+            split_name, folder, file_name = parts
+            if folder == "annotations" and file_name == "instances.json":
+                annotations[split_name] = path
+            elif folder == "images":
+                images.setdefault(split_name, {})[file_name] = path
+
+    splits = []
+    for split_name in sorted(set(annotations) | set(images)):
+        if split_name not in annotations:
+            sly.logger.warning(f"No annotations found for split {split_name}, skipping.")
+            continue
+        split_images = images.get(split_name, {})
+        splits.append(CocoSplit(split_name, annotations[split_name], split_images))
+        sly.logger.debug(f"Found split {split_name} with {len(split_images)} files.")
+    return splits
+
+
+def resolve_folder_layout(source: ExportSource) -> Dict[str, Dict[str, List[str]]]:
+    """Finds images of the Roboflow classification export (folder format) in one pass over its files.
+    Layout: <split>/<class name>/<image files>.
+
+    :param source: files of the export
+    :type source: ExportSource
+    :return: paths of the images by split names and class names
+    :rtype: Dict[str, Dict[str, List[str]]]
+    """
+    image_extensions = {ext.lower() for ext in sly.image.SUPPORTED_IMG_EXTS}
+    datasets = {}
+    for path in source.iter_files():
+        parts = path.split("/")
+        if len(parts) != 3:
+            continue
+        split_name, class_name, file_name = parts
+        if os.path.splitext(file_name)[1].lower() not in image_extensions:
+            continue
+        datasets.setdefault(split_name, {}).setdefault(class_name, []).append(path)
+
+    return {
+        split_name: {
+            class_name: sorted(paths) for class_name, paths in sorted(split_images.items())
+        }
+        for split_name, split_images in sorted(datasets.items())
+    }
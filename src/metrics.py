@@ -0,0 +1,191 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import supervisely as sly
+
+# * Stages of the copying in the order of processing: download of the export archive,
+# preparation of the export (layout of the splits, categories and tags), conversion
+# of the annotations, optional re-encoding of the images (its bytes are the saved bytes)
+# and upload of the images with annotations.
+STAGES = ("download", "prepare", "convert", "transcode", "upload")
+
+# * Prefix of the names of the Prometheus metrics.
+PROMETHEUS_PREFIX = "roboflow_to_sly"
+
+
+class Metrics:
+    """Thread-safe collector of the duration, transferred bytes and processed items
+    of every stage for every copied project.
+
+    Values of the same stage are summed, e.g. when the upload is retried or the stage
+    is measured in several places.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projects = {}
+        self.started_at = None
+
+    def reset(self) -> None:
+        """Removes all collected values, should be called before the copying starts."""
+        with self._lock:
+            self._projects = {}
+            self.started_at = datetime.now(timezone.utc).isoformat()
+
+    def add(
+        self,
+        project_id: str,
+        stage: str,
+        seconds: float = 0.0,
+        bytes: int = 0,
+        items: int = 0,
+    ) -> None:
+        """Adds values to the stage of the project.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :param stage: name of the stage, one of STAGES
+        :type stage: str
+        :param seconds: duration in seconds, defaults to 0
+        :type seconds: float, optional
+        :param bytes: number of downloaded, saved or uploaded bytes, defaults to 0
+        :type bytes: int, optional
+        :param items: number of processed images, defaults to 0
+        :type items: int, optional
+        """
+        with self._lock:
+            stages = self._projects.setdefault(project_id, {})
+            values = stages.setdefault(stage, {"seconds": 0.0, "bytes": 0, "items": 0})
+            values["seconds"] += seconds
+            values["bytes"] += bytes
+            values["items"] += items
+
+    @contextmanager
+    def measure(self, project_id: str, stage: str) -> Iterator[None]:
+        """Adds the duration of the block to the stage of the project,
+        even if the block raised an exception.
+
+        Usage:
+            with g.METRICS.measure(project.id, "download"):
+                ...
+        """
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(project_id, stage, seconds=perf_counter() - started)
+
+    def get_project(self, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """Returns values of the stages of the project with their rates.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :return: dictionary with stage names as keys and dictionaries with seconds, bytes, items,
+            items_per_second and bytes_per_second as values
+        :rtype: Dict[str, Dict[str, Any]]
+        """
+        with self._lock:
+            stages = {
+                stage: dict(values)
+                for stage, values in self._projects.get(project_id, {}).items()
+            }
+        return {stage: _with_rates(values) for stage, values in _ordered(stages)}
+
+    def get_report(self) -> Dict[str, Any]:
+        """Returns values of all projects and their totals by stage."""
+        with self._lock:
+            project_ids = list(self._projects)
+            started_at = self.started_at
+        projects = {project_id: self.get_project(project_id) for project_id in project_ids}
+
+        totals = {}
+        for stages in projects.values():
+            for stage, values in stages.items():
+                total = totals.setdefault(stage, {"seconds": 0.0, "bytes": 0, "items": 0})
+                for key in total:
+                    total[key] += values[key]
+        return {
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "projects": projects,
+            "stages": {stage: _with_rates(values) for stage, values in _ordered(totals)},
+        }
+
+    def to_prometheus(self) -> str:
+        """Returns values of all projects in the Prometheus text exposition format."""
+        report = self.get_report()
+        descriptions = {
+            "seconds": "Time spent on the stage of the project copying.",
+            "bytes": "Bytes downloaded, saved by re-encoding or uploaded on the stage "
+            "of the project copying.",
+            "items": "Images processed on the stage of the project copying.",
+        }
+        lines = []
+        for key, description in descriptions.items():
+            name = f"{PROMETHEUS_PREFIX}_stage_{key}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for project_id, stages in report["projects"].items():
+                for stage, values in stages.items():
+                    labels = f'project="{_escape(project_id)}",stage="{stage}"'
+                    lines.append(f"{name}{{{labels}}} {values[key]}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, directory: str) -> List[str]:
+        """Saves the JSON report and the Prometheus metrics to the directory.
+
+        :param directory: directory for metrics.json and metrics.prom files
+        :type directory: str
+        :return: paths to the saved files
+        :rtype: List[str]
+        """
+        sly.fs.mkdir(directory)
+        json_path = os.path.join(directory, "metrics.json")
+        prometheus_path = os.path.join(directory, "metrics.prom")
+        with open(json_path, "w") as file:
+            json.dump(self.get_report(), file, indent=2)
+        with open(prometheus_path, "w") as file:
+            file.write(self.to_prometheus())
+        return [json_path, prometheus_path]
+
+
+def format_stage(values: Optional[Dict[str, Any]]) -> str:
+    """Returns the stage values as a short text for the projects table, e.g. "12.5 s, 40.2 img/s".
+
+    :param values: values of the stage from Metrics.get_project(), or None if it wasn't started
+    :type values: Optional[Dict[str, Any]]
+    :rtype: str
+    """
+    if not values:
+        return ""
+    parts = [f"{values['seconds']:.1f} s"]
+    if values["items_per_second"]:
+        parts.append(f"{values['items_per_second']:.1f} img/s")
+    elif values["bytes_per_second"]:
+        parts.append(f"{values['bytes_per_second'] / 1024 ** 2:.1f} MiB/s")
+    return ", ".join(parts)
+
+
+def _with_rates(values: Dict[str, Any]) -> Dict[str, Any]:
+    seconds = values["seconds"]
+    return {
+        "seconds": round(seconds, 3),
+        "bytes": values["bytes"],
+        "items": values["items"],
+        "items_per_second": round(values["items"] / seconds, 2) if seconds else 0.0,
+        "bytes_per_second": round(values["bytes"] / seconds, 2) if seconds else 0.0,
+    }
+
+
+def _ordered(stages: Dict[str, Any]) -> List:
+    order = {stage: idx for idx, stage in enumerate(STAGES)}
+    return sorted(stages.items(), key=lambda item: order.get(item[0], len(order)))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,156 @@
+import threading
+from queue import Queue
+from typing import Any, Callable, Iterable, List, Optional
+
+import supervisely as sly
+
+
+class Stage:
+    """One step of the copying pipeline with its own pool of worker threads.
+
+    :param name: name of the stage, used in logs and in error callbacks
+    :type name: str
+    :param function: function which receives the item and the result of the previous stage
+        (or the item itself for the first stage) and returns the payload for the next stage.
+        If it returns None or False, the item is considered as failed and will not be passed further.
+        If it returns Pipeline.STOPPED, the item was stopped by the user and is not passed further either.
+    :type function: Callable[[Any, Any], Any]
+    :param workers: number of worker threads for the stage, defaults to 1
+    :type workers: int, optional
+    :param queue_size: maximum number of items waiting for the stage, defaults to 1
+    :type queue_size: int, optional
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[Any, Any], Any],
+        workers: int = 1,
+        queue_size: int = 1,
+    ):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.queue = Queue(maxsize=max(1, queue_size))
+
+
+class Pipeline:
+    """Runs items through the sequence of stages, so different items can be processed
+    on different stages at the same time (e.g. project N+1 is downloading, while project N
+    is converting and project N-1 is uploading).
+
+    All callbacks are called under the pipeline lock, so they can safely update counters and widgets.
+
+    :param stages: list of stages in the order of processing
+    :type stages: List[Stage]
+    :param on_start: called with the item right before the first stage starts processing it
+    :type on_start: Optional[Callable[[Any], None]]
+    :param on_done: called with the item and the result of the last stage on success
+    :type on_done: Optional[Callable[[Any, Any], None]]
+    :param on_error: called with the item and the name of the failed stage on failure
+    :type on_error: Optional[Callable[[Any, str], None]]
+    :param on_stop: called with the item and the name of the stage, which returned Pipeline.STOPPED
+    :type on_stop: Optional[Callable[[Any, str], None]]
+    :param should_continue: checked before each new item enters the first stage, if it returns False,
+        no new items will be started, but items which are already in progress will be finished
+    :type should_continue: Optional[Callable[[], bool]]
+    """
+
+    _STOP = object()
+    # * Result of the stage, which was interrupted by the stop, it's not reported as an error.
+    STOPPED = object()
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_start: Optional[Callable[[Any], None]] = None,
+        on_done: Optional[Callable[[Any, Any], None]] = None,
+        on_error: Optional[Callable[[Any, str], None]] = None,
+        on_stop: Optional[Callable[[Any, str], None]] = None,
+        should_continue: Optional[Callable[[], bool]] = None,
+    ):
+        self.stages = stages
+        self.on_start = on_start
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_stop = on_stop
+        self.should_continue = should_continue or (lambda: True)
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Any]) -> None:
+        """Processes all items and blocks until every started item left the pipeline.
+
+        :param items: items to process (e.g. Roboflow projects)
+        :type items: Iterable[Any]
+        """
+        stage_threads = []
+        for idx, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(idx,),
+                    name=f"{stage.name}-{number}",
+                    daemon=True,
+                )
+                for number in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+
+        first_queue = self.stages[0].queue
+        for item in items:
+            if not self.should_continue():
+                sly.logger.info("Pipeline was stopped, no new items will be started.")
+                break
+            first_queue.put((item, item))
+
+        # Stages are shut down one after another, so every item which is already
+        # in the pipeline will be passed through all remaining stages.
+        for stage, threads in zip(self.stages, stage_threads):
+            for _ in threads:
+                stage.queue.put(self._STOP)
+            for thread in threads:
+                thread.join()
+
+    def _worker(self, stage_idx: int) -> None:
+        stage = self.stages[stage_idx]
+        is_last = stage_idx == len(self.stages) - 1
+
+        while True:
+            job = stage.queue.get()
+            if job is self._STOP:
+                return
+
+            item, payload = job
+            if stage_idx == 0:
+                if not self.should_continue():
+                    # Item was queued, but not started yet, so it can be safely skipped.
+                    continue
+                self._callback(self.on_start, item)
+
+            try:
+                result = stage.function(item, payload)
+            except Exception as e:
+                sly.logger.warning(
+                    f"Stage {stage.name} failed for {item}: {e}", exc_info=True
+                )
+                result = None
+
+            if result is self.STOPPED:
+                self._callback(self.on_stop, item, stage.name)
+            elif result is None or result is False:
+                self._callback(self.on_error, item, stage.name)
+            elif is_last:
+                self._callback(self.on_done, item, result)
+            else:
+                self.stages[stage_idx + 1].queue.put((item, result))
+
+    def _callback(self, callback: Optional[Callable], *args) -> None:
+        if callback is None:
+            return
+        with self._lock:
+            try:
+                callback(*args)
+            except Exception as e:
+                sly.logger.warning(f"Pipeline callback failed: {e}", exc_info=True)
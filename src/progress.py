@@ -0,0 +1,124 @@
+import threading
+from time import monotonic
+from typing import Callable, Optional
+
+import supervisely as sly
+
+
+class ProgressTracker:
+    """Counts the progress of the long operation (e.g. downloaded bytes or uploaded images)
+    and passes it to the reporter at most once per interval, so update() is cheap enough
+    to be called for every chunk or image in the hot loop.
+
+    :param name: description of the operation, e.g. "Downloading project cats"
+    :type name: str
+    :param total: expected total value, None if it's not known yet
+    :type total: int, optional
+    :param unit: unit of the values, "B" for bytes, defaults to "it"
+    :type unit: str, optional
+    :param interval: minimum number of seconds between reports, defaults to 1
+    :type interval: float, optional
+    :param reporter: called with the tracker on reports, the last call is made by close()
+        with the closed tracker
+    :type reporter: Callable[[ProgressTracker], None], optional
+    """
+
+    def __init__(
+        self,
+        name: str,
+        total: Optional[int] = None,
+        unit: str = "it",
+        interval: float = 1.0,
+        reporter: Optional[Callable[["ProgressTracker"], None]] = None,
+    ):
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.reporter = reporter
+        self.done = 0
+        self.closed = False
+        self._started = monotonic()
+        self._reported_at = self._started
+        self._lock = threading.Lock()
+
+    def update(self, value: int = 1) -> None:
+        """Adds the value to the progress and reports it if the interval has passed."""
+        if self.closed:
+            return
+        with self._lock:
+            self.done += value
+            now = monotonic()
+            if now - self._reported_at < self.interval:
+                return
+            self._reported_at = now
+        self._report()
+
+    def set_total(self, total: Optional[int]) -> None:
+        self.total = total
+
+    def reset(self, total: Optional[int] = None) -> None:
+        """Starts counting from zero, e.g. when the failed download is retried."""
+        with self._lock:
+            self.done = 0
+            self.total = total
+            self._started = monotonic()
+        self._report()
+
+    def close(self) -> None:
+        """Reports the final progress, nothing is reported after that."""
+        if self.closed:
+            return
+        self.closed = True
+        self._report()
+
+    @property
+    def elapsed(self) -> float:
+        return monotonic() - self._started
+
+    @property
+    def rate(self) -> float:
+        """Average speed in units per second since the start."""
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated number of seconds until the end, None if the total or the rate is unknown."""
+        rate = self.rate
+        if not self.total or not rate:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def format(self) -> str:
+        """Returns the progress as a text, e.g. "12.0 MiB of 40.0 MiB, 2.5 MiB/s, ETA 00:00:11"
+        or "120/400 images, 35.2 images/s, ETA 00:00:08"."""
+        if self.unit == "B":
+            text = _format_bytes(self.done)
+            if self.total:
+                text += f" of {_format_bytes(self.total)}"
+            text += f", {_format_bytes(self.rate)}/s"
+        else:
+            text = f"{self.done}/{self.total}" if self.total else str(self.done)
+            text += f" {self.unit}, {self.rate:.1f} {self.unit}/s"
+        eta = self.eta
+        if eta is not None:
+            hours, rest = divmod(int(eta), 3600)
+            text += f", ETA {hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+        return text
+
+    def _report(self) -> None:
+        if self.reporter is None:
+            return
+        try:
+            self.reporter(self)
+        except Exception as e:
+            sly.logger.debug(f"Failed to report progress of {self.name}: {e}")
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
@@ -0,0 +1,203 @@
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from time import sleep
+from typing import Any, Callable, Dict, Optional
+
+import requests
+import supervisely as sly
+
+# * HTTP status codes, which mean that the same request can succeed later.
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# * Errors of the data or the code, retrying them will not help.
+FATAL_ERRORS = (
+    KeyError,
+    TypeError,
+    ValueError,
+    AttributeError,
+    NotImplementedError,
+    FileNotFoundError,
+    PermissionError,
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Checks if the operation, which failed with the error, should be retried.
+    Network errors and HTTP errors with retryable status codes are retryable,
+    other HTTP errors (e.g. 401 or 404) and errors of the data are fatal.
+    Unknown errors are considered as retryable, e.g. the roboflow SDK wraps
+    API errors into RuntimeError.
+
+    :param error: raised exception
+    :type error: Exception
+    :rtype: bool
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (requests.exceptions.RequestException, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, FATAL_ERRORS):
+        return False
+    return True
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Returns the number of seconds from the Retry-After header of the HTTP error response,
+    or None if there is no such header.
+
+    :param error: raised exception
+    :type error: Exception
+    :rtype: Optional[float]
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Retries the failed operations with exponential backoff and full jitter.
+
+    Each policy has the retry budget: the total number of retries for all operations of the stage
+    during one copying run, so persistent problems fail fast instead of retrying every batch.
+
+    :param name: name of the stage, used in logs
+    :type name: str
+    :param attempts: maximum number of attempts for one operation (including the first one)
+    :type attempts: int
+    :param base_delay: delay before the first retry in seconds, doubled on every next retry
+    :type base_delay: float
+    :param max_delay: maximum delay between attempts in seconds, also limits Retry-After
+    :type max_delay: float
+    :param budget: total number of retries for the stage, until reset_budget() is called
+    :type budget: int
+    """
+
+    def __init__(
+        self,
+        name: str,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        budget: int,
+    ):
+        self.name = name
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retries_left = budget
+        self._lock = threading.Lock()
+
+    def reset_budget(self) -> None:
+        with self._lock:
+            self.retries_left = self.budget
+
+    def _take_retry(self) -> bool:
+        with self._lock:
+            if self.retries_left <= 0:
+                return False
+            self.retries_left -= 1
+            return True
+
+    def get_delay(self, attempt: int, error: Exception) -> float:
+        """Returns the delay before the next attempt: Retry-After from the server if it's provided,
+        otherwise random delay up to base_delay * 2 ** (attempt - 1), both limited by max_delay.
+
+        :param attempt: number of the failed attempt, starting from 1
+        :type attempt: int
+        :param error: exception, raised by the failed attempt
+        :type error: Exception
+        :rtype: float
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(
+        self,
+        function: Callable,
+        *args,
+        description: Optional[str] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ) -> Any:
+        """Calls the function and retries it on retryable errors.
+        Raises the last error if it's fatal, attempts are over or the budget is exhausted.
+
+        :param function: function to call
+        :type function: Callable
+        :param description: description of the operation for logs, defaults to the function name
+        :type description: str, optional
+        :param on_retry: called before every retry, e.g. to remove partial results of the failed attempt
+        :type on_retry: Callable[[], None], optional
+        :return: result of the function
+        :rtype: Any
+        """
+        description = description or getattr(function, "__name__", "operation")
+        attempt = 1
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    sly.logger.warning(f"{description} failed with a fatal error: {e}")
+                    raise
+                if attempt >= self.attempts:
+                    sly.logger.warning(f"{description} failed after {attempt} attempts: {e}")
+                    raise
+                if not self._take_retry():
+                    sly.logger.warning(
+                        f"{description} failed: {e}. Retry budget of the {self.name} stage "
+                        "is exhausted, will not retry."
+                    )
+                    raise
+
+                delay = self.get_delay(attempt, e)
+                sly.logger.info(
+                    f"{description} failed on attempt {attempt}/{self.attempts}: {e}. "
+                    f"Will retry in {delay:.1f} seconds."
+                )
+                sleep(delay)
+                if on_retry is not None:
+                    try:
+                        on_retry()
+                    except Exception as retry_error:
+                        sly.logger.warning(
+                            f"Failed to prepare the retry of {description}: {retry_error}"
+                        )
+                attempt += 1
+
+
+class SingleAttemptApi(sly.Api):
+    """Supervisely API, which sends every POST request only once and raises the HTTP error
+    with its response instead of retrying it. It's used for the requests, which are retried
+    by RetryPolicy, so the policy is the only retry layer and sees the status code and
+    the Retry-After header of the failed request.
+    """
+
+    def post(
+        self,
+        method: str,
+        data: Dict,
+        retries: Optional[int] = None,
+        stream: Optional[bool] = False,
+        raise_error: Optional[bool] = False,
+    ) -> requests.Response:
+        return super().post(method, data, retries=1, stream=stream, raise_error=True)
@@ -1,17 +1,67 @@
 import os
-from typing import List, Optional
+import json
+import hashlib
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Dict, List, Optional
 import supervisely as sly
 import roboflow
+import roboflow.adapters.rfapi
+import roboflow.core.project
+import roboflow.core.version
+import roboflow.core.workspace
+from roboflow.config import API_URL
+from roboflow.core.project import Project
+from roboflow.core.version import Version
 
 import src.globals as g
+from src.http_session import count, create_session, use_session
+from src.progress import ProgressTracker
 
+# * All requests to the Roboflow API, including the ones sent by the SDK, share one pool
+# of keep-alive connections instead of opening a new connection for every request.
+SESSION = create_session(g.HTTP_POOL_SIZE)
+use_session(
+    SESSION,
+    [
+        roboflow,
+        roboflow.adapters.rfapi,
+        roboflow.core.project,
+        roboflow.core.version,
+        roboflow.core.workspace,
+    ],
+)
+
+_projects_cache_lock = threading.Lock()
+
+# * Roboflow clients by (API address, API key), each client validates the key over the network
+# on creation, so it's created once and reused.
+_clients = {}
+_clients_lock = threading.Lock()
 
-def get_configuration():
-    try:
-        return roboflow.Roboflow(api_key=g.STATE.roboflow_api_key)
-    except Exception as e:
-        sly.logger.error(f"Exception when calling Roboflow API: {e}")
-        return
+
+def get_configuration() -> Optional[roboflow.Roboflow]:
+    """Returns Roboflow client for the saved in the global state credentials.
+    The client is created on the first call and reused on the next ones.
+
+    :return: Roboflow client or None if the credentials are invalid
+    :rtype: Optional[roboflow.Roboflow]
+    """
+    key = (g.STATE.roboflow_api_address, g.STATE.roboflow_api_key)
+    with _clients_lock:
+        rf = _clients.get(key)
+        if rf is not None:
+            return rf
+        try:
+            rf = roboflow.Roboflow(api_key=g.STATE.roboflow_api_key)
+        except Exception as e:
+            sly.logger.error(f"Exception when calling Roboflow API: {e}")
+            return
+        count("clients")
+        _clients[key] = rf
+        return rf
 
 
 def get_workspace() -> roboflow.Workspace:
@@ -33,64 +83,247 @@ def get_workspace() -> roboflow.Workspace:
     return workspace
 
 
-def get_projects(workspace: roboflow.Workspace = None) -> List[roboflow.Project]:
+def get_projects(
+    workspace: roboflow.Workspace = None, use_cache: bool = True
+) -> List[roboflow.Project]:
+    """Returns all projects of the Roboflow workspace. Metadata of the projects is fetched
+    concurrently and saved to the on-disk cache, so the next call with the same credentials
+    within g.PROJECTS_CACHE_TTL seconds doesn't make any requests.
+
+    :param workspace: Roboflow Workspace object, defaults to the workspace of the saved credentials
+    :type workspace: roboflow.Workspace, optional
+    :param use_cache: if False, metadata will be fetched from the API even if it's cached
+    :type use_cache: bool, optional
+    :return: list of Roboflow Project objects
+    :rtype: List[roboflow.Project]
+    """
+    api_key = g.STATE.roboflow_api_key
+    cache_key = _projects_cache_key()
+
+    infos = _read_projects_cache(cache_key) if use_cache else None
+    if infos is not None:
+        sly.logger.debug(f"Loaded metadata of {len(infos)} projects from the cache.")
+        return [Project(api_key, info) for info in infos]
+
     if workspace is None:
         workspace = get_workspace()
-    project_names = workspace.projects()
-    rf = get_configuration()
-    return [rf.project(project_name) for project_name in project_names]
+        if not workspace:
+            return []
+    project_ids = workspace.projects()
+    sly.logger.debug(
+        f"Fetching metadata of {len(project_ids)} projects "
+        f"with {g.PROJECTS_FETCH_WORKERS} workers."
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, g.PROJECTS_FETCH_WORKERS)) as executor:
+        infos = list(executor.map(_fetch_project_info, project_ids))
+
+    fetched = [info for info in infos if info is not None]
+    if len(fetched) == len(infos):
+        # * Partial results are not cached, so failed projects will be requested again next time.
+        _write_projects_cache(cache_key, fetched)
+    else:
+        sly.logger.warning(
+            f"Failed to fetch metadata of {len(infos) - len(fetched)} projects, "
+            "they will not be shown."
+        )
+    return [Project(api_key, info) for info in fetched]
+
+
+def _fetch_project_info(project_id: str) -> Optional[Dict]:
+    """Returns metadata of the Roboflow project as it's returned by the API, or None on failure.
+
+    :param project_id: full ID of the project like "workspace/project"
+    :type project_id: str
+    :rtype: Optional[Dict]
+    """
+    try:
+        response = SESSION.get(
+            f"{API_URL}/{project_id}",
+            params={"api_key": g.STATE.roboflow_api_key},
+            timeout=60,
+        )
+        response.raise_for_status()
+        return response.json()["project"]
+    except Exception as e:
+        sly.logger.warning(f"Failed to fetch metadata of project {project_id}: {e}")
+        return None
+
+
+def _projects_cache_key() -> str:
+    """Returns the key of the projects cache for the saved credentials.
+    The API key itself is not stored in the cache file, only its hash."""
+    credentials = f"{g.STATE.roboflow_api_address}:{g.STATE.roboflow_api_key}"
+    return hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+
+
+def _read_projects_cache(cache_key: str) -> Optional[List[Dict]]:
+    with _projects_cache_lock:
+        if not os.path.exists(g.PROJECTS_CACHE_FILE):
+            return None
+        try:
+            with open(g.PROJECTS_CACHE_FILE, "r") as file:
+                entry = json.load(file).get(cache_key)
+        except Exception as e:
+            sly.logger.warning(f"Failed to read the projects cache: {e}")
+            return None
+    if entry is None or time() - entry["fetched_at"] > g.PROJECTS_CACHE_TTL:
+        return None
+    return entry["projects"]
+
+
+def _write_projects_cache(cache_key: str, infos: List[Dict]) -> None:
+    with _projects_cache_lock:
+        cache = {}
+        if os.path.exists(g.PROJECTS_CACHE_FILE):
+            try:
+                with open(g.PROJECTS_CACHE_FILE, "r") as file:
+                    cache = json.load(file)
+            except Exception:
+                cache = {}
+        # * Expired entries of other credentials are dropped, so the file doesn't grow forever.
+        cache = {
+            key: entry
+            for key, entry in cache.items()
+            if time() - entry.get("fetched_at", 0) <= g.PROJECTS_CACHE_TTL
+        }
+        cache[cache_key] = {"fetched_at": time(), "projects": infos}
+        temp_path = g.PROJECTS_CACHE_FILE + ".tmp"
+        try:
+            with open(temp_path, "w") as file:
+                json.dump(cache, file)
+            os.replace(temp_path, g.PROJECTS_CACHE_FILE)
+        except Exception as e:
+            sly.logger.warning(f"Failed to write the projects cache: {e}")
+
+
+def get_latest_version(project: roboflow.Project) -> Optional[int]:
+    """Returns number of the latest version of the Roboflow project.
+
+    :param project: Roboflow Project object
+    :type project: roboflow.Project
+    :return: number of the latest version, or None if the project has no versions
+    :rtype: Optional[int]
+    """
+    latest = get_latest_version_info(project)
+    if latest is None:
+        return None
+    # versions()[-1].version is the full ID like "workspace/project/1";
+    return int(os.path.basename(str(latest.version)))
+
+
+def get_latest_version_info(project: roboflow.Project) -> Optional[Version]:
+    """Returns the latest version of the Roboflow project with its metadata.
+
+    :param project: Roboflow Project object
+    :type project: roboflow.Project
+    :return: Version object, or None if the project has no versions
+    :rtype: Optional[Version]
+    """
+    versions = project.versions()
+    if not versions:
+        sly.logger.warning(
+            f"Project {project.name} has no versions. "
+            "In order to download the project, it must have at least one version."
+        )
+        return None
+    return versions[-1]
+
+
+def estimate_export_size(version: Version) -> int:
+    """Estimates the size of the export archive of the version in bytes
+    by the number of its images and g.ESTIMATED_IMAGE_SIZE.
+
+    :param version: Version object from Roboflow API
+    :type version: Version
+    :return: estimated size in bytes, 0 if the number of images is unknown
+    :rtype: int
+    """
+    images = getattr(version, "images", None)
+    if not isinstance(images, int):
+        return 0
+    return images * g.ESTIMATED_IMAGE_SIZE
 
 
 def download_project(
     project: roboflow.Project,
     save_dir: str,
     export_format: str,
+    version_number: Optional[int] = None,
+    progress: Optional[ProgressTracker] = None,
 ) -> Optional[str]:
-    """Downloads and extracts a Roboflow project using the SDK.
+    """Downloads the zip archive with the export of the Roboflow project version.
+    The archive is not extracted, its files are read directly from it.
+    If the download fails, the partially downloaded file is removed and the error is raised,
+    so the download can be retried.
 
     :param project: Roboflow Project object
     :type project: roboflow.Project
-    :param save_dir: directory where the project will be downloaded
+    :param save_dir: directory where the archive will be saved
     :type save_dir: str
     :param export_format: format to export the project (e.g. "coco", "folder")
     :type export_format: str
-    :return: path to the extracted project directory, or None on failure
+    :param version_number: number of the version to download, defaults to the latest version
+    :type version_number: Optional[int], optional
+    :param progress: tracker of the downloaded bytes, it's reset on every attempt
+    :type progress: Optional[ProgressTracker], optional
+    :return: path to the downloaded archive, or None if the project has no versions
     :rtype: Optional[str]
     """
-    versions = project.versions()
-    if not versions:
-        sly.logger.warning(
-            f"Project {project.name} has no versions. "
-            "In order to download the project, it must have at least one version."
-        )
-        return None
-
-    # versions()[-1].version is the full ID like "workspace/project/1";
-    latest = versions[-1]
-    version_number = int(os.path.basename(str(latest.version)))
+    if version_number is None:
+        version_number = get_latest_version(project)
+        if version_number is None:
+            return None
     version = project.version(version_number)
 
-    sly.logger.debug(f"Using latest version {version_number}.")
-    sly.logger.info(
-        f"Downloading project {project.name} in {export_format} format to {save_dir}."
+    sly.logger.debug(f"Using version {version_number}.")
+    if export_format not in version.exports:
+        # * Waits until Roboflow generates the export in the requested format.
+        version.export(export_format)
+
+    workspace_url, project_url = project.id.rsplit("/", 1)
+    export_info = roboflow.adapters.rfapi.get_version_export(
+        api_key=g.STATE.roboflow_api_key,
+        workspace_url=workspace_url,
+        project_url=project_url,
+        version=str(version_number),
+        format=export_format,
     )
+    if export_info.get("ready") is False:
+        raise RuntimeError(f"Export of project {project.name} is not ready yet.")
+    link = export_info["export"]["link"]
 
-    # Set DATASET_DIRECTORY so the roboflow SDK downloads into save_dir regardless of its version.
-    # Passing location= directly is unreliable in roboflow>=1.3 (files may not appear there).
-    prev_dataset_dir = os.environ.get("DATASET_DIRECTORY")
-    os.environ["DATASET_DIRECTORY"] = save_dir
+    archive_path = os.path.join(
+        save_dir, f"{project_url}-{version_number}-{export_format}.zip"
+    )
+    temp_path = archive_path + ".part"
+    sly.logger.info(
+        f"Downloading project {project.name} in {export_format} format to {archive_path}."
+    )
     try:
-        dataset = version.download(export_format)
-        extract_path = os.path.abspath(dataset.location)
-        sly.logger.info(
-            f"Successfully downloaded project {project.name} to {extract_path}."
-        )
-        return extract_path
+        with SESSION.get(link, stream=True, timeout=(60, 600)) as response:
+            response.raise_for_status()
+            expected_size = int(response.headers.get("Content-Length", 0))
+            if progress is not None:
+                progress.reset(expected_size or None)
+            with open(temp_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    file.write(chunk)
+                    if progress is not None:
+                        progress.update(len(chunk))
+        size = os.path.getsize(temp_path)
+        if expected_size and size != expected_size:
+            raise ConnectionError(
+                f"Archive of project {project.name} is incomplete: "
+                f"{size} of {expected_size} bytes were downloaded."
+            )
+        if not zipfile.is_zipfile(temp_path):
+            raise RuntimeError(f"Downloaded file for project {project.name} is not a zip archive.")
+        os.replace(temp_path, archive_path)
     except Exception as e:
         sly.logger.error(f"Failed to download project {project.name}: {e}")
-        return None
-    finally:
-        if prev_dataset_dir is None:
-            os.environ.pop("DATASET_DIRECTORY", None)
-        else:
-            os.environ["DATASET_DIRECTORY"] = prev_dataset_dir
+        sly.fs.silent_remove(temp_path)
+        raise
+
+    sly.logger.info(f"Successfully downloaded project {project.name} to {archive_path}.")
+    return archive_path
@@ -0,0 +1,166 @@
+import os
+import json
+import threading
+from time import time
+from typing import Dict, Optional
+
+import supervisely as sly
+
+from src.retry import RetryPolicy
+
+
+class JsonStore:
+    """Base class for the state, which is stored in the local JSON file and mirrored to Team Files,
+    so it survives the restart of the app container.
+
+    The state is saved to the local file on every change and uploaded to Team Files
+    not more often than once in sync_interval seconds (or immediately if forced).
+    On loading, the newest of the local and the remote copies is used.
+
+    :param local_path: path to the local JSON file
+    :type local_path: str
+    :param api: Supervisely API object to mirror the file to Team Files, defaults to None
+    :type api: sly.Api, optional
+    :param team_id: ID of the team for Team Files, defaults to None
+    :type team_id: int, optional
+    :param remote_path: path to the file in Team Files, defaults to None
+    :type remote_path: str, optional
+    :param sync_interval: minimum interval between uploads to Team Files in seconds, defaults to 60
+    :type sync_interval: int, optional
+    :param retry: policy to retry the failed download and upload of the copy in Team Files,
+        defaults to None (no retries)
+    :type retry: RetryPolicy, optional
+    """
+
+    def __init__(
+        self,
+        local_path: str,
+        api: sly.Api = None,
+        team_id: int = None,
+        remote_path: str = None,
+        sync_interval: int = 60,
+        retry: RetryPolicy = None,
+    ):
+        self.local_path = local_path
+        self.api = api
+        self.team_id = team_id
+        self.remote_path = remote_path
+        self.sync_interval = sync_interval
+        self.retry = retry
+
+        self._lock = threading.RLock()
+        self._last_sync = 0
+        # * Upload to Team Files is done outside of the lock by one thread at a time,
+        # requests of other threads during the upload are served by the same thread after it.
+        self._syncing = False
+        self._sync_requested = False
+        self._data = {"updated_at": 0, "projects": {}}
+
+        self.load()
+
+    def load(self) -> None:
+        """Loads the state from the local file or from Team Files, whichever is newer."""
+        candidates = [self._read(self.local_path)]
+
+        if self._remote_enabled():
+            remote_copy = self.local_path + ".remote"
+            try:
+                if self._with_retry(self._download, remote_copy, description="Download"):
+                    candidates.append(self._read(remote_copy))
+            except Exception as e:
+                sly.logger.warning(
+                    f"Failed to download {self.remote_path} from Team Files: {e}"
+                )
+            finally:
+                sly.fs.silent_remove(remote_copy)
+
+        candidates = [data for data in candidates if data is not None]
+        if candidates:
+            self._data = max(candidates, key=lambda data: data.get("updated_at", 0))
+            sly.logger.info(
+                f"Loaded {self.local_path} with {len(self._data['projects'])} projects."
+            )
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as file:
+                return json.load(file)
+        except Exception as e:
+            sly.logger.warning(f"Failed to read {path}: {e}")
+            return None
+
+    def _remote_enabled(self) -> bool:
+        return all([self.api, self.team_id, self.remote_path])
+
+    def save(self, force_sync: bool = False) -> None:
+        """Saves the state to the local file and mirrors it to Team Files if it's time to.
+
+        The upload doesn't block other threads, which change the state: if the file is already
+        being uploaded, it will be uploaded again by the same thread after the current upload.
+
+        :param force_sync: if True, the file will be uploaded to Team Files immediately
+        :type force_sync: bool, optional
+        """
+        with self._lock:
+            self._data["updated_at"] = time()
+            temp_path = self.local_path + ".tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self._data, file)
+            # * Replacing is atomic, so the upload always reads the complete file.
+            os.replace(temp_path, self.local_path)
+
+            if not self._remote_enabled():
+                return
+            if not force_sync and time() - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = time()
+            self._sync_requested = True
+            if self._syncing:
+                return
+            self._syncing = True
+        self._sync()
+
+    def _sync(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sync_requested:
+                    self._syncing = False
+                    return
+                self._sync_requested = False
+            try:
+                self._with_retry(self._upload, description="Upload")
+            except Exception as e:
+                sly.logger.warning(
+                    f"Failed to upload {self.remote_path} to Team Files: {e}"
+                )
+
+    def _with_retry(self, function, *args, description: str):
+        if self.retry is None:
+            return function(*args)
+        return self.retry.call(
+            function, *args, description=f"{description} of {self.remote_path} in Team Files"
+        )
+
+    def _download(self, path: str) -> bool:
+        if not self.api.file.exists(self.team_id, self.remote_path):
+            return False
+        self.api.file.download(self.team_id, self.remote_path, path)
+        return True
+
+    def _upload(self) -> None:
+        if self.api.file.exists(self.team_id, self.remote_path):
+            self.api.file.remove(self.team_id, self.remote_path)
+        self.api.file.upload(self.team_id, self.local_path, self.remote_path)
+
+    def get_project(self, project_id: str) -> Optional[Dict]:
+        """Returns the stored state of the Roboflow project or None if there is no state for it.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :rtype: Optional[Dict]
+        """
+        with self._lock:
+            return self._data["projects"].get(str(project_id))
@@ -0,0 +1,90 @@
+from typing import Dict, List, Set
+
+from src.storage import JsonStore
+
+
+class SyncState(JsonStore):
+    """State of the incremental synchronization between Roboflow and Supervisely.
+    For each Roboflow project stores ID of the Supervisely project, the last synced version,
+    the time of the last update of the Roboflow project and names of the synced images in each dataset,
+    so on the next run unchanged projects are skipped and only new images are uploaded.
+    """
+
+    def is_up_to_date(self, project_id: str, updated: str, version: int = None) -> bool:
+        """Checks if the Roboflow project wasn't changed since the last sync.
+        If the version is not provided, only the time of the last update is compared.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :param updated: time of the last update of the Roboflow project
+        :type updated: str
+        :param version: number of the latest version of the Roboflow project, defaults to None
+        :type version: int, optional
+        :return: True if the project was synced and wasn't changed since then
+        :rtype: bool
+        """
+        project = self.get_project(project_id)
+        if project is None:
+            return False
+        if version is None:
+            return project["updated"] == updated
+        return project["version"] == version
+
+    def get_images(self, project_id: str, dataset_name: str) -> Set[str]:
+        """Returns names of the images, which were already synced to the dataset.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :param dataset_name: name of the dataset
+        :type dataset_name: str
+        :return: set of image names
+        :rtype: Set[str]
+        """
+        project = self.get_project(project_id)
+        if project is None:
+            return set()
+        return set(project["images"].get(dataset_name, []))
+
+    def update_project(
+        self,
+        project_id: str,
+        sly_project_id: int,
+        url: str,
+        version: int,
+        updated: str,
+        images: Dict[str, List[str]],
+    ) -> None:
+        """Saves the state of the project after the successful sync.
+        Names of the images are added to the names, which were synced before.
+
+        :param project_id: ID of the Roboflow project
+        :type project_id: str
+        :param sly_project_id: ID of the Supervisely project
+        :type sly_project_id: int
+        :param url: URL of the Supervisely project
+        :type url: str
+        :param version: number of the synced version of the Roboflow project
+        :type version: int
+        :param updated: time of the last update of the Roboflow project
+        :type updated: str
+        :param images: names of the synced images for each dataset
+        :type images: Dict[str, List[str]]
+        """
+        with self._lock:
+            project = self._data["projects"].get(str(project_id))
+            if project is None or project["project_id"] != sly_project_id:
+                project = {"images": {}}
+            for dataset_name, names in images.items():
+                synced = set(project["images"].get(dataset_name, []))
+                project["images"][dataset_name] = sorted(synced.union(names))
+            project.update(
+                project_id=sly_project_id, url=url, version=version, updated=updated
+            )
+            self._data["projects"][str(project_id)] = project
+            self.save(force_sync=True)
+
+    def mark_checked(self, project_id: str, updated: str) -> None:
+        """Saves the new time of the last update for the project, which latest version was already synced."""
+        with self._lock:
+            self._data["projects"][str(project_id)]["updated"] = updated
+            self.save()
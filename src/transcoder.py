@@ -0,0 +1,205 @@
+import io
+import os
+import multiprocessing
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import supervisely as sly
+from PIL import Image
+
+# * Formats of the transcoding: "lossless" recompresses PNG images without quality loss
+# (other images are only resized if needed), "jpeg" and "webp" re-encode all images
+# with the given quality.
+TRANSCODE_FORMATS = ("lossless", "jpeg", "webp")
+
+TranscodeOptions = namedtuple("TranscodeOptions", ["format", "quality", "max_side"])
+
+_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+_PIL_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+
+def get_target_size(image_size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    """Returns the size of the image after the resize, so its longest side is not larger
+    than max_side. The same size is used for the image and for its annotation.
+
+    :param image_size: height and width of the image
+    :type image_size: Tuple[int, int]
+    :param max_side: maximum length of the longest side, 0 disables the resize
+    :type max_side: int
+    :return: height and width of the resized image
+    :rtype: Tuple[int, int]
+    """
+    height, width = image_size
+    if not max_side or max(height, width) <= max_side:
+        return height, width
+    scale = max_side / max(height, width)
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+def get_transcoded_name(name: str, options: Optional[TranscodeOptions]) -> str:
+    """Returns the name of the image after the transcoding with the extension of the new format.
+
+    :param name: name of the image in the export
+    :type name: str
+    :param options: options of the transcoding, None if it's disabled
+    :type options: Optional[TranscodeOptions]
+    :rtype: str
+    """
+    if options is None or options.format not in _EXTENSIONS:
+        return name
+    return os.path.splitext(name)[0] + _EXTENSIONS[options.format]
+
+
+def get_transcoded_names(names: Sequence[str], options: Optional[TranscodeOptions]) -> List[str]:
+    """Returns names of the images of one dataset after the transcoding. Images, which would get
+    the same name (e.g. a.png and a.jpg both become a.jpg), keep the original extension
+    in the stem (a.png.jpg), so they are not overwritten by each other in the dataset.
+    The result depends only on the set of names, so it's the same on every run.
+
+    :param names: names of the images of the dataset in the export
+    :type names: Sequence[str]
+    :param options: options of the transcoding, None if it's disabled
+    :type options: Optional[TranscodeOptions]
+    :raises ValueError: if different images still get the same name
+    :return: names of the images in the same order
+    :rtype: List[str]
+    """
+    if options is None or options.format not in _EXTENSIONS:
+        return list(names)
+    unique_names = list(dict.fromkeys(names))
+    targets = {name: get_transcoded_name(name, options) for name in unique_names}
+    counts = Counter(targets.values())
+    for name in unique_names:
+        if counts[targets[name]] > 1 and targets[name] != name:
+            targets[name] = name + _EXTENSIONS[options.format]
+
+    duplicates = sorted(target for target, count in Counter(targets.values()).items() if count > 1)
+    if duplicates:
+        raise ValueError(
+            f"Different images have the same names after the transcoding to {options.format}: "
+            f"{', '.join(duplicates[:5])}"
+        )
+    return [targets[name] for name in names]
+
+
+def transcode_image(data: bytes, options: TranscodeOptions) -> bytes:
+    """Re-encodes the image according to the options. The original data is returned
+    if the image is not resized, is already in the target format and re-encoding
+    doesn't make it smaller.
+
+    :param data: content of the image file
+    :type data: bytes
+    :param options: options of the transcoding
+    :type options: TranscodeOptions
+    :return: content of the transcoded image file
+    :rtype: bytes
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # * JPEG images from cameras with several frames are opened as MPO.
+        source_format = "JPEG" if image.format == "MPO" else image.format
+        target_format = _PIL_FORMATS.get(options.format, source_format)
+        target_size = get_target_size((image.height, image.width), options.max_side)
+        resized = target_size != (image.height, image.width)
+        if not resized and options.format == "lossless" and source_format != "PNG":
+            return data
+
+        # * EXIF is kept, so the orientation of the image is not changed.
+        exif = image.info.get("exif")
+        if resized:
+            image = image.resize((target_size[1], target_size[0]), Image.LANCZOS)
+        if target_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif target_format == "WEBP" and image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        if target_format == "JPEG":
+            params = {"quality": options.quality, "optimize": True}
+        elif target_format == "WEBP":
+            params = {"quality": options.quality}
+        else:
+            params = {"optimize": True}
+        if exif and target_format in ("JPEG", "WEBP"):
+            params["exif"] = exif
+        buffer = io.BytesIO()
+        image.save(buffer, target_format, **params)
+
+    transcoded = buffer.getvalue()
+    if not resized and source_format == target_format and len(transcoded) >= len(data):
+        return data
+    return transcoded
+
+
+def transcode_images(
+    items: Iterable[Tuple[Any, bytes]],
+    options: TranscodeOptions,
+    workers: int = 1,
+    chunk_size: int = 16,
+) -> Iterator[Tuple[Any, bytes]]:
+    """Transcodes many images. If workers > 1, images are sent to the pool of processes in chunks,
+    results are yielded in the same order as input items. Only a limited number of chunks is
+    transcoded at the same time, so items can be a lazy iterator over the files of the export.
+    If the image can't be transcoded, its original data is returned only if the options don't change
+    its name and size ("lossless" format without max_side), otherwise ValueError is raised,
+    because the name and the annotation of the image are already changed for the transcoded image.
+
+    :param items: Iterable of (key, content of the image file), key is returned
+        with the result as is and is never sent to the worker processes.
+    :type items: Iterable[Tuple[Any, bytes]]
+    :param options: options of the transcoding
+    :type options: TranscodeOptions
+    :param workers: number of processes, defaults to 1 (transcode in current process)
+    :type workers: int, optional
+    :param chunk_size: number of images in one chunk for the worker process, defaults to 16
+    :type chunk_size: int, optional
+    :return: Iterator of (key, content of the transcoded image file).
+    :rtype: Iterator[Tuple[Any, bytes]]
+    """
+    items = iter(items)
+    first_chunk = list(islice(items, chunk_size))
+    second_chunk = list(islice(items, chunk_size))
+
+    if workers <= 1 or not second_chunk:
+        # * Starting processes is not worth it for a single chunk.
+        for key, data in chain(first_chunk, second_chunk, items):
+            yield key, _transcode_chunk([data], options)[0]
+        return
+
+    def chunks():
+        yield first_chunk
+        yield second_chunk
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    # * Spawn is used instead of fork, because the app process runs many threads.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        pending = deque()
+        for chunk in chunks():
+            keys = [key for key, _ in chunk]
+            data = [data for _, data in chunk]
+            pending.append((keys, executor.submit(_transcode_chunk, data, options)))
+            if len(pending) >= workers * 2:
+                keys, future = pending.popleft()
+                yield from zip(keys, future.result())
+        while pending:
+            keys, future = pending.popleft()
+            yield from zip(keys, future.result())
+
+
+def _transcode_chunk(chunk: List[bytes], options: TranscodeOptions) -> List[bytes]:
+    results = []
+    for data in chunk:
+        try:
+            results.append(transcode_image(data, options))
+        except Exception as e:
+            if options.format in _EXTENSIONS or options.max_side:
+                raise ValueError(f"Failed to transcode the image to {options.format}: {e}")
+            sly.logger.warning(f"Failed to transcode the image, it will be uploaded as is: {e}")
+            results.append(data)
+    return results
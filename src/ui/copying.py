@@ -1,24 +1,49 @@
 import os
-import shutil
+import json
+import threading
 import supervisely as sly
-from time import sleep
 from datetime import datetime
-from typing import Union
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 import roboflow
-from pycocotools.coco import COCO
 from supervisely.app.widgets import (
     Container,
     Card,
     Table,
     Button,
+    Checkbox,
     Progress,
     Text,
     Flexbox,
 )
 import src.globals as g
-from src.roboflow_api import download_project
-from src.converters import coco_to_sly_ann
+from src.roboflow_api import (
+    download_project,
+    estimate_export_size,
+    get_latest_version,
+    get_latest_version_info,
+    get_projects,
+)
+from src.converters import CAPTION_TAG_NAME, coco_to_sly_ann_jsons, get_caption_tag_meta
+from src.coco_reader import CocoReader
+from src.layout import (
+    CocoSplit,
+    DirectorySource,
+    open_export,
+    resolve_coco_layout,
+    resolve_folder_layout,
+)
+from src.uploader import upload_images
+from src.uploader import get_stats as get_upload_stats
+from src.pipeline import Pipeline, Stage
+from src.http_session import get_stats
+from src.metrics import STAGES, format_stage
+from src.progress import ProgressTracker
+from src.transcoder import get_transcoded_names, transcode_images
 
 COLUMNS = [
     "COPYING STATUS",
@@ -29,8 +54,23 @@ COLUMNS = [
     "UPDATED",
     "ROBOFLOW URL",
     "SUPERVISELY URL",
+    *(stage.upper() for stage in STAGES),
 ]
 
+EXPORT_FORMATS = {
+    "classification": "folder",
+    "object-detection": "coco",
+    "instance-segmentation": "coco",
+}
+
+# * Project after the conversion stage: Roboflow project, Supervisely ProjectMeta, datasets
+# in the format, which is expected by the upload function for the project type, and source,
+# which gives access to the image files of the export (or to the transcoded images).
+ConvertedProject = namedtuple(
+    "ConvertedProject", ["project", "meta", "datasets", "source"]
+)
+UploadResult = namedtuple("UploadResult", ["project_info", "failed_datasets"])
+
 projects_table = Table(fixed_cols=3, per_page=20, sort_column_id=1)
 projects_table.hide()
 
@@ -40,7 +80,18 @@ stop_button.hide()
 
 buttons_flexbox = Flexbox([copy_button, stop_button])
 
+sync_checkbox = Checkbox(
+    "Incremental sync: skip unchanged projects and copy only new images "
+    "to the previously synced Supervisely projects",
+    checked=g.STATE.sync_mode,
+)
+
 copying_progress = Progress()
+# * Progress of the current project on every stage, with the speed and the remaining time.
+download_progress = Progress()
+convert_progress = Progress()
+transcode_progress = Progress()
+upload_progress = Progress()
 good_results = Text(status="success")
 bad_results = Text(status="error")
 good_results.hide()
@@ -50,13 +101,37 @@ card = Card(
     title="3️⃣ Copying",
     description="Copy selected projects from Roboflow to Supervisely.",
     content=Container(
-        [projects_table, buttons_flexbox, copying_progress, good_results, bad_results]
+        [
+            projects_table,
+            sync_checkbox,
+            buttons_flexbox,
+            copying_progress,
+            download_progress,
+            convert_progress,
+            transcode_progress,
+            upload_progress,
+            good_results,
+            bad_results,
+        ]
     ),
     collapsable=True,
 )
 card.lock()
 card.collapse()
 
+STAGE_PROGRESS = {
+    "download": download_progress,
+    "convert": convert_progress,
+    "transcode": transcode_progress,
+    "upload": upload_progress,
+}
+
+# * Tracker of the project, which is shown in the progress bar of the stage, and the opened
+# progress session for it. If several projects are on the same stage, the last started is shown.
+_shown_trackers = {}
+_progress_sessions = {}
+_progress_lock = threading.Lock()
+
 
 def build_projects_table() -> None:
     """Fills the table with projects from Roboflow API.
@@ -79,6 +154,7 @@ def build_projects_table() -> None:
                 datetime_to_str(project.updated),
                 f'<a href="{project_url}" target="_blank">{project_url}</a>',
                 "",
+                *("" for _ in STAGES),
             ]
         )
 
@@ -108,15 +184,88 @@ def datetime_to_str(datetime_object: datetime) -> str:
     return datetime_object.strftime("<b>%Y-%m-%d</b> %H:%M:%S")
 
 
+def track_progress(
+    stage: str, message: str, total: Optional[int] = None, unit: str = "images"
+) -> ProgressTracker:
+    """Returns the tracker of the project progress on the stage, which is shown in the progress bar
+    of the stage, or logged in the headless mode. Reports are throttled, so the tracker can be
+    updated for every chunk or image. The tracker must be closed when the stage is finished.
+
+    :param stage: name of the stage: "download", "convert", "transcode" or "upload"
+    :type stage: str
+    :param message: message of the progress bar, e.g. "Downloading project cats"
+    :type message: str
+    :param total: expected total value, None if it's not known yet
+    :type total: Optional[int], optional
+    :param unit: unit of the values, "B" for bytes, defaults to "images"
+    :type unit: str, optional
+    :rtype: ProgressTracker
+    """
+    if g.STATE.headless:
+        return ProgressTracker(message, total, unit, g.PROGRESS_LOG_INTERVAL, log_progress)
+
+    tracker = ProgressTracker(
+        message, total, unit, g.PROGRESS_INTERVAL, partial(show_progress, stage)
+    )
+    with _progress_lock:
+        _shown_trackers[stage] = tracker
+    return tracker
+
+
+def log_progress(tracker: ProgressTracker) -> None:
+    """Logs the progress of the tracker with the speed and the remaining time."""
+    status = "finished" if tracker.closed else "in progress"
+    sly.logger.info(f"{tracker.name} {status}: {tracker.format()}.")
+
+
+def show_progress(stage: str, tracker: ProgressTracker) -> None:
+    """Shows the progress of the tracker in the progress bar of the stage,
+    if the tracker is the last started one on this stage.
+
+    :param stage: name of the stage: "download", "convert", "transcode" or "upload"
+    :type stage: str
+    :param tracker: tracker, which reported the progress
+    :type tracker: ProgressTracker
+    """
+    with _progress_lock:
+        if _shown_trackers.get(stage) is not tracker:
+            return
+        shown, session = _progress_sessions.get(stage, (None, None))
+        if shown is not tracker or session.total != tracker.total or session.n > tracker.done:
+            # * New project or the restarted download, the speed is measured from scratch.
+            if session is not None:
+                session.close()
+            session = STAGE_PROGRESS[stage](
+                message=tracker.name,
+                total=tracker.total,
+                unit=tracker.unit,
+                unit_scale=tracker.unit == "B",
+                mininterval=0,
+            )
+            _progress_sessions[stage] = (tracker, session)
+        session.update(tracker.done - session.n)
+        if tracker.closed:
+            session.close()
+            del _progress_sessions[stage]
+            del _shown_trackers[stage]
+
+
 @copy_button.click
 def start_copying() -> None:
     """Main function for copying projects from Roboflow to Supervisely.
 
-    1. Tries to download the project from Roboflow API and save it to the zip archive.
-    2. Unpacks the project archive, converts it to Supervisely format and uploads it to Supervisely.
-    3. Updates cells in the projects table by project ID.
-    4. Clears the download and upload directories.
-    5. Stops the application.
+    Projects are passed through the pipeline with three stages, each of them has its own
+    pool of workers, so while one project is downloading, the previous ones can be converted and uploaded.
+    Progress is saved to the checkpoint, so if the app was restarted, copying will be resumed:
+    already copied projects and uploaded batches will be skipped.
+    In the sync mode, projects without new versions are skipped and for the changed ones
+    only new images are uploaded to the previously synced Supervisely projects.
+    1. Tries to download the export archive of the project from Roboflow API.
+    2. Converts the project to Supervisely format.
+    3. Uploads the project to Supervisely.
+    4. Updates cells in the projects table by project ID.
+    5. Clears the download and upload directories.
+    6. Stops the application.
     """
     sly.logger.debug(
         f"Copying button is clicked. Selected projects: {g.STATE.selected_projects}"
@@ -125,116 +274,113 @@ def start_copying() -> None:
     stop_button.show()
     copy_button.text = "Copying..."
     g.STATE.continue_copying = True
+    g.STATE.sync_mode = sync_checkbox.is_checked()
+    if g.STATE.sync_mode:
+        refresh_selected_projects()
 
-    def download_project_dir(
-        project: roboflow.Project, retry: int = 0
-    ) -> Union[str, None]:
-        """Downloads and extracts the project from Roboflow API.
-        Retries up to 10 times on failure.
-
-        :param project: project object from Roboflow API
-        :type project: roboflow.Project
-        :param retry: current number of retries, defaults to 0
-        :type retry: int, optional
-        :return: path to the extracted project directory, or None on failure
-        :rtype: Union[str, None]
-        """
-        sly.logger.debug(
-            f"Trying to download project {project.name} from Roboflow API. "
-            f"Project type: {project.type}."
-        )
-
-        EXPORT_FORMATS = {
-            "classification": "folder",
-            "object-detection": "coco",
-            "instance-segmentation": "coco",
-        }
-
-        export_format = EXPORT_FORMATS.get(project.type)
-        if not export_format:
-            sly.logger.warning(
-                f"Unknown project type {project.type}. "
-                f"Following project types are supported: {list(EXPORT_FORMATS.keys())}."
-            )
-            return None
-
-        extract_path = download_project(project, g.UNPACKED_DIR, export_format)
-
-        if not extract_path:
-            sly.logger.info(
-                f"Will retry to download project {project.name}, because download was unsuccessful."
-            )
-            if retry < 10:
-                retry += 1
-                timer = 5
-                while timer > 0:
-                    sly.logger.info(f"Retry {retry} in {timer} seconds...")
-                    sleep(1)
-                    timer -= 1
-
-                sly.logger.info(f"Retry {retry} to download project {project.name}...")
-                return download_project_dir(project, retry)
-            else:
-                sly.logger.warning(
-                    f"Can't download project {project.name} after 10 retries."
-                )
-                return None
-        else:
-            sly.logger.debug(f"Project {project.name} downloaded to {extract_path}.")
-            return extract_path
-
-    succesfully_uploaded = 0
-    uploaded_with_errors = 0
+    results = {"succesfully_uploaded": 0, "partially_uploaded": 0, "uploaded_with_errors": 0}
+    http_stats_before = get_stats()
+    upload_stats_before = get_upload_stats()
+    g.METRICS.reset()
+    for retry_policy in (g.DOWNLOAD_RETRY, g.API_RETRY, g.UPLOAD_RETRY):
+        retry_policy.reset_budget()
 
     with copying_progress(
         total=len(g.STATE.selected_projects), message="Copying..."
     ) as pbar:
-        for project in g.STATE.selected_projects:
-            if not g.STATE.continue_copying:
-                sly.logger.info("Stop button pressed. Will stop copying.")
-                break
+
+        def on_start(project: roboflow.Project) -> None:
             sly.logger.debug(f"Copying project {project.name}")
             update_cells(project.id, new_status=g.COPYING_STATUS.working)
 
-            extract_path = download_project_dir(project)
-
-            if not extract_path:
-                sly.logger.warning(f"Project {project.name} was not downloaded.")
-                update_cells(project.id, new_status=g.COPYING_STATUS.error)
-                uploaded_with_errors += 1
-                continue
+        def on_done(project: roboflow.Project, result: Union[bool, UploadResult]) -> None:
+            if isinstance(result, UploadResult) and result.failed_datasets:
+                sly.logger.warning(
+                    f"Project {project.name} was uploaded partially, "
+                    f"failed datasets: {result.failed_datasets}."
+                )
+                results["partially_uploaded"] += 1
+                update_cells(project.id, new_status=g.COPYING_STATUS.partial)
+            else:
+                sly.logger.info(f"Project {project.name} was uploaded successfully.")
+                results["succesfully_uploaded"] += 1
+                update_cells(project.id, new_status=g.COPYING_STATUS.copied)
+            update_cells(project.id, new_metrics=g.METRICS.get_project(project.id))
+            release_project(project)
+            sly.logger.info(f"Finished processing project {project.name}.")
+            pbar.update(1)
 
-            sly.logger.info(f"Project {project.name} was downloaded successfully.")
+        def on_error(project: roboflow.Project, stage_name: str) -> None:
+            sly.logger.warning(
+                f"Project {project.name} was not copied, failed on stage: {stage_name}."
+            )
+            results["uploaded_with_errors"] += 1
+            update_cells(project.id, new_status=g.COPYING_STATUS.error)
+            update_cells(project.id, new_metrics=g.METRICS.get_project(project.id))
+            release_project(project)
+            pbar.update(1)
 
-            upload_status = convert_and_upload(project, extract_path)
+        def on_stop(project: roboflow.Project, stage_name: str) -> None:
+            sly.logger.info(f"Project {project.name} was not copied, copying was stopped.")
+            update_cells(project.id, new_status=g.COPYING_STATUS.waiting)
+            release_project(project)
 
-            if upload_status:
-                sly.logger.info(f"Project {project.name} was uploaded successfully.")
-                new_status = g.COPYING_STATUS.copied
-                succesfully_uploaded += 1
+        pipeline = build_pipeline(on_start, on_done, on_error, on_stop)
+        projects_to_copy = []
+        for project in g.STATE.selected_projects:
+            copied_url = get_copied_url(project)
+            if copied_url is not None:
+                update_cells(project.id, new_url=copied_url)
+                on_done(project, True)
             else:
-                sly.logger.warning(f"Project {project.name} was not uploaded.")
-                new_status = g.COPYING_STATUS.error
-                uploaded_with_errors += 1
+                projects_to_copy.append(project)
 
-            update_cells(project.id, new_status=new_status)
-            sly.logger.debug(f"Updated project {project.name} in the projects table.")
+        pipeline.run(projects_to_copy)
 
-            sly.logger.info(f"Finished processing project {project.name}.")
+    succesfully_uploaded = results["succesfully_uploaded"]
+    partially_uploaded = results["partially_uploaded"]
+    uploaded_with_errors = results["uploaded_with_errors"]
 
-            pbar.update(1)
+    if g.STATE.continue_copying and not uploaded_with_errors and not partially_uploaded:
+        # * All projects were copied, so the next run should start from scratch.
+        g.CHECKPOINT.clear()
 
     if succesfully_uploaded:
         good_results.text = f"Succesfully uploaded {succesfully_uploaded} projects."
         good_results.show()
-    if uploaded_with_errors:
-        bad_results.text = f"Uploaded {uploaded_with_errors} projects with errors."
+    if uploaded_with_errors or partially_uploaded:
+        messages = []
+        if uploaded_with_errors:
+            messages.append(f"Uploaded {uploaded_with_errors} projects with errors.")
+        if partially_uploaded:
+            messages.append(
+                f"{partially_uploaded} projects were uploaded partially, "
+                "failed datasets will be uploaded on the next run."
+            )
+        bad_results.text = " ".join(messages)
         bad_results.show()
 
     copy_button.text = "Copy"
     stop_button.hide()
 
     sly.logger.info(f"Finished copying {len(g.STATE.selected_projects)} projects.")
+    http_stats = get_stats()
+    sly.logger.info(
+        "Roboflow API usage during copying: "
+        f"clients created: {http_stats['clients'] - http_stats_before['clients']}, "
+        f"TCP connections opened: {http_stats['connections'] - http_stats_before['connections']}, "
+        f"requests sent: {http_stats['requests'] - http_stats_before['requests']}."
+    )
+    upload_stats = {
+        key: value - upload_stats_before[key] for key, value in get_upload_stats().items()
+    }
+    sly.logger.info(
+        f"Uploaded {upload_stats['uploaded_images']} images as bytes "
+        f"({upload_stats['uploaded_bytes'] / 1024 ** 2:.1f} MiB), "
+        f"{upload_stats['deduplicated_images']} images were already on the server and "
+        f"were added by hash ({upload_stats['deduplicated_bytes'] / 1024 ** 2:.1f} MiB saved)."
+    )
+    save_metrics()
 
     if sly.is_development():
         # * For debug purposes it's better to save the data from Roboflow API.
@@ -245,10 +391,10 @@ def start_copying() -> None:
         return
 
     sly.fs.clean_dir(g.ARCHIVE_DIR)
-    sly.fs.clean_dir(g.UNPACKED_DIR)
+    sly.fs.clean_dir(g.CONVERTED_DIR)
 
     sly.logger.info(
-        f"Removed content from {g.ARCHIVE_DIR} and {g.UNPACKED_DIR}."
+        f"Removed content from {g.ARCHIVE_DIR} and {g.CONVERTED_DIR}."
         "Will stop the application."
     )
 
@@ -257,189 +403,760 @@ def start_copying() -> None:
     app.stop()
 
 
-def convert_and_upload(project: roboflow.Project, extract_path: str) -> bool:
-    """Converts and uploads an already-extracted project to Supervisely.
+def build_pipeline(
+    on_start: Callable[[roboflow.Project], None],
+    on_done: Callable[[roboflow.Project, Any], None],
+    on_error: Callable[[roboflow.Project, str], None],
+    on_stop: Optional[Callable[[roboflow.Project, str], None]] = None,
+    queue_size: Optional[int] = None,
+) -> Pipeline:
+    """Returns the copying pipeline: download, convert, transcode (if g.TRANSCODE_OPTIONS are set)
+    and upload stages with the numbers of workers from globals. It's used by the app and by the
+    headless runner, so both of them copy projects in the same way.
+
+    :param on_start: called when the project enters the pipeline
+    :type on_start: Callable[[roboflow.Project], None]
+    :param on_done: called with the result of the last stage, when the project is copied
+    :type on_done: Callable[[roboflow.Project, Any], None]
+    :param on_error: called with the name of the failed stage
+    :type on_error: Callable[[roboflow.Project, str], None]
+    :param on_stop: called with the name of the stage, which was interrupted by the stop
+        (e.g. waiting for the disk budget), such project is not counted as failed
+    :type on_stop: Callable[[roboflow.Project, str], None], optional
+    :param queue_size: maximum number of projects in the queue before each stage,
+        defaults to g.PIPELINE_QUEUE_SIZE
+    :type queue_size: int, optional
+    :rtype: Pipeline
+    """
+    if queue_size is None:
+        queue_size = g.PIPELINE_QUEUE_SIZE
+    stages = [
+        Stage("download", download_project_dir, g.DOWNLOAD_WORKERS, queue_size),
+        Stage("convert", convert_project, g.CONVERT_WORKERS, queue_size),
+    ]
+    if g.TRANSCODE_OPTIONS:
+        stages.append(Stage("transcode", transcode_project, 1, queue_size))
+    stages.append(Stage("upload", upload_project, g.UPLOAD_WORKERS, queue_size))
+    return Pipeline(
+        stages=stages,
+        on_start=on_start,
+        on_done=on_done,
+        on_error=on_error,
+        on_stop=on_stop,
+        should_continue=lambda: g.STATE.continue_copying,
+    )
+
+
+def release_project(project: roboflow.Project) -> None:
+    """Removes the export archive and the converted annotations of the project, which left
+    the pipeline, and frees its disk budget, so the next project can be downloaded.
+    In the development mode files are kept for debugging.
 
     :param project: project object from Roboflow API
     :type project: roboflow.Project
-    :param extract_path: path to the extracted project directory
-    :type extract_path: str
-    :return: status of the upload (True if the upload was successful, False otherwise)
-    :rtype: bool
+    """
+    paths = g.DISK_BUDGET.release(project.id, remove_files=not sly.is_development())
+    if paths and not sly.is_development():
+        sly.logger.debug(f"Removed temporary files of project {project.name}: {paths}")
+
+
+def save_metrics() -> None:
+    """Logs the totals of the copying stages and saves the JSON report and the Prometheus
+    metrics to g.METRICS_DIR."""
+    for stage, values in g.METRICS.get_report()["stages"].items():
+        sly.logger.info(
+            f"Stage {stage}: {values['seconds']:.1f} seconds, {values['items']} images, "
+            f"{values['bytes'] / 1024 ** 2:.1f} MiB ({format_stage(values)})."
+        )
+    try:
+        paths = g.METRICS.save(g.METRICS_DIR)
+    except Exception as e:
+        sly.logger.warning(f"Failed to save metrics to {g.METRICS_DIR}: {e}")
+        return
+    sly.logger.info(f"Metrics were saved to {', '.join(paths)}.")
+
+
+def get_copied_url(project: roboflow.Project) -> Optional[str]:
+    """Returns URL of the Supervisely project if the Roboflow project doesn't need to be copied:
+    it was copied by the previous interrupted run according to the checkpoint,
+    or it wasn't changed since the last sync in the sync mode.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :return: URL of the Supervisely project or None if the project should be copied
+    :rtype: Optional[str]
+    """
+    progress = g.CHECKPOINT.get_project(project.id)
+    if progress is not None and progress["finished"]:
+        # * Project was copied by the previous run, which was interrupted.
+        sly.logger.info(
+            f"Project {project.name} was already copied according to the checkpoint."
+        )
+        return progress["url"]
+    if g.STATE.sync_mode and is_project_synced(project):
+        sly.logger.info(
+            f"Project {project.name} wasn't changed since the last sync, skipping."
+        )
+        return g.SYNC_STATE.get_project(project.id)["url"]
+    return None
+
+
+def download_project_dir(project: roboflow.Project, _: Any = None) -> Union[str, None, object]:
+    """Downloads the export archive of the project from Roboflow API, it's not extracted.
+    If the latest version of the project is in the export cache, it's taken from there.
+    Failed requests are retried according to the download and API retry policies.
+    Time and size of the download are added to the metrics of the project.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param _: Unused (payload from the pipeline, which is the project itself)
+    :type _: Any, optional
+    :return: path to the export archive, None on failure or Pipeline.STOPPED if copying was
+        stopped while waiting for the disk budget
+    :rtype: Union[str, None, object]
+    """
+    export_path = _download_project_dir(project)
+    if export_path is Pipeline.STOPPED:
+        return export_path
+    if export_path:
+        if os.path.isdir(export_path):
+            size = sly.fs.get_directory_size(export_path)
+        else:
+            size = os.path.getsize(export_path)
+        g.METRICS.add(project.id, "download", bytes=size)
+        g.DISK_BUDGET.update(project.id, estimate_disk_usage(size))
+    return export_path
+
+
+def estimate_disk_usage(export_size: int) -> int:
+    """Returns the size of the temporary files of the project by the size of its export,
+    transcoded images are saved next to the export, so they double it.
+
+    :param export_size: size of the export archive in bytes
+    :type export_size: int
+    :rtype: int
+    """
+    return export_size * 2 if g.TRANSCODE_OPTIONS else export_size
+
+
+def _download_project_dir(project: roboflow.Project) -> Union[str, None, object]:
+    """Downloads the export archive of the project or takes it from the export cache.
+    Waiting for the disk budget is not counted as the download time.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :return: path to the export archive, None on failure or Pipeline.STOPPED if copying was
+        stopped while waiting for the disk budget
+    :rtype: Union[str, None, object]
     """
     sly.logger.debug(
-        f"Converting and uploading project {project.name} with type {project.type}"
+        f"Trying to download project {project.name} from Roboflow API. "
+        f"Project type: {project.type}."
     )
 
-    PROCESSING_FUNCTIONS = {
-        "classification": process_classification_project,
-        "object-detection": process_coco_project,
-        "instance-segmentation": process_coco_project,
+    export_format = EXPORT_FORMATS.get(project.type)
+    if not export_format:
+        sly.logger.warning(
+            f"Unknown project type {project.type}. "
+            f"Following project types are supported: {list(EXPORT_FORMATS.keys())}."
+        )
+        return None
+
+    with g.METRICS.measure(project.id, "download"):
+        try:
+            latest = g.API_RETRY.call(
+                get_latest_version_info,
+                project,
+                description=f"Getting versions of project {project.name}",
+            )
+        except Exception as e:
+            sly.logger.warning(f"Can't get versions of project {project.name}: {e}")
+            return None
+    if latest is None:
+        return None
+    version = int(os.path.basename(str(latest.version)))
+    g.STATE.versions[project.id] = version
+
+    # * Waits until the files of the previous projects are removed, if the project doesn't fit
+    # into the disk budget.
+    if not g.DISK_BUDGET.acquire(
+        project.id,
+        estimate_disk_usage(estimate_export_size(latest)),
+        lambda: g.STATE.continue_copying,
+    ):
+        sly.logger.info(f"Copying was stopped, project {project.name} will not be downloaded.")
+        return Pipeline.STOPPED
+
+    with g.METRICS.measure(project.id, "download"):
+        return _fetch_export(project, version, export_format)
+
+
+def _fetch_export(project: roboflow.Project, version: int, export_format: str) -> Union[str, None]:
+    """Takes the export archive of the project version from the export cache or downloads it.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param version: number of the project version
+    :type version: int
+    :param export_format: format of the export archive
+    :type export_format: str
+    :return: path to the export archive, or None on failure
+    :rtype: Union[str, None]
+    """
+    cache_key = g.EXPORT_CACHE.key(project.id, version, export_format)
+    export_path = g.EXPORT_CACHE.get(cache_key, g.ARCHIVE_DIR)
+    if export_path:
+        sly.logger.debug(f"Project {project.name} was taken from the export cache.")
+        g.DISK_BUDGET.add_path(project.id, export_path)
+        return export_path
+
+    tracker = track_progress("download", f"Downloading project {project.name}", unit="B")
+    try:
+        export_path = g.DOWNLOAD_RETRY.call(
+            download_project,
+            project,
+            g.ARCHIVE_DIR,
+            export_format,
+            version,
+            tracker,
+            description=f"Download of project {project.name}",
+        )
+    except Exception as e:
+        sly.logger.warning(f"Can't download project {project.name}: {e}")
+        return None
+    finally:
+        tracker.close()
+
+    sly.logger.debug(f"Project {project.name} downloaded to {export_path}.")
+    g.DISK_BUDGET.add_path(project.id, export_path)
+    g.EXPORT_CACHE.put(cache_key, export_path)
+    return export_path
+
+
+def convert_project(
+    project: roboflow.Project, export_path: str
+) -> Union[bool, ConvertedProject]:
+    """Converts the downloaded project to Supervisely format with the conversion function
+    for its type, without uploading it.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param export_path: path to the export archive of the project (or to the extracted directory)
+    :type export_path: str
+    :return: converted project if the conversion was successful, False otherwise
+    :rtype: Union[bool, ConvertedProject]
+    """
+    sly.logger.debug(
+        f"Converting project {project.name} with type {project.type}"
+    )
+
+    CONVERSION_FUNCTIONS = {
+        "classification": convert_classification_project,
+        "object-detection": convert_coco_project,
+        "instance-segmentation": convert_coco_project,
     }
 
-    processing_function = PROCESSING_FUNCTIONS.get(project.type)
-    if not processing_function:
+    conversion_function = CONVERSION_FUNCTIONS.get(project.type)
+    if not conversion_function:
         sly.logger.warning(
             f"Unknown project type {project.type}. "
-            f"Following project types are supported: {list(PROCESSING_FUNCTIONS.keys())}."
+            f"Following project types are supported: {list(CONVERSION_FUNCTIONS.keys())}."
         )
         return False
 
     if project.type == "instance-segmentation":
-        project_info = processing_function(project, extract_path, ignore_bbox=True)
-    else:
-        project_info = processing_function(project, extract_path)
+        return conversion_function(project, export_path, ignore_bbox=True)
+    return conversion_function(project, export_path)
+
 
-    if project_info is False:
+def transcode_project(
+    project: roboflow.Project, converted: ConvertedProject
+) -> Union[bool, ConvertedProject]:
+    """Re-encodes images of the converted project according to g.TRANSCODE_OPTIONS
+    in the pool of processes, before the upload. Transcoded images are saved with the same
+    paths as in the export to the directory, from which the project is uploaded then.
+    Saved bytes are added to the metrics of the project. The project fails if an image can't be
+    transcoded, while its name and annotation are already changed for the transcoded image.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param converted: project converted to Supervisely format
+    :type converted: ConvertedProject
+    :return: converted project with the transcoded images as the source if the transcoding
+        was successful, False otherwise
+    :rtype: Union[bool, ConvertedProject]
+    """
+    image_paths = get_image_paths(converted)
+    transcoded_dir = os.path.join(g.CONVERTED_DIR, str(project.id), "images")
+    sly.fs.mkdir(transcoded_dir, remove_content_if_exists=True)
+    g.DISK_BUDGET.add_path(project.id, transcoded_dir)
+
+    def image_items():
+        for image_path in image_paths:
+            with converted.source.open(image_path) as image_file:
+                data = image_file.read()
+            yield (image_path, len(data)), data
+
+    original_size = transcoded_size = 0
+    tracker = track_progress(
+        "transcode", f"Transcoding project {project.name}", total=len(image_paths)
+    )
+    try:
+        with g.METRICS.measure(project.id, "transcode"):
+            for (image_path, size), data in transcode_images(
+                image_items(), g.TRANSCODE_OPTIONS, g.TRANSCODE_PROCESSES
+            ):
+                transcoded_path = os.path.join(transcoded_dir, image_path)
+                sly.fs.mkdir(os.path.dirname(transcoded_path))
+                with open(transcoded_path, "wb") as image_file:
+                    image_file.write(data)
+                original_size += size
+                transcoded_size += len(data)
+                tracker.update()
+    except Exception as e:
+        sly.logger.warning(f"Failed to transcode images of project {project.name}: {e}")
         return False
+    finally:
+        tracker.close()
+        converted.source.close()
+
+    saved = original_size - transcoded_size
+    g.METRICS.add(project.id, "transcode", bytes=saved, items=len(image_paths))
+    sly.logger.info(
+        f"Transcoded {len(image_paths)} images of project {project.name}: "
+        f"{original_size / 1024 ** 2:.1f} MiB -> {transcoded_size / 1024 ** 2:.1f} MiB, "
+        f"saved {saved / 1024 ** 2:.1f} MiB "
+        f"({saved / original_size * 100 if original_size else 0:.1f}%)."
+    )
+    return converted._replace(source=DirectorySource(transcoded_dir))
+
+
+def upload_project(
+    project: roboflow.Project, converted: ConvertedProject
+) -> Union[bool, UploadResult]:
+    """Uploads the converted project to Supervisely and updates its URL in the projects table.
+    If some datasets failed to upload, the project is not marked as finished in the checkpoint,
+    so the failed datasets will be uploaded on the next run.
 
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param converted: project converted to Supervisely format
+    :type converted: ConvertedProject
+    :return: ProjectInfo object from Supervisely API with names of the failed datasets
+        if at least one dataset was uploaded, False otherwise
+    :rtype: Union[bool, UploadResult]
+    """
+    sly.logger.debug(f"Uploading project {project.name} with type {project.type}")
+
+    UPLOAD_FUNCTIONS = {
+        "classification": upload_classification_project,
+        "object-detection": upload_coco_project,
+        "instance-segmentation": upload_coco_project,
+    }
+
+    tracker = track_progress(
+        "upload",
+        f"Uploading project {project.name}",
+        total=sum(count_images(converted, dataset_name) for dataset_name in converted.datasets),
+    )
     try:
-        new_url = sly.utils.abs_url(project_info.url)
-    except Exception:
-        new_url = project_info.url
+        with g.METRICS.measure(project.id, "upload"):
+            result = UPLOAD_FUNCTIONS[project.type](converted, tracker)
+    finally:
+        tracker.close()
+        converted.source.close()
+
+    if result is False:
+        return False
+    project_info = result.project_info
+
+    new_url = get_project_url(project_info)
     sly.logger.debug(f"New URL for images project: {new_url}")
     update_cells(project.id, new_url=new_url)
+    if result.failed_datasets:
+        sly.logger.warning(
+            f"Project {project.name} was copied partially, failed datasets: "
+            f"{', '.join(result.failed_datasets)}. They will be uploaded on the next run."
+        )
+        return result
+
+    g.CHECKPOINT.finish_project(project.id, new_url)
+    g.SYNC_STATE.update_project(
+        project.id,
+        project_info.id,
+        new_url,
+        g.STATE.versions.get(project.id),
+        str(project.updated),
+        get_image_names(converted),
+    )
 
-    return True
+    return result
 
 
-def process_classification_project(
-    project: roboflow.Project, extract_path: str
-) -> Union[bool, sly.ProjectInfo]:
-    """Converts Roboflow project in classification format to Supervisely format and uploads it to Supervisely.
+def get_project_url(project_info: sly.ProjectInfo) -> str:
+    """Returns the absolute URL of the Supervisely project, or the relative one
+    if the server address is not known.
 
-    :param project: project object from Roboflow API
-    :type project: roboflow.Project
-    :param extract_path: path to the directory with Roboflow project after unpacking
-    :type extract_path: str
-    :return: ProjectInfo object from Supervisely API if the upload was successful, False otherwise
-    :rtype: Union[bool, sly.ProjectInfo]
+    :param project_info: ProjectInfo object from Supervisely API
+    :type project_info: sly.ProjectInfo
+    :rtype: str
     """
-    sly.logger.debug(f"Processing classification project {project.name}")
+    try:
+        return sly.utils.abs_url(project_info.url)
+    except Exception:
+        return project_info.url
+
+
+def count_images(converted: ConvertedProject, dataset_name: str) -> int:
+    """Returns the number of images in the dataset of the converted project.
 
-    datasets = [
-        os.path.join(extract_path, name) for name in sly.fs.get_subdirs(extract_path)
+    :param converted: project converted to Supervisely format
+    :type converted: ConvertedProject
+    :param dataset_name: name of the dataset
+    :type dataset_name: str
+    :rtype: int
+    """
+    dataset = converted.datasets[dataset_name]
+    if converted.project.type == "classification":
+        return sum(len(images_paths) for images_paths in dataset.values())
+    with open(dataset, "r") as items_file:
+        return sum(1 for _ in items_file)
+
+
+def get_dataset_image_names(image_paths: List[str]) -> Dict[str, str]:
+    """Returns names of the images of one dataset in Supervisely by their paths in the export,
+    the extensions are changed if the images are transcoded to another format.
+
+    :param image_paths: paths to the images of the dataset in the export
+    :type image_paths: List[str]
+    :raises ValueError: if different images get the same name after the transcoding
+    :return: dictionary with image paths as keys and image names as values
+    :rtype: Dict[str, str]
+    """
+    names = [os.path.basename(image_path) for image_path in image_paths]
+    return dict(zip(image_paths, get_transcoded_names(names, g.TRANSCODE_OPTIONS)))
+
+
+def get_image_paths(converted: ConvertedProject) -> List[str]:
+    """Returns paths to the images of all datasets of the converted project in the export.
+
+    :param converted: project converted to Supervisely format
+    :type converted: ConvertedProject
+    :rtype: List[str]
+    """
+    if converted.project.type == "classification":
+        return [
+            image_path
+            for dataset_images in converted.datasets.values()
+            for images_paths in dataset_images.values()
+            for image_path in images_paths
+        ]
+    return [
+        item["path"]
+        for items_path in converted.datasets.values()
+        for item in read_items(items_path)
     ]
 
-    sly.logger.debug(f"Found {len(datasets)} datasets in {extract_path}")
-
-    tags = []
-    images = {}
-
-    for dataset in datasets:
-        dataset_name = os.path.basename(dataset)
-        subdirectories = [os.path.join(dataset, name) for name in os.listdir(dataset)]
-        dataset_images = {}
-        for subdirectory in subdirectories:
-            tag_name = os.path.basename(subdirectory)
-            if tag_name not in tags:
-                tags.append(tag_name)
-            files = [
-                os.path.join(subdirectory, name)
-                for name in sly.fs.list_files(
-                    subdirectory,
-                    valid_extensions=sly.image.SUPPORTED_IMG_EXTS,
-                    ignore_valid_extensions_case=True,
-                )
-            ]
 
-            dataset_images[tag_name] = files
+def get_image_names(converted: ConvertedProject) -> Dict[str, List[str]]:
+    """Returns names of the images in each dataset of the converted project.
+
+    :param converted: project converted to Supervisely format
+    :type converted: ConvertedProject
+    :return: dictionary with dataset names as keys and lists of image names as values
+    :rtype: Dict[str, List[str]]
+    """
+    if converted.project.type == "classification":
+        return {
+            dataset_name: list(
+                get_dataset_image_names(
+                    [
+                        image_path
+                        for images_paths in dataset_images.values()
+                        for image_path in images_paths
+                    ]
+                ).values()
+            )
+            for dataset_name, dataset_images in converted.datasets.items()
+        }
+    return {
+        ds_name: [item["name"] for item in read_items(items_path)]
+        for ds_name, items_path in converted.datasets.items()
+    }
+
+
+def convert_classification_project(
+    project: roboflow.Project, export_path: str
+) -> ConvertedProject:
+    """Reads Roboflow project in classification format and prepares tags and images for the upload.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param export_path: path to the export archive of the project (or to the extracted directory)
+    :type export_path: str
+    :return: converted project with dataset names as keys and dictionaries of tag names
+        and image paths in the export as values in datasets
+    :rtype: ConvertedProject
+    """
+    sly.logger.debug(f"Processing classification project {project.name}")
+
+    with g.METRICS.measure(project.id, "prepare"):
+        source = open_export(export_path)
+        images = resolve_folder_layout(source)
 
-        images[dataset_name] = dataset_images
+    with g.METRICS.measure(project.id, "convert"):
+        tags = list(
+            dict.fromkeys(
+                tag_name for dataset_images in images.values() for tag_name in dataset_images
+            )
+        )
+        tag_metas = [
+            sly.TagMeta(name=tag_name, value_type=sly.TagValueType.NONE)
+            for tag_name in tags
+        ]
+    g.METRICS.add(
+        project.id,
+        "convert",
+        items=sum(
+            len(images_paths)
+            for dataset_images in images.values()
+            for images_paths in dataset_images.values()
+        ),
+    )
 
     sly.logger.info(
         f"Following tags were found: {tags}, prepared {len(images)} datasets with images."
     )
 
-    tag_metas = [
-        sly.TagMeta(name=tag_name, value_type=sly.TagValueType.NONE)
-        for tag_name in tags
-    ]
-
-    project_meta = sly.ProjectMeta(tag_metas=tag_metas)
-    project_info = g.api.project.create(
-        g.STATE.selected_workspace, project.name, change_name_if_conflict=True
+    return ConvertedProject(
+        project, sly.ProjectMeta(tag_metas=tag_metas), images, source
     )
-    sly.logger.info(f"Created project {project_info.name} with id {project_info.id}")
 
-    g.api.project.update_meta(project_info.id, project_meta)
-    sly.logger.info(f"Updated project {project_info.name} meta")
-    project_meta = sly.ProjectMeta.from_json(g.api.project.get_meta(project_info.id))
 
-    for dataset_name, dataset_images in images.items():
-        dataset_info = g.api.dataset.create(project_info.id, dataset_name)
-        sly.logger.info(
-            f"Created dataset {dataset_info.name} with id {dataset_info.id}"
-        )
+def upload_classification_project(
+    converted: ConvertedProject, tracker: Optional[ProgressTracker] = None
+) -> Union[bool, UploadResult]:
+    """Uploads converted classification project to Supervisely: creates project and datasets,
+    uploads images with tags in their annotations. Datasets are uploaded in parallel.
 
-        for tag_name, images_paths in dataset_images.items():
-            image_names = [os.path.basename(image_path) for image_path in images_paths]
-
-            uploaded_image_ids = [
-                image_info.id
-                for image_info in g.api.image.upload_paths(
-                    dataset_info.id, image_names, images_paths
-                )
-            ]
-            sly.logger.info(f"Uploaded {len(uploaded_image_ids)} images")
+    :param converted: converted classification project
+    :type converted: ConvertedProject
+    :param tracker: tracker of the uploaded images
+    :type tracker: Optional[ProgressTracker], optional
+    :return: ProjectInfo object from Supervisely API with names of the failed datasets
+        if at least one dataset was uploaded, False otherwise
+    :rtype: Union[bool, UploadResult]
+    """
+    project = converted.project
 
-            tag_id = project_meta.get_tag_meta(tag_name).sly_id
-            sly.logger.debug(
-                f"Will try to add tag {tag_name} with id {tag_id} for image IDS {uploaded_image_ids}"
-            )
+    project_info = create_or_resume_project(project, converted.meta)
 
-            g.api.image.add_tag_batch(uploaded_image_ids, tag_id)
-            sly.logger.info(f"Added tag {tag_name} to {len(uploaded_image_ids)} images")
+    failed_datasets = upload_datasets(
+        converted,
+        partial(upload_classification_dataset, converted, project_info, tracker=tracker),
+    )
+    if failed_datasets and len(failed_datasets) == len(converted.datasets):
+        return False
 
     sly.logger.info(f"Finished processing classification project {project.name}.")
 
-    return project_info
+    return UploadResult(project_info, failed_datasets)
+
+
+def upload_classification_dataset(
+    converted: ConvertedProject,
+    project_info: sly.ProjectInfo,
+    dataset_name: str,
+    tracker: Optional[ProgressTracker] = None,
+) -> None:
+    """Uploads images of one dataset of the converted classification project.
+    Images of all classes are merged into batches of g.UPLOAD_BATCH_SIZE, the class tag
+    of every image is uploaded in its annotation right after the batch of images,
+    so there are no separate requests for every tag.
+
+    :param converted: converted classification project
+    :type converted: ConvertedProject
+    :param project_info: Supervisely project, where the dataset will be created
+    :type project_info: sly.ProjectInfo
+    :param dataset_name: name of the dataset
+    :type dataset_name: str
+    :param tracker: tracker of the uploaded images
+    :type tracker: Optional[ProgressTracker], optional
+    """
+    project = converted.project
+    dataset_images = converted.datasets[dataset_name]
+    tags = {tag_meta.name: sly.Tag(tag_meta) for tag_meta in converted.meta.tag_metas}
+
+    dataset_info, progress = create_or_resume_dataset(project, project_info, dataset_name)
+    if progress is not None and progress["finished"]:
+        sly.logger.info(f"Dataset {dataset_name} was already uploaded, skipping.")
+        if tracker is not None:
+            tracker.update(count_images(converted, dataset_name))
+        return
+
+    image_names = get_dataset_image_names(
+        [image_path for images_paths in dataset_images.values() for image_path in images_paths]
+    )
+    synced_names = get_synced_images(project, project_info, dataset_name)
+    items = (
+        (tag_name, image_path)
+        for tag_name, images_paths in dataset_images.items()
+        for image_path in images_paths
+        if image_names[image_path] not in synced_names
+    )
+    uploaded_count = 0
+    if progress is not None:
+        uploaded_count = progress["items_done"]
+        if tracker is not None:
+            tracker.update(uploaded_count)
+        done_items = islice(items, progress["items_done"])
+        done_names = [image_names[image_path] for _, image_path in done_items]
+        remove_unfinished_items(dataset_info.id, set(done_names) | synced_names)
+
+    for batch in batched(items, g.UPLOAD_BATCH_SIZE):
+        batch_names = [image_names[image_path] for _, image_path in batch]
+        image_sources = [
+            partial(converted.source.open, image_path) for _, image_path in batch
+        ]
+
+        def upload_batch():
+            uploaded_images = upload_images(
+                g.upload_api,
+                dataset_info.id,
+                batch_names,
+                image_sources,
+                g.HASH_WORKERS,
+                g.DEDUP_UPLOADS,
+            )
+            ann_jsons = [
+                sly.Annotation(
+                    (image_info.height, image_info.width),
+                    img_tags=sly.TagCollection([tags[tag_name]]),
+                ).to_json()
+                for (tag_name, _), image_info in zip(batch, uploaded_images)
+            ]
+            g.upload_api.annotation.upload_jsons(
+                [image_info.id for image_info in uploaded_images], ann_jsons
+            )
+            sly.logger.info(f"Uploaded {len(uploaded_images)} images with tags")
+            return uploaded_images
+
+        uploaded_images = g.UPLOAD_RETRY.call(
+            upload_batch,
+            description=f"Upload of the batch to dataset {dataset_name}",
+            on_retry=lambda: remove_batch_leftovers(dataset_info.id, batch_names),
+        )
+        g.CHECKPOINT.add_items(project.id, dataset_name, len(batch))
+        add_upload_metrics(project, uploaded_images)
+        uploaded_count += len(batch)
+        if tracker is not None:
+            tracker.update(len(batch))
+
+    g.CHECKPOINT.finish_dataset(project.id, dataset_name)
+    if tracker is not None:
+        # * Images, which were synced before, are counted too.
+        tracker.update(count_images(converted, dataset_name) - uploaded_count)
 
 
-def process_coco_project(
+def convert_coco_project(
     project: roboflow.Project,
-    extract_path: str,
+    export_path: str,
     ignore_bbox: bool = False,
-) -> Union[bool, sly.ProjectInfo]:
-    """Converts Roboflow COCO project to Supervisely format and uploads it via API.
+) -> Union[bool, ConvertedProject]:
+    """Converts Roboflow COCO project to Supervisely format.
+    Converted annotations are saved for each split in a JSON Lines file in g.CONVERTED_DIR,
+    each line contains image name, image path in the export and annotation in Supervisely JSON format.
 
     :param project: project object from Roboflow API
     :type project: roboflow.Project
-    :param extract_path: path to the directory with Roboflow project after unpacking
-    :type extract_path: str
+    :param export_path: path to the export archive of the project (or to the extracted directory)
+    :type export_path: str
     :param ignore_bbox: if True, will ignore bounding boxes in COCO format, defaults to False
     :type ignore_bbox: bool, optional
-    :return: ProjectInfo object from Supervisely API if the upload was successful, False otherwise
-    :rtype: Union[bool, sly.ProjectInfo]
+    :return: converted project with split names as keys and paths to the JSON Lines files
+        as values in datasets if the conversion was successful, False otherwise
+    :rtype: Union[bool, ConvertedProject]
     """
     sly.logger.debug(f"Processing object detection project {project.name}.")
-    prepare_coco(extract_path)
-
-    dataset_names = sly.fs.get_subdirs(extract_path)
-    if not dataset_names:
-        sly.logger.warning(f"No dataset splits found in {extract_path}.")
+    with g.METRICS.measure(project.id, "prepare"):
+        prepared = prepare_coco_project(project, export_path)
+    if prepared is None:
         return False
+    source, splits, readers, project_meta = prepared
+    converted_dir = os.path.join(g.CONVERTED_DIR, str(project.id))
+
+    tracker = track_progress(
+        "convert",
+        f"Converting project {project.name}",
+        total=sum(len(splits[ds_name].images) for ds_name in readers),
+    )
+    items_paths = {}
+    has_captions = False
+    try:
+        for ds_name, reader in readers.items():
+            with g.METRICS.measure(project.id, "convert"):
+                items_path, items_count, split_has_captions = convert_coco_split(
+                    project_meta, reader, splits[ds_name], converted_dir, ignore_bbox, tracker
+                )
+            g.METRICS.add(project.id, "convert", items=items_count)
+            has_captions = has_captions or split_has_captions
+
+            if not items_count:
+                sly.logger.warning(f"No images found for split {ds_name}, skipping.")
+                continue
+
+            items_paths[ds_name] = items_path
+            sly.logger.info(f"Converted {items_count} annotations in split {ds_name}")
+    finally:
+        tracker.close()
 
-    # Load COCO data for each split and collect all categories
-    coco_per_dataset = {}
+    if has_captions and project_meta.get_tag_meta(CAPTION_TAG_NAME) is None:
+        project_meta = project_meta.add_tag_meta(get_caption_tag_meta())
+
+    return ConvertedProject(project, project_meta, items_paths, source)
+
+
+def prepare_coco_project(project: roboflow.Project, export_path: str) -> Optional[Tuple]:
+    """Finds the splits of the COCO export, reads their categories and builds ProjectMeta.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param export_path: path to the export archive of the project (or to the extracted directory)
+    :type export_path: str
+    :return: opened export, splits and readers by split names and ProjectMeta,
+        or None if there are no valid splits
+    :rtype: Optional[Tuple]
+    """
+    source = open_export(export_path)
+    splits = {split.name: split for split in resolve_coco_layout(source)}
+    if not splits:
+        sly.logger.warning(f"No dataset splits found in {export_path}.")
+        source.close()
+        return None
+
+    converted_dir = os.path.join(g.CONVERTED_DIR, str(project.id))
+    sly.fs.mkdir(converted_dir, remove_content_if_exists=True)
+    g.DISK_BUDGET.add_path(project.id, converted_dir)
+
+    # Read COCO categories for each split, annotations are streamed later
+    readers = {}
     categories_map = {}  # id -> name, accumulated across all splits
-    for ds_name in dataset_names:
-        ann_path = os.path.join(extract_path, ds_name, "annotations", "instances.json")
-        if not os.path.exists(ann_path):
-            sly.logger.warning(f"No annotations found for split {ds_name}, skipping.")
-            continue
+    for ds_name, split in splits.items():
         try:
-            coco = COCO(ann_path)
+            reader = CocoReader(
+                split.annotations_path, index_dir=converted_dir, opener=source.open_text
+            )
         except Exception as e:
             sly.logger.warning(f"Failed to load COCO annotations for {ds_name}: {e}")
             continue
-        coco_per_dataset[ds_name] = coco
-        for cat in coco.loadCats(coco.getCatIds()):
+        readers[ds_name] = reader
+        for cat in reader.categories:
             categories_map[cat["id"]] = cat["name"]
 
-    if not coco_per_dataset:
-        sly.logger.warning(f"No valid COCO splits found in {extract_path}.")
-        return False
+    if not readers:
+        sly.logger.warning(f"No valid COCO splits found in {export_path}.")
+        source.close()
+        return None
 
     # Build ProjectMeta from all categories
     project_meta = sly.ProjectMeta()
@@ -453,104 +1170,490 @@ def process_coco_project(
             sly.ObjClass(cat_name, sly.AnyGeometry, color)
         )
 
-    # Create Supervisely project
-    project_info = g.api.project.create(
-        g.STATE.selected_workspace, project.name, change_name_if_conflict=True
-    )
-    sly.logger.info(f"Created project {project_info.name} with id {project_info.id}")
-    g.api.project.update_meta(project_info.id, project_meta)
-    project_meta = sly.ProjectMeta.from_json(g.api.project.get_meta(project_info.id))
+    return source, splits, readers, project_meta
 
-    for ds_name, coco in coco_per_dataset.items():
-        img_dir = os.path.join(extract_path, ds_name, "images")
-        categories = coco.loadCats(coco.getCatIds())
 
-        image_paths, image_names, valid_img_infos = [], [], []
-        for img_info in coco.dataset.get("images", []):
+def convert_coco_split(
+    project_meta: sly.ProjectMeta,
+    reader: CocoReader,
+    split: CocoSplit,
+    converted_dir: str,
+    ignore_bbox: bool = False,
+    tracker: Optional[ProgressTracker] = None,
+) -> Tuple[str, int, bool]:
+    """Converts annotations of one split and writes them to the JSON Lines file.
+
+    :param project_meta: meta of the converted project
+    :type project_meta: sly.ProjectMeta
+    :param reader: reader of the COCO annotations of the split
+    :type reader: CocoReader
+    :param split: split of the export with its name and images
+    :type split: CocoSplit
+    :param converted_dir: directory for the JSON Lines file
+    :type converted_dir: str
+    :param ignore_bbox: if True, will ignore bounding boxes in COCO format, defaults to False
+    :type ignore_bbox: bool, optional
+    :param tracker: tracker of the converted images
+    :type tracker: Optional[ProgressTracker], optional
+    :return: path to the JSON Lines file, number of converted images and True if any image
+        has the caption tag
+    :rtype: Tuple[str, int, bool]
+    """
+    split_images = split.images
+    # * Names are chosen for the whole split at once, so the transcoded images don't collide.
+    image_names = dict(
+        zip(split_images, get_transcoded_names(list(split_images), g.TRANSCODE_OPTIONS))
+    )
+    items_path = os.path.join(converted_dir, f"{split.name}.jsonl")
+
+    def image_items():
+        for img_info, img_anns in reader:
             file_name = img_info["file_name"]
             if "/" in file_name:
                 file_name = os.path.basename(file_name)
-            img_path = os.path.join(img_dir, file_name)
-            if sly.fs.file_exists(img_path):
-                image_paths.append(img_path)
-                image_names.append(file_name)
-                valid_img_infos.append(img_info)
-
-        if not image_paths:
-            sly.logger.warning(f"No images found for split {ds_name}, skipping.")
-            continue
+            img_path = split_images.get(file_name)
+            if img_path is None:
+                continue
 
-        dataset_info = g.api.dataset.create(project_info.id, ds_name)
-        sly.logger.info(
-            f"Created dataset {dataset_info.name} with id {dataset_info.id}"
+            img_size = (img_info["height"], img_info["width"])
+            yield (file_name, img_path), img_anns, img_size
+
+    items_count = 0
+    has_captions = False
+    with reader, open(items_path, "w") as items_file:
+        for (file_name, img_path), ann_json in coco_to_sly_ann_jsons(
+            project_meta,
+            reader.categories,
+            image_items(),
+            ignore_bbox,
+            workers=g.CONVERT_PROCESSES,
+            chunk_size=g.CONVERT_CHUNK_SIZE,
+            max_side=g.TRANSCODE_OPTIONS.max_side if g.TRANSCODE_OPTIONS else 0,
+        ):
+            item = {"name": image_names[file_name], "path": img_path, "ann": ann_json}
+            items_file.write(json.dumps(item) + "\n")
+            items_count += 1
+            has_captions = has_captions or bool(ann_json["tags"])
+            if tracker is not None:
+                tracker.update()
+    return items_path, items_count, has_captions
+
+
+def upload_coco_project(
+    converted: ConvertedProject, tracker: Optional[ProgressTracker] = None
+) -> Union[bool, UploadResult]:
+    """Uploads converted COCO project to Supervisely: creates project and datasets,
+    uploads images and annotations. Datasets are uploaded in parallel.
+
+    :param converted: converted COCO project
+    :type converted: ConvertedProject
+    :param tracker: tracker of the uploaded images
+    :type tracker: Optional[ProgressTracker], optional
+    :return: ProjectInfo object from Supervisely API with names of the failed datasets
+        if at least one dataset was uploaded, False otherwise
+    :rtype: Union[bool, UploadResult]
+    """
+    project = converted.project
+
+    project_info = create_or_resume_project(project, converted.meta)
+
+    failed_datasets = upload_datasets(
+        converted, partial(upload_coco_dataset, converted, project_info, tracker=tracker)
+    )
+    if failed_datasets and len(failed_datasets) == len(converted.datasets):
+        return False
+
+    sly.logger.debug(f"Project {project.name} was processed successfully.")
+    return UploadResult(project_info, failed_datasets)
+
+
+def upload_coco_dataset(
+    converted: ConvertedProject,
+    project_info: sly.ProjectInfo,
+    ds_name: str,
+    tracker: Optional[ProgressTracker] = None,
+) -> None:
+    """Uploads images with annotations of one dataset of the converted COCO project.
+
+    :param converted: converted COCO project
+    :type converted: ConvertedProject
+    :param project_info: Supervisely project, where the dataset will be created
+    :type project_info: sly.ProjectInfo
+    :param ds_name: name of the dataset
+    :type ds_name: str
+    :param tracker: tracker of the uploaded images
+    :type tracker: Optional[ProgressTracker], optional
+    """
+    project = converted.project
+    items_path = converted.datasets[ds_name]
+
+    dataset_info, progress = create_or_resume_dataset(project, project_info, ds_name)
+    if progress is not None and progress["finished"]:
+        sly.logger.info(f"Dataset {ds_name} was already uploaded, skipping.")
+        if tracker is not None:
+            tracker.update(count_images(converted, ds_name))
+        return
+
+    synced_names = get_synced_images(project, project_info, ds_name)
+    items = (item for item in read_items(items_path) if item["name"] not in synced_names)
+    uploaded_count = 0
+    if progress is not None:
+        uploaded_count = progress["items_done"]
+        if tracker is not None:
+            tracker.update(uploaded_count)
+        done_names = [item["name"] for item in islice(items, uploaded_count)]
+        remove_unfinished_items(dataset_info.id, set(done_names) | synced_names)
+
+    for batch in batched(items, g.UPLOAD_BATCH_SIZE):
+        image_names = [item["name"] for item in batch]
+        image_sources = [partial(converted.source.open, item["path"]) for item in batch]
+        ann_jsons = [item["ann"] for item in batch]
+
+        def upload_batch():
+            uploaded = upload_images(
+                g.upload_api,
+                dataset_info.id,
+                image_names,
+                image_sources,
+                g.HASH_WORKERS,
+                g.DEDUP_UPLOADS,
+            )
+            g.upload_api.annotation.upload_jsons([img.id for img in uploaded], ann_jsons)
+            return uploaded
+
+        uploaded_images = g.UPLOAD_RETRY.call(
+            upload_batch,
+            description=f"Upload of the batch to dataset {ds_name}",
+            on_retry=lambda: remove_batch_leftovers(dataset_info.id, image_names),
         )
+        g.CHECKPOINT.add_items(project.id, ds_name, len(batch))
+        add_upload_metrics(project, uploaded_images)
+        if tracker is not None:
+            tracker.update(len(batch))
 
-        uploaded = list(
-            g.api.image.upload_paths(dataset_info.id, image_names, image_paths)
+        uploaded_count += len(batch)
+        sly.logger.info(
+            f"Uploaded {uploaded_count} images with annotations to dataset {ds_name}"
         )
-        sly.logger.info(f"Uploaded {len(uploaded)} images to dataset {ds_name}")
 
-        anns = []
-        for img_info in valid_img_infos:
-            img_anns = coco.imgToAnns.get(img_info["id"], [])
-            img_size = (img_info["height"], img_info["width"])
-            ann = coco_to_sly_ann(
-                project_meta, categories, img_anns, img_size, ignore_bbox
+    g.CHECKPOINT.finish_dataset(project.id, ds_name)
+    if tracker is not None:
+        # * Images, which were synced before, are counted too.
+        tracker.update(count_images(converted, ds_name) - uploaded_count)
+
+
+def upload_datasets(
+    converted: ConvertedProject, upload_dataset: Callable[[str], None]
+) -> List[str]:
+    """Uploads datasets of the converted project in parallel, at most g.SPLIT_WORKERS at once.
+    Errors are isolated: the failed dataset is logged and the others are uploaded anyway,
+    its progress stays in the checkpoint, so it will be resumed on the next run.
+
+    :param converted: converted project
+    :type converted: ConvertedProject
+    :param upload_dataset: function, which receives the name of the dataset and uploads it
+    :type upload_dataset: Callable[[str], None]
+    :return: names of the datasets, which failed to upload
+    :rtype: List[str]
+    """
+    project = converted.project
+    failed_datasets = []
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(g.SPLIT_WORKERS, len(converted.datasets))),
+        thread_name_prefix=f"split-{project.id}",
+    ) as executor:
+        futures = {
+            executor.submit(upload_dataset, dataset_name): dataset_name
+            for dataset_name in converted.datasets
+        }
+        for future in as_completed(futures):
+            dataset_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                sly.logger.warning(
+                    f"Failed to upload dataset {dataset_name} of project {project.name}: {e}",
+                    exc_info=True,
+                )
+                failed_datasets.append(dataset_name)
+
+    # * Keeps the order of the datasets in logs and reports.
+    return [dataset_name for dataset_name in converted.datasets if dataset_name in failed_datasets]
+
+
+def add_upload_metrics(project: roboflow.Project, uploaded_images: List[sly.ImageInfo]) -> None:
+    """Adds the number and the size of the uploaded images to the metrics of the project.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param uploaded_images: images of the uploaded batch
+    :type uploaded_images: List[sly.ImageInfo]
+    """
+    g.METRICS.add(
+        project.id,
+        "upload",
+        bytes=sum(image_info.size or 0 for image_info in uploaded_images),
+        items=len(uploaded_images),
+    )
+
+
+def create_or_resume_project(
+    project: roboflow.Project, project_meta: sly.ProjectMeta
+) -> sly.ProjectInfo:
+    """Returns Supervisely project from the checkpoint if the copying of the Roboflow project
+    was started before, otherwise creates a new one. Updates meta of the project.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param project_meta: meta of the converted project
+    :type project_meta: sly.ProjectMeta
+    :return: ProjectInfo object from Supervisely API
+    :rtype: sly.ProjectInfo
+    """
+    project_info = None
+    progress = g.CHECKPOINT.get_project(project.id)
+    if progress is not None:
+        project_info = g.api.project.get_info_by_id(progress["project_id"])
+        if project_info is None:
+            sly.logger.warning(
+                f"Project with id {progress['project_id']} from the checkpoint was not found."
+            )
+        else:
+            sly.logger.info(
+                f"Resuming copying to project {project_info.name} with id {project_info.id}"
             )
-            anns.append(ann)
 
-        g.api.annotation.upload_anns([img.id for img in uploaded], anns)
-        sly.logger.info(f"Uploaded {len(anns)} annotations to dataset {ds_name}")
+    if project_info is None and g.STATE.sync_mode:
+        synced = g.SYNC_STATE.get_project(project.id)
+        if synced is not None:
+            project_info = g.api.project.get_info_by_id(synced["project_id"])
+            if project_info is not None:
+                sly.logger.info(
+                    f"Syncing new images to project {project_info.name} with id {project_info.id}"
+                )
+                g.CHECKPOINT.start_project(project.id, project_info.id)
 
-    sly.logger.debug(f"Project {project.name} was processed successfully.")
+    if project_info is None:
+        project_info = g.api.project.create(
+            g.STATE.selected_workspace, project.name, change_name_if_conflict=True
+        )
+        sly.logger.info(
+            f"Created project {project_info.name} with id {project_info.id}"
+        )
+        g.CHECKPOINT.start_project(project.id, project_info.id)
+    else:
+        # * Existing project can already have classes and tags, which are not in the new version.
+        existing_meta = sly.ProjectMeta.from_json(
+            g.api.project.get_meta(project_info.id)
+        )
+        project_meta = existing_meta.merge(project_meta)
+
+    g.api.project.update_meta(project_info.id, project_meta)
+    sly.logger.info(f"Updated project {project_info.name} meta")
     return project_info
 
 
-def prepare_coco(directory: str) -> None:
-    """Prepares correct structure of COCO format from Roboflow to Supervisely.
+def create_or_resume_dataset(
+    project: roboflow.Project, project_info: sly.ProjectInfo, dataset_name: str
+) -> Tuple[sly.DatasetInfo, Optional[Dict]]:
+    """Returns Supervisely dataset from the checkpoint with its progress if it was created before,
+    otherwise creates a new one.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param project_info: Supervisely project, where the dataset will be created
+    :type project_info: sly.ProjectInfo
+    :param dataset_name: name of the dataset
+    :type dataset_name: str
+    :return: DatasetInfo object and its progress from the checkpoint (None for a new dataset)
+    :rtype: Tuple[sly.DatasetInfo, Optional[Dict]]
+    """
+    progress = g.CHECKPOINT.get_dataset(project.id, dataset_name)
+    if progress is not None:
+        dataset_info = g.api.dataset.get_info_by_id(progress["dataset_id"])
+        if dataset_info is not None:
+            sly.logger.info(
+                f"Resuming dataset {dataset_info.name} with id {dataset_info.id}, "
+                f"{progress['items_done']} items were already uploaded."
+            )
+            return dataset_info, dict(progress)
+
+    dataset_info = g.api.dataset.get_info_by_name(project_info.id, dataset_name)
+    if dataset_info is not None:
+        # * Dataset was created by the previous sync of the project.
+        sly.logger.info(
+            f"Using existing dataset {dataset_info.name} with id {dataset_info.id}"
+        )
+    else:
+        dataset_info = g.api.dataset.create(project_info.id, dataset_name)
+        sly.logger.info(
+            f"Created dataset {dataset_info.name} with id {dataset_info.id}"
+        )
+    g.CHECKPOINT.start_dataset(project.id, dataset_name, dataset_info.id)
+    return dataset_info, None
+
+
+def get_synced_images(
+    project: roboflow.Project, project_info: sly.ProjectInfo, dataset_name: str
+) -> Set[str]:
+    """Returns names of the images, which were synced to the dataset before.
+    Returns an empty set if the sync mode is disabled or the project is not the synced one.
+
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :param project_info: Supervisely project, where the images are uploaded
+    :type project_info: sly.ProjectInfo
+    :param dataset_name: name of the dataset
+    :type dataset_name: str
+    :return: set of image names
+    :rtype: Set[str]
+    """
+    if not g.STATE.sync_mode:
+        return set()
+    synced = g.SYNC_STATE.get_project(project.id)
+    if synced is None or synced["project_id"] != project_info.id:
+        return set()
+    return g.SYNC_STATE.get_images(project.id, dataset_name)
+
+
+def refresh_selected_projects() -> None:
+    """Replaces the selected projects with their current metadata from Roboflow API.
+    Projects in the selection may come from the projects cache, so their update time
+    can be older than g.PROJECTS_CACHE_TTL, while the sync check relies on it."""
+    try:
+        current = {project.id: project for project in get_projects(use_cache=False)}
+    except Exception as e:
+        sly.logger.warning(f"Failed to refresh metadata of the selected projects: {e}")
+        return
+    g.STATE.selected_projects = [
+        current.get(project.id, project) for project in g.STATE.selected_projects
+    ]
+
 
-    1. Remove all files in directory (left only subdirectories)
-    2. For each subdirectory (which will be a dataset):
-        2.1. Create annotations directory
-        2.2. Move _annotations.coco.json from subdirectory to annotations directory
-        2.3. Rename _annotations.coco.json in annotations directory to instances.json
-        2.4. Create images directory
-        2.5. Move all images from subdirectory to images directory
+def is_project_synced(project: roboflow.Project) -> bool:
+    """Checks if the latest version of the Roboflow project was already synced to Supervisely.
+    The version is requested from Roboflow API only if the project was updated since the last sync,
+    so the metadata of the project must be fresh, not from the projects cache.
 
-    :param directory: path to the directory with COCO structure
-    :type directory: str
+    :param project: project object from Roboflow API
+    :type project: roboflow.Project
+    :return: True if the project can be skipped
+    :rtype: bool
     """
-    sly.logger.debug(f"Preparing COCO structure in {directory}")
+    synced = g.SYNC_STATE.get_project(project.id)
+    if synced is None:
+        return False
+    if g.api.project.get_info_by_id(synced["project_id"]) is None:
+        sly.logger.info(f"Synced project for {project.name} was removed, will copy it.")
+        return False
 
-    root_files = sly.fs.list_files(directory)
-    for root_file in root_files:
-        if not os.path.isdir(root_file):
-            sly.fs.silent_remove(root_file)
-            sly.logger.debug(f"Removed file {root_file} from {directory}")
+    updated = str(project.updated)
+    if g.SYNC_STATE.is_up_to_date(project.id, updated):
+        return True
 
-    subdirectories = [
-        os.path.join(directory, name) for name in sly.fs.get_subdirs(directory)
+    try:
+        version = g.API_RETRY.call(
+            get_latest_version,
+            project,
+            description=f"Getting versions of project {project.name}",
+        )
+    except Exception:
+        return False
+    if version is not None and g.SYNC_STATE.is_up_to_date(project.id, updated, version):
+        g.SYNC_STATE.mark_checked(project.id, updated)
+        return True
+    return False
+
+
+def remove_unfinished_items(dataset_id: int, done_names: Set[str]) -> None:
+    """Removes images from the resumed dataset, which are not in the list of uploaded items
+    in the checkpoint (e.g. images of the batch, which was interrupted before its annotations
+    were uploaded), so they will be uploaded again with annotations.
+
+    :param dataset_id: ID of the dataset in Supervisely
+    :type dataset_id: int
+    :param done_names: names of the images, which were uploaded with annotations
+        (including the images synced by the previous runs)
+    :type done_names: Set[str]
+    """
+    image_infos = g.API_RETRY.call(
+        g.upload_api.image.get_list,
+        dataset_id,
+        description=f"Listing of the images in dataset {dataset_id}",
+    )
+    unfinished_ids = [
+        image_info.id for image_info in image_infos if image_info.name not in done_names
     ]
-    for subdirectory in subdirectories:
-        subdirectory = os.path.abspath(subdirectory)
-        sly.logger.debug(f"Processing subdirectory {subdirectory}")
+    if unfinished_ids:
+        sly.logger.info(
+            f"Removing {len(unfinished_ids)} images of the unfinished batch from dataset {dataset_id}."
+        )
+        g.API_RETRY.call(
+            g.upload_api.image.remove_batch,
+            unfinished_ids,
+            description=f"Removal of the unfinished images from dataset {dataset_id}",
+        )
 
-        annotations_dir = os.path.join(subdirectory, "annotations")
-        sly.fs.mkdir(annotations_dir)
 
-        annotations_file_src = os.path.join(subdirectory, "_annotations.coco.json")
-        annotations_file_dst = os.path.join(annotations_dir, "instances.json")
-        sly.fs.copy_file(annotations_file_src, annotations_file_dst)
-        sly.fs.silent_remove(annotations_file_src)
+def remove_batch_leftovers(dataset_id: int, batch_names: List[str]) -> None:
+    """Removes images of the failed batch, which were uploaded before the error,
+    so the batch can be uploaded again without name conflicts.
 
-        images_dir = os.path.join(subdirectory, "images")
-        sly.fs.mkdir(images_dir)
+    :param dataset_id: ID of the dataset in Supervisely
+    :type dataset_id: int
+    :param batch_names: names of the images in the batch
+    :type batch_names: List[str]
+    """
+    batch_names = set(batch_names)
+    image_infos = g.API_RETRY.call(
+        g.upload_api.image.get_list,
+        dataset_id,
+        description=f"Listing of the images in dataset {dataset_id}",
+    )
+    leftover_ids = [
+        image_info.id for image_info in image_infos if image_info.name in batch_names
+    ]
+    if leftover_ids:
+        sly.logger.info(
+            f"Removing {len(leftover_ids)} images of the failed batch from dataset {dataset_id}."
+        )
+        g.API_RETRY.call(
+            g.upload_api.image.remove_batch,
+            leftover_ids,
+            description=f"Removal of the failed batch from dataset {dataset_id}",
+        )
 
-        images = sly.fs.list_files(subdirectory)
-        for image in images:
-            shutil.move(image, images_dir)
 
-    sly.logger.info(f"Finished preparing COCO structure in {directory}")
+def read_items(items_path: str) -> Iterator[Dict]:
+    """Reads converted items (image name, image path and annotation) from the JSON Lines file one by one.
+
+    :param items_path: path to the JSON Lines file with converted items
+    :type items_path: str
+    :return: iterator over converted items
+    :rtype: Iterator[Dict]
+    """
+    with open(items_path, "r") as items_file:
+        for line in items_file:
+            yield json.loads(line)
+
+
+def batched(iterable: Iterable, batch_size: int) -> Iterator[List]:
+    """Splits iterable into lists of batch_size items, the last batch can be smaller.
+    Only one batch is kept in memory at a time.
+
+    :param iterable: iterable to split
+    :type iterable: Iterable
+    :param batch_size: number of items in one batch
+    :type batch_size: int
+    :return: iterator over batches
+    :rtype: Iterator[List]
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 def update_cells(project_id: int, **kwargs) -> None:
@@ -558,12 +1661,25 @@ def update_cells(project_id: int, **kwargs) -> None:
     Possible kwargs:
         - new_status: new status for the project
         - new_url: new Supervisely URL for the project
+        - new_metrics: values of the copying stages from g.METRICS.get_project()
 
     :param project_id: project ID in Roboflow for projects table to update
     :type project_id: int
     """
+    if g.STATE.headless:
+        return
+
     key_cell_value = project_id
     key_column_name = "ID"
+    if kwargs.get("new_metrics") is not None:
+        for stage in STAGES:
+            projects_table.update_cell_value(
+                key_column_name,
+                key_cell_value,
+                stage.upper(),
+                format_stage(kwargs["new_metrics"].get(stage)),
+            )
+        return
     if kwargs.get("new_status"):
         column_name = "COPYING STATUS"
         new_value = kwargs["new_status"]
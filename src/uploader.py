@@ -0,0 +1,142 @@
+import io
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, Tuple, Union
+
+import supervisely as sly
+from requests_toolbelt import MultipartEncoder
+
+# * Image data for the upload: bytes, file-like object or function, which opens the file-like object.
+# Functions allow to open the images (e.g. members of the zip archive) only while they are read.
+ImageSource = Union[bytes, bytearray, BinaryIO, Callable[[], BinaryIO]]
+
+# * Counters of the uploaded and deduplicated (attached by hash without sending the data) images.
+_stats = {
+    "uploaded_images": 0,
+    "uploaded_bytes": 0,
+    "deduplicated_images": 0,
+    "deduplicated_bytes": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_stats() -> Dict[str, int]:
+    """Returns the copy of the upload counters since the start of the app."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def read_source(source: ImageSource) -> bytes:
+    """Returns the content of the image source. File-like objects are rewound after reading,
+    so they can be read again.
+
+    :param source: image data
+    :type source: ImageSource
+    :rtype: bytes
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if callable(source):
+        with source() as file:
+            return file.read()
+    data = source.read()
+    if source.seekable():
+        source.seek(0)
+    return data
+
+
+def get_hash(data: bytes) -> str:
+    """Returns the hash of the image data in the same format as Supervisely does."""
+    return base64.b64encode(hashlib.sha256(data).digest()).decode("utf-8")
+
+
+def _hash_source(source: ImageSource) -> Tuple[str, int]:
+    data = read_source(source)
+    return get_hash(data), len(data)
+
+
+def _upload_batch(api: sly.Api, batch: List[Tuple[ImageSource, str]]) -> None:
+    """Uploads the data of the images with one request. The multipart body can be read only once,
+    so the request is not retried by the SDK: the errors are raised to the retry policy of the caller,
+    which uploads the batch again with the new body."""
+    fields = {
+        f"{idx}-file": (str(idx), io.BytesIO(read_source(source)), "image/*")
+        for idx, (source, _) in enumerate(batch)
+    }
+    response = api.post("images.bulk.upload", MultipartEncoder(fields=fields), raise_error=True)
+    received = {item["hash"] for item in response.json() if "hash" in item}
+    missing = [image_hash for _, image_hash in batch if image_hash not in received]
+    if missing:
+        raise RuntimeError(f"Server didn't accept {len(missing)} of {len(batch)} images.")
+
+
+def upload_images(
+    api: sly.Api,
+    dataset_id: int,
+    names: List[str],
+    sources: List[ImageSource],
+    hash_workers: int = 1,
+    dedup: bool = True,
+) -> List[sly.ImageInfo]:
+    """Uploads images to the dataset from bytes or file-like objects instead of paths.
+
+    Images are hashed in parallel, then the server is asked which of the hashes it already has.
+    Only unknown images are read again and uploaded as bytes, the others are added to the dataset
+    by their hashes, so re-runs and duplicated images don't use the upload bandwidth.
+    If dedup is False, the server is not asked and all images are uploaded as bytes.
+
+    :param api: Supervisely API object
+    :type api: sly.Api
+    :param dataset_id: ID of the dataset in Supervisely
+    :type dataset_id: int
+    :param names: names of the images
+    :type names: List[str]
+    :param sources: image data in the same order as names
+    :type sources: List[ImageSource]
+    :param hash_workers: number of threads for reading and hashing the images, defaults to 1
+    :type hash_workers: int, optional
+    :param dedup: if False, images are uploaded without checking the existing hashes,
+        defaults to True
+    :type dedup: bool, optional
+    :return: list of uploaded images
+    :rtype: List[sly.ImageInfo]
+    """
+    if hash_workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=hash_workers) as executor:
+            hashed = list(executor.map(_hash_source, sources))
+    else:
+        hashed = [_hash_source(source) for source in sources]
+    hashes = [image_hash for image_hash, _ in hashed]
+
+    if dedup:
+        # * Duplicates inside the batch are uploaded once.
+        unique = {}
+        for source, (image_hash, size) in zip(sources, hashed):
+            unique.setdefault(image_hash, (source, size))
+        existing = set(api.image.check_existing_hashes(list(unique)))
+        pending = [
+            (source, image_hash, size)
+            for image_hash, (source, size) in unique.items()
+            if image_hash not in existing
+        ]
+    else:
+        pending = [(source, image_hash, size) for source, (image_hash, size) in zip(sources, hashed)]
+
+    for batch in sly.batched(pending):
+        _upload_batch(api, [(source, image_hash) for source, image_hash, _ in batch])
+
+    uploaded_bytes = sum(size for _, _, size in pending)
+    total_bytes = sum(size for _, size in hashed)
+    with _stats_lock:
+        _stats["uploaded_images"] += len(pending)
+        _stats["uploaded_bytes"] += uploaded_bytes
+        _stats["deduplicated_images"] += len(sources) - len(pending)
+        _stats["deduplicated_bytes"] += total_bytes - uploaded_bytes
+    sly.logger.debug(
+        f"Uploading {len(sources)} images: {len(pending)} as bytes, "
+        f"{len(sources) - len(pending)} by hash."
+    )
+
+    return api.image.upload_hashes(dataset_id, names, hashes)
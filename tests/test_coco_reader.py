@@ -0,0 +1,139 @@
+import json
+import random
+
+import pytest
+
+from src.coco_reader import CocoReader, JsonStream, iter_coco_array
+
+# * Strings with escapes, unicode and brackets, nested arrays and literals, so every kind
+# of token is cut by the chunk boundary at least once with small chunks.
+TRICKY = {
+    "info": {"description": 'quote " and \\ backslash', "nested": [[1, [2, [3, []]]], {}]},
+    "licenses": [],
+    "text": "tab\t newline\n unicode é中 😀 brackets [{]}",
+    "numbers": [0, -1, 12345678901234567890, 1.5e-10, -0.25],
+    "literals": [True, False, None],
+}
+
+
+class ShortReads:
+    """Text stream, which returns at most `limit` characters per read, like a slow zip entry."""
+
+    def __init__(self, file, limit: int):
+        self._file = file
+        self._limit = limit
+
+    def read(self, size: int = -1) -> str:
+        return self._file.read(min(size, self._limit) if size > 0 else self._limit)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def short_opener(limit: int):
+    return lambda path: ShortReads(open(path, "r", encoding="utf-8"), limit)
+
+
+def write_json(tmp_path, data, name="data.json", **kwargs) -> str:
+    path = str(tmp_path / name)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, **kwargs)
+    return path
+
+
+def coco_document(seed: int, grouped: bool) -> dict:
+    rng = random.Random(seed)
+    images = [
+        {"id": image_id, "file_name": f"img \"{image_id}\"\\.jpg", "height": 10, "width": 20}
+        for image_id in rng.sample(range(1, 1000), 12)
+    ]
+    anns = [
+        {
+            "id": ann_id,
+            "image_id": image["id"],
+            "category_id": rng.randint(0, 2),
+            "bbox": [rng.random(), 1, 2, 3],
+            "segmentation": [[rng.randint(0, 9) for _ in range(6)]],
+        }
+        for ann_id, image in enumerate(rng.choice(images) for _ in range(40))
+    ]
+    positions = {image["id"]: idx for idx, image in enumerate(images)}
+    if grouped:
+        anns.sort(key=lambda ann: positions[ann["image_id"]])
+    else:
+        # * Annotations of an unknown image are skipped by the reader.
+        anns.append({"id": 100, "image_id": 5000, "category_id": 0, "bbox": [0, 0, 1, 1]})
+    return {
+        "info": TRICKY["info"],
+        "annotations": anns,
+        "categories": [{"id": 0, "name": "aé"}, {"id": 1, "name": "[b]"}, {"id": 2, "name": "c"}],
+        "images": images,
+    }
+
+
+def expected_groups(document: dict):
+    return [
+        (image, [ann for ann in document["annotations"] if ann["image_id"] == image["id"]])
+        for image in document["images"]
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_value_matches_json_load(tmp_path, chunk_size, indent):
+    path = write_json(tmp_path, TRICKY, indent=indent, ensure_ascii=False)
+    stream = JsonStream(path, chunk_size=chunk_size)
+    try:
+        assert stream.read_value() == TRICKY
+    finally:
+        stream.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_skip_value_and_iter_array(tmp_path, chunk_size):
+    path = write_json(tmp_path, TRICKY, ensure_ascii=True)
+    stream = JsonStream(path, chunk_size=chunk_size)
+    values = {}
+    try:
+        for key in stream.iter_object():
+            if key in ("numbers", "literals"):
+                values[key] = list(stream.iter_array())
+            else:
+                stream.skip_value()
+    finally:
+        stream.close()
+    assert values == {"numbers": TRICKY["numbers"], "literals": TRICKY["literals"]}
+
+
+@pytest.mark.parametrize("limit", [1, 3, 10])
+def test_iter_coco_array_matches_json_load(tmp_path, limit):
+    document = coco_document(0, grouped=False)
+    path = write_json(tmp_path, document, indent=1, ensure_ascii=False)
+    for name in ("annotations", "images", "categories"):
+        assert list(iter_coco_array(path, name, short_opener(limit))) == document[name]
+    assert list(iter_coco_array(path, "missing", short_opener(limit))) == []
+
+
+@pytest.mark.parametrize("grouped", [True, False])
+@pytest.mark.parametrize("limit", [1, 4, 1 << 20])
+def test_reader_matches_json_load(tmp_path, grouped, limit):
+    document = coco_document(1, grouped)
+    path = write_json(tmp_path, document, ensure_ascii=False)
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == document
+
+    with CocoReader(path, index_dir=str(tmp_path), opener=short_opener(limit)) as reader:
+        assert reader.grouped == grouped
+        assert reader.categories == document["categories"]
+        assert reader.images_count == len(document["images"])
+        assert list(reader) == expected_groups(document)
+    # * The temporary index is removed on close.
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["data.json"]
+
+
+def test_truncated_file_fails(tmp_path):
+    path = str(tmp_path / "data.json")
+    with open(path, "w") as file:
+        file.write('{"images": [{"id": 1}, {"id": ')
+    with pytest.raises(ValueError):
+        list(iter_coco_array(path, "images", short_opener(3)))
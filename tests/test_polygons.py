@@ -0,0 +1,100 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from src.converters import convert_polygon_vertices
+
+IMAGE_SIZE = (100, 120)
+
+
+def random_ring(rng: np.random.Generator, cx: float, cy: float, radius: float) -> List[float]:
+    count = int(rng.integers(3, 12))
+    angles = np.sort(rng.uniform(0, 2 * np.pi, count))
+    radii = rng.uniform(0.5 * radius, radius, count)
+    points = [(round(cx + r * np.cos(a)), round(cy + r * np.sin(a))) for a, r in zip(angles, radii)]
+    return [float(value) for point in points for value in point]
+
+
+def ring_sets(seed: int = 0, count: int = 300) -> List[List[List[float]]]:
+    """Random star-shaped rings on the pixel grid, most of them are placed around
+    the center of another ring, so they are often nested or touch each other."""
+    rng = np.random.default_rng(seed)
+    height, width = IMAGE_SIZE
+    cases = []
+    for _ in range(count):
+        rings = []
+        for _ in range(rng.integers(2, 5)):
+            if rings and rng.random() < 0.6:
+                base = np.array(rings[rng.integers(len(rings))]).reshape(-1, 2)
+                (cx, cy), radius = base.mean(axis=0), rng.uniform(3, 20)
+            else:
+                cx, cy = rng.uniform(25, width - 25), rng.uniform(25, height - 25)
+                radius = rng.uniform(10, 24)
+            rings.append(random_ring(rng, cx, cy, radius))
+        cases.append(rings)
+    return cases
+
+
+def reference(rings: List[List[float]]) -> List[Tuple[int, List[int]]]:
+    """Rings are matched to holes by cv2.pointPolygonTest against the exact ring contour:
+    the ring is a hole if all its vertices are strictly inside the exterior."""
+    contours = [np.array(ring, dtype=np.float32).reshape(-1, 1, 2) for ring in rings]
+    holes = {idx: [] for idx in range(len(rings))}
+    removed = []
+    for idx, contour in enumerate(contours):
+        for idy, ring in enumerate(rings):
+            if idx == idy or idy in removed:
+                continue
+            points = np.array(ring).reshape(-1, 2)
+            if all(cv2.pointPolygonTest(contour, (x, y), False) > 0 for x, y in points):
+                holes[idx].append(idy)
+                removed.append(idy)
+    return [(idx, holes[idx]) for idx in range(len(rings)) if idx not in removed]
+
+
+def structure(rings: List[List[float]]) -> List[Tuple[int, List[int]]]:
+    """Converts the rings and returns indices of the exterior and the holes of every polygon."""
+    indices = {tuple(ring): idx for idx, ring in enumerate(rings)}
+
+    def index(points: List[List[float]]) -> int:
+        return indices[tuple(float(value) for point in points for value in point)]
+
+    result = []
+    for polygon in convert_polygon_vertices({"segmentation": rings}, IMAGE_SIZE):
+        points = polygon.to_json()["points"]
+        result.append((index(points["exterior"]), [index(hole) for hole in points["interior"]]))
+    return result
+
+
+def test_matches_point_polygon_test():
+    for rings in ring_sets():
+        assert structure(rings) == reference(rings), rings
+
+
+def test_hole_close_to_exterior_edge():
+    # * The hole touches the rasterized outline of the exterior, the previous implementation
+    # tested vertices against that outline and missed such holes. Found in 16 ring pairs
+    # of ring_sets(), all of them are holes by the exact test.
+    exterior = [34.0, 59.0, 31.0, 62.0, 28.0, 61.0, 25.0, 55.0]
+    hole = [33.0, 59.0, 32.0, 59.0, 30.0, 60.0, 28.0, 57.0]
+    assert structure([exterior, hole]) == [(0, [1])]
+
+
+def test_hole_before_its_exterior():
+    square = [70.0, 10.0, 90.0, 10.0, 90.0, 30.0, 70.0, 30.0]
+    hole = [20.0, 20.0, 30.0, 20.0, 30.0, 30.0, 20.0, 30.0]
+    exterior = [10.0, 10.0, 50.0, 10.0, 50.0, 50.0, 10.0, 50.0]
+    assert structure([square, hole, exterior]) == [(0, []), (2, [1])]
+
+
+def test_ring_on_boundary_is_not_hole():
+    exterior = [10.0, 10.0, 50.0, 10.0, 50.0, 50.0, 10.0, 50.0]
+    touching = [10.0, 20.0, 30.0, 20.0, 30.0, 30.0]
+    assert structure([exterior, touching]) == [(0, []), (1, [])]
+
+
+def test_exterior_outside_image():
+    exterior = [200.0, 200.0, 260.0, 200.0, 260.0, 260.0, 200.0, 260.0]
+    inner = [210.0, 210.0, 220.0, 210.0, 220.0, 220.0]
+    assert structure([exterior, inner]) == [(0, []), (1, [])]
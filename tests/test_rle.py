@@ -0,0 +1,39 @@
+import numpy as np
+import pycocotools.mask as mask_util
+
+import supervisely as sly
+
+from src.converters import convert_rle_masks_to_polygons
+
+
+def encode(mask: np.ndarray) -> dict:
+    rle = mask_util.encode(np.asfortranarray(mask.astype(np.uint8)))
+    rle["counts"] = rle["counts"].decode("utf-8")
+    return rle
+
+
+def test_empty_mask_with_empty_bbox():
+    rle = encode(np.zeros((10, 10)))
+    assert convert_rle_masks_to_polygons([{"segmentation": rle, "bbox": [0, 0, 0, 0]}]) == [[]]
+
+
+def test_bbox_misses_mask():
+    mask = np.zeros((20, 20))
+    mask[12:18, 12:18] = 1
+    rle = encode(mask)
+    assert convert_rle_masks_to_polygons([{"segmentation": rle, "bbox": [0, 0, 4, 4]}]) == [[]]
+
+
+def test_bad_object_doesnt_break_others():
+    mask = np.zeros((20, 20))
+    mask[2:8, 3:9] = 1
+    objects = [
+        {"segmentation": encode(np.zeros((20, 20))), "bbox": [0, 0, 0, 0]},
+        {"segmentation": encode(mask), "bbox": [3, 2, 6, 6]},
+    ]
+    empty, polygons = convert_rle_masks_to_polygons(objects)
+    expected = sly.Bitmap(mask.astype(bool)).to_contours()
+    assert empty == []
+    assert [polygon.to_json() for polygon in polygons] == [
+        polygon.to_json() for polygon in expected
+    ]
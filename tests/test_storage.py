@@ -0,0 +1,50 @@
+import json
+import threading
+from time import time
+from types import SimpleNamespace
+
+from src.storage import JsonStore
+
+
+class SlowFileApi:
+    """Stand-in for api.file, the first upload waits until it's released by the test."""
+
+    def __init__(self):
+        self.uploaded = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def exists(self, team_id, path):
+        return False
+
+    def remove(self, team_id, path):
+        pass
+
+    def upload(self, team_id, src, dst):
+        self.started.set()
+        self.release.wait(5)
+        with open(src) as file:
+            self.uploaded.append(json.load(file))
+
+
+def test_save_is_not_blocked_by_upload(tmp_path):
+    file_api = SlowFileApi()
+    api = SimpleNamespace(file=file_api)
+    store = JsonStore(str(tmp_path / "state.json"), api, 1, "/state.json", sync_interval=0)
+
+    store._data["projects"]["a"] = 1
+    uploader = threading.Thread(target=store.save)
+    uploader.start()
+    assert file_api.started.wait(5)
+
+    started = time()
+    store._data["projects"]["b"] = 2
+    store.save(force_sync=True)
+    assert time() - started < 1
+
+    file_api.release.set()
+    uploader.join(5)
+    assert not uploader.is_alive()
+    # * The state saved during the upload is uploaded by the same thread after it.
+    assert [data["projects"] for data in file_api.uploaded][-1] == {"a": 1, "b": 2}
+    assert not store._syncing
@@ -0,0 +1,51 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.transcoder import TranscodeOptions, get_transcoded_names, transcode_images
+
+BROKEN = b"not an image"
+
+
+def encode(size, image_format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def test_broken_image_is_kept_as_is_without_changes():
+    options = TranscodeOptions("lossless", 85, 0)
+    items = [("a.png", encode((8, 8))), ("b.png", BROKEN)]
+    results = dict(transcode_images(items, options))
+    assert results["b.png"] == BROKEN
+
+
+@pytest.mark.parametrize(
+    "options", [TranscodeOptions("jpeg", 85, 0), TranscodeOptions("lossless", 85, 4)]
+)
+def test_broken_image_fails_when_name_or_size_changes(options):
+    items = [("a.png", encode((8, 8))), ("b.png", BROKEN)]
+    with pytest.raises(ValueError):
+        list(transcode_images(items, options))
+
+
+def test_resized_image_matches_target_size():
+    options = TranscodeOptions("webp", 85, 4)
+    [(_, data)] = transcode_images([("a.png", encode((16, 8)))], options)
+    with Image.open(io.BytesIO(data)) as image:
+        assert (image.format, image.size) == ("WEBP", (4, 2))
+
+
+def test_transcoded_names_do_not_collide():
+    options = TranscodeOptions("jpeg", 85, 0)
+    names = ["a.png", "a.jpg", "b.png", "c.jpeg", "c.webp"]
+    assert get_transcoded_names(names, options) == [
+        "a.png.jpg", "a.jpg", "b.jpg", "c.jpeg.jpg", "c.webp.jpg"
+    ]
+
+
+def test_transcoded_names_fail_on_remaining_collision():
+    options = TranscodeOptions("webp", 85, 0)
+    with pytest.raises(ValueError):
+        get_transcoded_names(["a.png", "a.jpg", "a.png.webp"], options)